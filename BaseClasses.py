@@ -67,6 +67,8 @@ class MultiWorld():
     is_race: bool = False
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    memory_usage: Dict[int, Dict[str, Tuple[int, int]]]
+    """bytes retained and peak bytes allocated per player and world method, only recorded while tracemalloc traces"""
 
     plando_options: PlandoOptions
     early_items: Dict[int, Dict[str, int]]
@@ -160,6 +162,7 @@ class MultiWorld():
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
+        self.memory_usage = {}
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -449,6 +452,26 @@ class MultiWorld():
     def get_items(self) -> List[Item]:
         return [loc.item for loc in self.get_filled_locations()] + self.itempool
 
+    def release_logic(self) -> None:
+        """
+        Drops access rules, connections between regions and cached reachability, for when output is done and nothing
+        queries logic anymore. Regions, locations and their items are kept, but nothing can be reached afterwards.
+        """
+        for location in self.get_locations():
+            # fall back to the class defaults, which don't hold on to any world data
+            for rule in ("access_rule", "item_rule", "always_allow"):
+                location.__dict__.pop(rule, None)
+        for region in self.get_regions():
+            region.entrances = []
+            region.exits.clear()  # also removes them from the entrance cache
+        self.indirect_connections.clear()
+        self.__dict__.pop("_all_state", None)
+        for player in self.state.reachable_regions:
+            self.state.reachable_regions[player].clear()
+            self.state.blocked_connections[player].clear()
+            self.state.stale[player] = True
+        self.state.path.clear()
+
     def find_item_locations(self, item: str, player: int, resolve_group_locations: bool = False) -> List[Location]:
         if resolve_group_locations:
             player_groups = self.get_player_groups(player)
@@ -1416,6 +1439,25 @@ class EntranceInfo(TypedDict, total=False):
     direction: str
 
 
+class SpoilerPlayerIndex(TypedDict):
+    name: str
+    game: str
+    entrances: List[EntranceInfo]
+    starting_items: List[str]
+    locations: Dict[str, Optional[Tuple[str, int]]]
+    """location name to item name and the player it is for, or None for empty locations"""
+
+
+class SpoilerIndex(TypedDict):
+    version: int
+    seed: str
+    players: Dict[str, SpoilerPlayerIndex]
+    """keyed by player as a string, like json objects are"""
+    playthrough: Dict[str, Union[List[str], Dict[str, str]]]
+    unreachables: List[str]
+    paths: Dict[str, List[Union[Tuple[str, str], Tuple[str, None]]]]
+
+
 class Spoiler:
     multiworld: MultiWorld
     hashes: Dict[int, str]
@@ -1607,6 +1649,13 @@ class Spoiler:
                 display_name = getattr(option_obj, "display_name", option_key)
                 outfile.write(f"{display_name + ':':33}{res.current_option_name}\n")
 
+        def write_lines(lines: Iterable[str]) -> None:
+            """Writes lines separated by newlines, without joining them into one large string first."""
+            for index, line in enumerate(lines):
+                if index:
+                    outfile.write("\n")
+                outfile.write(line)
+
         with open(filename, 'w', encoding="utf-8-sig") as outfile:
             outfile.write(
                 'Archipelago Version %s  -  Seed: %s\n\n' % (
@@ -1628,11 +1677,11 @@ class Spoiler:
 
             if self.entrances:
                 outfile.write('\n\nEntrances:\n\n')
-                outfile.write('\n'.join(['%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
-                                                         if self.multiworld.players > 1 else '', entry['entrance'],
-                                                         '<=>' if entry['direction'] == 'both' else
-                                                         '<=' if entry['direction'] == 'exit' else '=>',
-                                                         entry['exit']) for entry in self.entrances.values()]))
+                write_lines('%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
+                                            if self.multiworld.players > 1 else '', entry['entrance'],
+                                            '<=>' if entry['direction'] == 'both' else
+                                            '<=' if entry['direction'] == 'exit' else '=>',
+                                            entry['exit']) for entry in self.entrances.values())
 
             AutoWorld.call_all(self.multiworld, "write_spoiler", outfile)
 
@@ -1642,38 +1691,60 @@ class Spoiler:
                                   for item in chain.from_iterable(self.multiworld.precollected_items.values())]
             if precollected_items:
                 outfile.write("\n\nStarting Items:\n\n")
-                outfile.write("\n".join([item for item in precollected_items]))
+                write_lines(precollected_items)
 
-            locations = [(str(location), str(location.item) if location.item is not None else "Nothing")
-                         for location in self.multiworld.get_locations() if location.show_in_spoiler]
             outfile.write('\n\nLocations:\n\n')
-            outfile.write('\n'.join(
-                ['%s: %s' % (location, item) for location, item in locations]))
+            write_lines('%s: %s' % (location, location.item if location.item is not None else "Nothing")
+                        for location in self.multiworld.get_locations() if location.show_in_spoiler)
 
             outfile.write('\n\nPlaythrough:\n\n')
-            outfile.write('\n'.join(['%s: {\n%s\n}' % (sphere_nr, '\n'.join(
+            write_lines('%s: {\n%s\n}' % (sphere_nr, '\n'.join(
                 [f"  {location}: {item}" for (location, item) in sphere.items()] if isinstance(sphere, dict) else
-                [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items()]))
+                [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items())
             if self.unreachables:
                 outfile.write('\n\nUnreachable Progression Items:\n\n')
-                outfile.write(
-                    '\n'.join(['%s: %s' % (unreachable.item, unreachable) for unreachable in self.unreachables]))
+                write_lines('%s: %s' % (unreachable.item, unreachable) for unreachable in self.unreachables)
 
             if self.paths:
                 outfile.write('\n\nPaths:\n\n')
-                path_listings: List[str] = []
-                for location, path in sorted(self.paths.items()):
-                    path_lines: List[str] = []
-                    for region, exit in path:
-                        if exit is not None:
-                            path_lines.append("{} -> {}".format(region, exit))
-                        else:
-                            path_lines.append(region)
-                    path_listings.append("{}\n        {}".format(location, "\n   =>   ".join(path_lines)))
-
-                outfile.write('\n'.join(path_listings))
+                write_lines("{}\n        {}".format(location, "\n   =>   ".join(
+                    "{} -> {}".format(region, exit) if exit is not None else region for region, exit in path))
+                    for location, path in sorted(self.paths.items()))
             AutoWorld.call_all(self.multiworld, "write_spoiler_end", outfile)
 
+    def get_index(self) -> SpoilerIndex:
+        """Returns what the spoiler lists in a structure that tools can look up players and locations in."""
+        multiworld = self.multiworld
+        players: Dict[str, SpoilerPlayerIndex] = {}
+        for player in multiworld.player_ids:
+            players[str(player)] = {
+                "name": multiworld.get_player_name(player),
+                "game": multiworld.game[player],
+                "entrances": [],
+                "starting_items": [item.name for item in multiworld.precollected_items[player]],
+                "locations": {},
+            }
+        for (_, _, player), entry in self.entrances.items():
+            players[str(player)]["entrances"].append(
+                {"entrance": entry["entrance"], "exit": entry["exit"], "direction": entry["direction"]})
+        for location in multiworld.get_locations():
+            if location.show_in_spoiler and str(location.player) in players:
+                players[str(location.player)]["locations"][location.name] = \
+                    [location.item.name, location.item.player] if location.item else None
+        return {
+            "version": 1,
+            "seed": multiworld.seed_name,
+            "players": players,
+            "playthrough": self.playthrough,
+            "unreachables": sorted(str(location) for location in self.unreachables),
+            "paths": {location: [list(step) for step in path] for location, path in sorted(self.paths.items())},
+        }
+
+    def to_index_file(self, filename: str) -> None:
+        import json
+        with open(filename, "w", encoding="utf-8") as outfile:
+            json.dump(self.get_index(), outfile, separators=(",", ":"))
+
 
 class Tutorial(NamedTuple):
     """Class to build website tutorial pages from a .md file in the world's /docs folder. Order is as follows.
@@ -23,7 +23,8 @@ if __name__ == "__main__":
 
 from MultiServer import CommandProcessor
 from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
-                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType)
+                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType,
+                      get_items_checksum)
 from Utils import Version, stream_input, async_start
 from worlds import network_data_package, AutoWorldRegister
 import os
@@ -298,6 +299,9 @@ class CommonContext:
     locations_checked: typing.Set[int]  # local state
     locations_scouted: typing.Set[int]
     items_received: typing.List[NetworkItem]
+    resume_items: typing.List[NetworkItem]  # items_received of the last connection, see send_connect
+    resume_items_source: typing.Tuple[typing.Optional[str], typing.Optional[str]]  # server address and slot name
+    resume_items_offered: bool
     missing_locations: typing.Set[int]  # server state
     checked_locations: typing.Set[int]  # server state
     server_locations: typing.Set[int]  # all locations the server knows of, missing_location | checked_locations
@@ -337,6 +341,9 @@ class CommonContext:
         self.locations_checked = set()  # local state
         self.locations_scouted = set()
         self.items_received = []
+        self.resume_items = []
+        self.resume_items_source = (None, None)
+        self.resume_items_offered = False
         self.missing_locations = set()  # server state
         self.checked_locations = set()  # server state
         self.server_locations = set()  # all locations the server knows of, missing_location | checked_locations
@@ -360,7 +367,10 @@ class CommonContext:
 
         self.jsontotextparser = JSONtoTextParser(self)
         self.rawjsontotextparser = RawJSONtoTextParser(self)
-        self.update_data_package(network_data_package)
+        # other games are added once the server reports which are being played, see prepare_data_package
+        games_packages = network_data_package["games"]
+        self.update_data_package({"games": {game: games_packages[game] for game in ("Archipelago", self.game)
+                                            if game in games_packages}})
 
         # execution
         self.keep_alive_task = asyncio.create_task(keep_alive(self), name="Bouncy")
@@ -387,6 +397,10 @@ class CommonContext:
         self.reset_server_state()
 
     def reset_server_state(self):
+        if self.slot is not None and self.items_received:
+            self.resume_items = self.items_received
+            self.resume_items_source = (self.server_address, self.auth)
+        self.resume_items_offered = False
         self.auth = None
         self.slot = None
         self.team = None
@@ -454,6 +468,13 @@ class CommonContext:
             'tags': self.tags, 'items_handling': self.items_handling,
             'uuid': Utils.get_unique_identifier(), 'game': self.game, "slot_data": self.want_slot_data,
         }
+        if self.resume_items_source != (self.server_address, self.auth):
+            self.resume_items = []  # items of another server or slot
+        if self.resume_items:
+            # lets the server only send items that were received since the last connection
+            payload["items_index"] = len(self.resume_items)
+            payload["items_checksum"] = get_items_checksum(self.resume_items)
+            self.resume_items_offered = True
         if kwargs:
             payload.update(kwargs)
         await self.send_msgs([payload])
@@ -915,6 +936,10 @@ async def process_server_cmd(ctx: CommonContext, args: dict):
         ctx.hint_points = args.get("hint_points", 0)
         ctx.consume_players_package(args["players"])
         ctx.stored_data_notification_keys.add(f"_read_hints_{ctx.team}_{ctx.slot}")
+        if ctx.resume_items_offered:
+            # the server continues after these, or starts over with index 0 if they don't match
+            ctx.items_received = ctx.resume_items
+            ctx.resume_items_offered = False
         msgs = []
         if ctx.locations_checked:
             msgs.append({"cmd": "LocationChecks",
@@ -949,7 +974,8 @@ async def process_server_cmd(ctx: CommonContext, args: dict):
         if start_index == 0:
             ctx.items_received = []
         elif start_index != len(ctx.items_received):
-            sync_msg = [{'cmd': 'Sync'}]
+            sync_msg = [{'cmd': 'Sync', "items_index": len(ctx.items_received),
+                         "items_checksum": get_items_checksum(ctx.items_received)}]
             if ctx.locations_checked:
                 sync_msg.append({"cmd": "LocationChecks",
                                  "locations": list(ctx.locations_checked)})
@@ -52,6 +52,9 @@ def mystery_argparse():
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--memory_profile", action="store_true",
+                        help="Record memory allocated by each world and write a breakdown next to the spoiler. "
+                             "Slows down generation.")
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -162,6 +165,7 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     erargs.outputpath = args.outputpath
     erargs.skip_prog_balancing = args.skip_prog_balancing
     erargs.skip_output = args.skip_output
+    erargs.memory_profile = args.memory_profile
     erargs.name = {}
     erargs.csv_output = args.csv_output
 
@@ -540,6 +544,7 @@ if __name__ == '__main__':
     confirmation = atexit.register(input, "Press enter to close.")
     erargs, seed = main()
     from Main import main as ERmain
+    erargs.release_logic = True  # the multiworld is only kept to check for leaks
     multiworld = ERmain(erargs, seed)
     if __debug__:
         import gc
@@ -373,7 +373,9 @@ def main(args: Optional[Union[argparse.Namespace, dict]] = None):
 
     if args["update_settings"]:
         update_settings()
-    if "file" in args:
+    if args.get("profile_startup"):
+        profile_startup(args.get("component"))
+    elif "file" in args:
         run_component(args["component"], args["file"], *args["args"])
     elif "component" in args:
         run_component(args["component"], *args["args"])
@@ -381,6 +383,26 @@ def main(args: Optional[Union[argparse.Namespace, dict]] = None):
         run_gui()
 
 
+def profile_startup(component: Optional[Component] = None):
+    """Log import times of the module starting component, or of all components if none is given."""
+    from StartupProfiler import get_component_module, profile_startup as profile_module
+
+    modules = {}
+    for c in [component] if component else components:
+        module = get_component_module(c)
+        if module:
+            modules.setdefault(module, c)
+        else:
+            logging.warning(f"Could not determine the module starting {c}")
+    for module, c in modules.items():
+        try:
+            profile = profile_module(module)
+        except RuntimeError as e:
+            logging.error(f"{c}: {e}")
+        else:
+            logging.info(f"{c}: {profile.format()}")
+
+
 if __name__ == '__main__':
     init_logging('Launcher')
     Utils.freeze_support()
@@ -392,6 +414,9 @@ if __name__ == '__main__':
     run_group = parser.add_argument_group("Run")
     run_group.add_argument("--update_settings", action="store_true",
                            help="Update host.yaml and exit.")
+    run_group.add_argument("--profile-startup", action="store_true",
+                           help="Instead of running the component, report how long each module and world takes to "
+                                "import when starting it. Profiles all components if none is given.")
     run_group.add_argument("Patch|Game|Component|url", type=str, nargs="?",
                            help="Pass either a patch file, a generated game, the component name to run, or a url to "
                                 "connect with.")
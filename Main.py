@@ -5,9 +5,10 @@ import os
 import pickle
 import tempfile
 import time
+import tracemalloc
 import zipfile
 import zlib
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Dict, List, Optional, Set, Tuple, Type, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
@@ -31,6 +32,13 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         output_path.cached_path = args.outputpath
 
     start = time.perf_counter()
+    # not set by callers building their own arguments
+    memory_profile: bool = getattr(args, "memory_profile", False)
+    # only for callers that don't use the returned multiworld, as nothing can be reached in it afterwards
+    release_logic: bool = getattr(args, "release_logic", False)
+    if memory_profile:
+        # slows down generation, but records how much memory each world's methods allocate
+        tracemalloc.start()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
 
@@ -217,6 +225,9 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     multiworld.random.passthrough = False
 
     if args.skip_output:
+        if memory_profile:
+            logger.info(get_memory_profile(multiworld))
+            tracemalloc.stop()
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -227,14 +238,26 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+        # output is written after dropping the logic if no world needs it anymore, lowering peak memory
+        release_logic_early = release_logic and not any(
+            uses_logic_in_output(world_type) for world_type in {type(world) for world in multiworld.worlds.values()})
+
+        # memory can only be attributed to a world while no other world runs at the same time
+        workers = 1 if memory_profile else len(output_players) + 2
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
-            for player in output_players:
-                # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+            output_file_futures: List[concurrent.futures.Future] = []
+
+            def submit_output() -> None:
+                output_file_futures.append(pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir))
+                for player in output_players:
+                    # skip starting a thread for methods that say "pass".
+                    output_file_futures.append(
+                        pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+
+            if not release_logic_early:
+                submit_output()
 
             # collect ER hint info
             er_hint_data: Dict[int, Dict[int, str]] = {}
@@ -351,18 +374,39 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 else:
                     logger.warning("Location Accessibility requirements not fulfilled.")
 
+            if release_logic_early:
+                output_file_futures[-1].result()  # multidata, with its spheres
+                if args.spoiler > 1:
+                    logger.info('Calculating playthrough.')
+                    multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+                # the spoiler only needs the playthrough, entrances and locations from here on
+                multiworld.release_logic()
+                submit_output()
+
             # retrieve exceptions via .result() if they occurred.
             for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
 
-        if args.spoiler > 1:
+        if args.spoiler > 1 and not release_logic_early:
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            multiworld.spoiler.to_index_file(os.path.join(temp_dir, '%s_Spoiler.json' % outfilebase))
+
+        if release_logic and not release_logic_early:
+            # spheres, multidata and spoiler are done, so rule closures and the region graph are no longer needed
+            multiworld.release_logic()
+
+        if memory_profile:
+            memory_report = get_memory_profile(multiworld)
+            tracemalloc.stop()
+            logger.info(memory_report)
+            with open(os.path.join(temp_dir, f"{outfilebase}_Memory.log"), "w", encoding="utf-8") as f:
+                f.write(memory_report)
 
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
@@ -373,3 +417,28 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+def uses_logic_in_output(world_type: Type[AutoWorld.World]) -> bool:
+    """Whether a world may query logic while writing output or the spoiler, see World.logic_used_in_output."""
+    if world_type.logic_used_in_output is not None:
+        return world_type.logic_used_in_output
+    return any(getattr(world_type, method, None) is not getattr(AutoWorld.World, method, None)
+               for method in ("generate_output", "stage_generate_output", "write_spoiler_header",
+                              "stage_write_spoiler_header", "write_spoiler", "stage_write_spoiler",
+                              "write_spoiler_end", "stage_write_spoiler_end"))
+
+
+def get_memory_profile(multiworld: MultiWorld) -> str:
+    """Formats peak memory allocated per world, with the methods that allocated the most."""
+    def mib(size: int) -> str:
+        return f"{size / 1024 / 1024:.1f} MiB"
+
+    lines = ["Memory by world (peak allocated during a single method, retained after all methods):"]
+    for player, usage in sorted(multiworld.memory_usage.items(),
+                                key=lambda player_usage: -max(peak for _, peak in player_usage[1].values())):
+        peak_method, (_, peak) = max(usage.items(), key=lambda method_usage: method_usage[1][1])
+        retained = sum(retained for retained, _ in usage.values())
+        lines.append(f"  {multiworld.get_player_name(player)} ({multiworld.game[player]}): {mib(peak)} peak in "
+                     f"{peak_method}, {mib(retained)} retained")
+    return "\n".join(lines)
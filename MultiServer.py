@@ -16,6 +16,7 @@ import operator
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -28,6 +29,8 @@ ModuleUpdate.update()
 
 if typing.TYPE_CHECKING:
     import ssl
+    from NetworkCapture import NetworkRecorder
+    from ServerMetrics import RoomMetrics
 
 import websockets
 import colorama
@@ -41,7 +44,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, Hint, HintStatus
+    SlotType, LocationStore, LocationBitmap, ReceivedItemsLog, Hint, HintStatus, get_items_checksum
 from BaseClasses import ItemClassification
 
 min_client_version = Version(0, 1, 6)
@@ -111,12 +114,224 @@ modify_functions = {
 }
 
 
+def merge_encoded_msgs(msgs: typing.List[str]) -> str:
+    """Joins encoded lists of commands into a single encoded list."""
+    if len(msgs) == 1:
+        return msgs[0]
+    return "[" + ",".join(msg[1:-1] for msg in msgs if len(msg) > 2) + "]"
+
+
+def get_encoded_size(msg: str) -> int:
+    return len(msg) if msg.isascii() else len(msg.encode("utf-8"))
+
+
+def merge_encoded_msgs_limited(msgs: typing.List[str], frame_size: int) -> typing.Iterator[str]:
+    """Joins encoded lists of commands into as few encoded lists as possible, each of at most frame_size bytes.
+    A single list that is larger than that on its own is kept as is."""
+    batch: typing.List[str] = []
+    batch_size = 2  # brackets of the merged list
+    for msg in msgs:
+        size = get_encoded_size(msg) - 1  # without its brackets, but with a comma
+        if batch and batch_size + size > frame_size:
+            yield merge_encoded_msgs(batch)
+            batch = []
+            batch_size = 2
+        batch.append(msg)
+        batch_size += size
+    if batch:
+        yield merge_encoded_msgs(batch)
+
+
 def get_saving_second(seed_name: str, interval: int = 60) -> int:
     # save at expected times so other systems using savegame can expect it
     # represents the target second of the auto_save_interval at which to save
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+JournalRecord = typing.Tuple[str, str, typing.Any, typing.Any]
+"""(operation, save field, key, value), see apply_journal_record"""
+
+
+def apply_journal_record(save_data: dict, record: JournalRecord) -> None:
+    operation, field, key, value = record
+    container = save_data.setdefault(field, {})  # fields added later are missing from older saves
+    if operation == "set":
+        container[key] = value
+    elif operation == "delete":
+        container.pop(key, None)
+    elif operation == "union":
+        container.setdefault(key, set()).update(value)
+    elif operation == "splice":
+        container[key].splice(*value)  # see NetUtils.ReceivedItemsLog.splice
+    else:
+        raise ValueError(f"Unknown journal operation {operation}")
+
+
+class SaveJournal:
+    """Append-only log of changes to a save, written to disk by a background thread that batches fsyncs.
+    Each snapshot of the save starts a new generation of journal files, older ones are removed once it is written."""
+    record_header = struct.Struct("<I")
+
+    def __init__(self, save_filename: str, generation: int, flush_interval: float = 1.0):
+        self.save_filename = save_filename
+        self.generation = generation
+        self.flush_interval = flush_interval
+        self._pending: typing.List[bytes] = []
+        self._pending_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._file = open(self.get_path(save_filename, generation), "ab")
+        self._writer = threading.Thread(target=self._write_regularly, daemon=True, name="save journal")
+        self._writer.start()
+
+    @staticmethod
+    def get_path(save_filename: str, generation: int) -> str:
+        return f"{save_filename}.{generation}.journal"
+
+    @staticmethod
+    def get_generations(save_filename: str) -> typing.List[int]:
+        import glob
+        import os
+        generations = []
+        for path in glob.glob(glob.escape(save_filename) + ".*.journal"):
+            generation = os.path.basename(path)[len(os.path.basename(save_filename)) + 1:-len(".journal")]
+            if generation.isdigit():
+                generations.append(int(generation))
+        return sorted(generations)
+
+    @classmethod
+    def read(cls, save_filename: str, generation: int) -> typing.Iterator[JournalRecord]:
+        """Yields the records of generation and all later ones in order.
+        A record cut short by a crash ends its journal file."""
+        for file_generation in cls.get_generations(save_filename):
+            if file_generation < generation:
+                continue
+            with open(cls.get_path(save_filename, file_generation), "rb") as f:
+                data = f.read()
+            position = 0
+            while position + cls.record_header.size <= len(data):
+                size, = cls.record_header.unpack_from(data, position)
+                position += cls.record_header.size
+                if position + size > len(data):
+                    break
+                yield restricted_loads(data[position:position + size])
+                position += size
+
+    def append(self, record: JournalRecord) -> None:
+        # pickled right away, so later changes to mutable values don't end up in the record
+        data = pickle.dumps(record)
+        with self._pending_lock:
+            self._pending.append(self.record_header.pack(len(data)) + data)
+        self._wakeup.set()
+
+    def _write_pending(self) -> None:
+        """Writes and syncs pending records, has to be called with _file_lock held."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            import os
+            self._file.write(b"".join(pending))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _write_regularly(self) -> None:
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._file_lock:
+                if self._closed:
+                    break
+                self._write_pending()
+            time.sleep(self.flush_interval)  # everything appended meanwhile shares the next fsync
+
+    def rotate(self) -> int:
+        """Starts the next generation and returns it. Changes before this are expected to be in the next snapshot."""
+        with self._file_lock:
+            self._write_pending()
+            self._file.close()
+            self.generation += 1
+            self._file = open(self.get_path(self.save_filename, self.generation), "ab")
+        return self.generation
+
+    def remove_before(self, generation: int) -> None:
+        import os
+        for file_generation in self.get_generations(self.save_filename):
+            if file_generation < generation:
+                os.remove(self.get_path(self.save_filename, file_generation))
+
+    def close(self) -> None:
+        with self._file_lock:
+            self._write_pending()
+            self._closed = True
+            self._file.close()
+        self._wakeup.set()
+
+
+class LocationChecks(dict):
+    """(team, slot) -> checked locations of that slot, kept as bitmaps over the locations of the loaded multidata.
+    Assigned sets and bitmap ints are converted."""
+
+    def __init__(self, ctx: Context):
+        super().__init__()
+        self.ctx = weakref.ref(ctx)
+
+    def __missing__(self, key: team_slot) -> LocationBitmap:
+        checks = LocationBitmap(self.ctx().locations, key[1])
+        super().__setitem__(key, checks)
+        return checks
+
+    def __setitem__(self, key: team_slot, checks: typing.Union[LocationBitmap, int, typing.Iterable[int]]) -> None:
+        locations = self.ctx().locations
+        if isinstance(checks, int):
+            checks = LocationBitmap(locations, key[1], checks)
+        elif not isinstance(checks, LocationBitmap) or checks.store is not locations:
+            checks = LocationBitmap(locations, key[1], locations.locations_to_bitmap(key[1], checks))
+        super().__setitem__(key, checks)
+
+
+class HintSet(typing.MutableSet[Hint]):
+    """Hints concerning a slot, keyed by (finding_player, location) as each location is hinted only once.
+    Behaves like a set of hints, adding a hint replaces the one for its location."""
+    __slots__ = ("hints",)
+
+    def __init__(self, hints: typing.Iterable[Hint] = ()):
+        self.hints: typing.Dict[typing.Tuple[int, int], Hint] = \
+            {(hint.finding_player, hint.location): hint for hint in hints}
+
+    @classmethod
+    def _from_iterable(cls, it: typing.Iterable[Hint]) -> typing.Set[Hint]:
+        return set(it)
+
+    def __contains__(self, hint: object) -> bool:
+        if not isinstance(hint, Hint):
+            return False
+        return self.hints.get((hint.finding_player, hint.location)) == hint
+
+    def __iter__(self) -> typing.Iterator[Hint]:
+        return iter(self.hints.values())
+
+    def __len__(self) -> int:
+        return len(self.hints)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self.hints.values())})"
+
+    def get(self, finding_player: int, location: int) -> typing.Optional[Hint]:
+        return self.hints.get((finding_player, location))
+
+    def add(self, hint: Hint) -> None:
+        self.hints[hint.finding_player, hint.location] = hint
+
+    def discard(self, hint: Hint) -> None:
+        if hint in self:
+            del self.hints[hint.finding_player, hint.location]
+
+    def update(self, hints: typing.Iterable[Hint]) -> None:
+        for hint in hints:
+            self.add(hint)
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str] = []
@@ -134,6 +349,14 @@ class Client(Endpoint):
         self.tags = []
         self.messageprocessor = client_message_processor(ctx, self)
         self.ctx = weakref.ref(ctx)
+        # encoded command lists waiting to be sent as one frame, see Context.queue_encoded_msgs
+        self.outbound: typing.List[str] = []
+        self.outbound_size = 0
+        self.outbound_writing = False
+
+    @property
+    def tracker_only(self) -> bool:
+        return self.auth and self.no_locations
 
     @property
     def items_handling(self):
@@ -159,6 +382,98 @@ class Client(Endpoint):
 
 team_slot = typing.Tuple[int, int]
 
+# (game, checksum) -> encoded data package, least recently used first, see Context.get_encoded_game_package
+encoded_game_packages: "collections.OrderedDict[typing.Tuple[str, str], str]" = collections.OrderedDict()
+encoded_game_packages_limit = 256
+
+
+class NameTable(dict):
+    """Read-only id -> name lookup, see GameNameTables. Unknown ids get a placeholder name, which is not stored."""
+    __slots__ = ("unknown",)
+
+    def __init__(self, unknown: str, names: typing.Optional[typing.Mapping[int, str]] = None):
+        super().__init__(names or ())
+        self.unknown = unknown
+
+    def __missing__(self, key: int) -> str:
+        return self.unknown.format(key)
+
+    def _read_only(self, *args: typing.Any, **kwargs: typing.Any) -> typing.NoReturn:
+        raise TypeError(f"{self.__class__.__name__} is shared between rooms and read-only, copy it to modify it.")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+
+unknown_item_name = "Unknown item (ID:{})"
+unknown_location_name = "Unknown location (ID:{})"
+
+
+class GameNameTables:
+    """Lookups derived from the data package of a game, shared by all contexts of a process loading the same package,
+    see get_game_name_tables. None of the tables may be modified, only fuzzy matchers are added on first use."""
+    __slots__ = ("item_name_to_id", "location_name_to_id", "item_names", "location_names", "all_item_and_group_names",
+                 "all_location_and_group_names", "name_matchers", "__weakref__")
+
+    def __init__(self, game_package: typing.Dict[str, typing.Any],
+                 item_name_groups: typing.Mapping[str, typing.Collection[str]],
+                 location_name_groups: typing.Mapping[str, typing.Collection[str]],
+                 archipelago_package: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        self.item_name_to_id: typing.Dict[str, int] = game_package["item_name_to_id"]
+        self.location_name_to_id: typing.Dict[str, int] = game_package["location_name_to_id"]
+        item_names = {item_id: item_name for item_name, item_id in self.item_name_to_id.items()}
+        location_names = {location_id: location_name
+                          for location_name, location_id in self.location_name_to_id.items()}
+        if archipelago_package:
+            # Add Archipelago items and locations to each data package.
+            item_names.update((item_id, item_name)
+                              for item_name, item_id in archipelago_package["item_name_to_id"].items())
+            location_names.update((location_id, location_name)
+                                  for location_name, location_id in archipelago_package["location_name_to_id"].items())
+        self.item_names = NameTable(unknown_item_name, item_names)
+        self.location_names = NameTable(unknown_location_name, location_names)
+        self.all_item_and_group_names = frozenset(self.item_name_to_id).union(item_name_groups)
+        self.all_location_and_group_names = frozenset(self.location_name_to_id).union(location_name_groups)
+        self.name_matchers: typing.Dict[str, Utils.FuzzyMatcher] = {}
+
+    def get_name_matcher(self, names: str) -> Utils.FuzzyMatcher:
+        """Returns a fuzzy matcher for one of the name collections, built on first use.
+        names is "items" or "locations" for names of the data package, "items_and_groups" or "locations_and_groups"
+        to include group names."""
+        matcher = self.name_matchers.get(names)
+        if matcher is None:
+            collection = {
+                "items": self.item_name_to_id,
+                "locations": self.location_name_to_id,
+                "items_and_groups": self.all_item_and_group_names,
+                "locations_and_groups": self.all_location_and_group_names,
+            }[names]
+            matcher = self.name_matchers[names] = Utils.FuzzyMatcher(collection)
+        return matcher
+
+
+# (game, checksum, checksum of the Archipelago package merged in) -> tables of contexts using them
+game_name_tables: "weakref.WeakValueDictionary[typing.Tuple[str, str, typing.Optional[str]], GameNameTables]" = \
+    weakref.WeakValueDictionary()
+
+
+def get_game_name_tables(game: str, game_package: typing.Dict[str, typing.Any],
+                         item_name_groups: typing.Mapping[str, typing.Collection[str]],
+                         location_name_groups: typing.Mapping[str, typing.Collection[str]],
+                         archipelago_package: typing.Optional[typing.Dict[str, typing.Any]] = None) -> GameNameTables:
+    """Returns the name tables of a data package, which the WebHost runs many contexts with in a single process.
+    Packages are told apart by checksum, so packages without one, like custom packages of old generators,
+    get tables of their own."""
+    checksum = game_package.get("checksum")
+    archipelago_checksum = archipelago_package.get("checksum") if archipelago_package else None
+    if not checksum or (archipelago_package and not archipelago_checksum):
+        return GameNameTables(game_package, item_name_groups, location_name_groups, archipelago_package)
+    key = game, checksum, archipelago_checksum
+    tables = game_name_tables.get(key)
+    if tables is None:
+        tables = game_name_tables[key] = GameNameTables(game_package, item_name_groups, location_name_groups,
+                                                        archipelago_package)
+    return tables
+
 
 class Context:
     dumper = staticmethod(encode)
@@ -176,13 +491,26 @@ class Context:
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
-    location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
+    location_checks: LocationChecks
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
-    save_version = 2
+    save_version = 5
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_coalesced_clients: typing.Dict[str, typing.Set[Client]]
+    outbound_limit: int = 16 * 1024 * 1024
+    """queued outgoing bytes per client before trackers get disconnected, 0 for no limit"""
+    outbound_frame_size: int = 1024 * 1024
+    """bytes of queued messages merged into one frame at most, the default websocket size limit of clients"""
+    stored_data_key_limit: int = 0
+    """maximum pickled size of a single data storage value in bytes, 0 for no limit"""
+    stored_data_slot_limit: int = 0
+    """maximum pickled size a slot grew data storage values by in bytes, 0 for no limit"""
+    metrics: typing.Optional[RoomMetrics] = None
+    """set by ServerMetrics.MetricsServer.add_room while metrics are served"""
+    network_capture: typing.Optional[NetworkRecorder] = None
+    """records inbound packets for replaying them, see NetworkCapture"""
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -190,11 +518,15 @@ class Context:
     item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]]
     location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
-    all_item_and_group_names: typing.Dict[str, typing.Set[str]]
-    all_location_and_group_names: typing.Dict[str, typing.Set[str]]
+    all_item_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    all_location_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    game_name_tables: typing.Dict[str, GameNameTables]
+    """shared with other contexts, see get_game_name_tables"""
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    sphere_index: typing.Dict[int, typing.Dict[int, int]]
+    """ { player: { location_id: sphere, ... } }, see get_sphere """
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
@@ -222,14 +554,19 @@ class Context:
         self.password = password
         self.server = None
         self.countdown_timer = 0
-        self.received_items = {}
+        self.received_items: typing.Dict[team_slot, ReceivedItemsLog] = {}
+        # receivers that got items since the last send_new_items flush
+        self.pending_item_receivers: typing.Set[team_slot] = set()
+        self.item_flush_handle: typing.Optional[asyncio.Handle] = None
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
-        self.location_checks = collections.defaultdict(set)
+        self.location_checks = LocationChecks(self)
         self.hint_cost = hint_cost
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
-        self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hints: typing.Dict[team_slot, HintSet] = collections.defaultdict(HintSet)
+        # (team, finding_player, location) -> current hint for that location, so checks only recheck affected hints
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], Hint] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -248,6 +585,8 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        self.save_journal: typing.Optional[SaveJournal] = None
+        self.loop: typing.Optional[asyncio.AbstractEventLoop] = None
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -256,9 +595,28 @@ class Context:
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
         self.stored_data = {}
+        self.stored_data_versions: typing.Dict[str, int] = {}
+        # only tracked if a size limit is set
+        self.stored_data_sizes: typing.Dict[str, int] = {}
+        # key -> slot -> bytes of the value charged to that slot, the ones that made it grow
+        self.stored_data_writers: typing.Dict[str, typing.Dict[team_slot, int]] = {}
+        self.stored_data_slot_sizes: typing.Dict[team_slot, int] = collections.defaultdict(int)
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        # team -> game or tag -> authenticated clients, for routing Bounce, see index_bounce_routes
+        self.bounce_game_routes: typing.Dict[int, typing.Dict[str, typing.Set[Client]]] = \
+            collections.defaultdict(lambda: collections.defaultdict(set))
+        self.bounce_tag_routes: typing.Dict[int, typing.Dict[str, typing.Set[Client]]] = \
+            collections.defaultdict(lambda: collections.defaultdict(set))
+        # tag -> minimum seconds between bounces with that tag per team
+        self.bounce_rate_limits: typing.Dict[str, float] = {}
+        self.last_tagged_bounce: typing.Dict[typing.Tuple[int, str], float] = {}
+        self.stored_data_coalesced_clients = collections.defaultdict(weakref.WeakSet)
+        # key -> latest SetReply for coalesced subscribers, sent once per event loop iteration
+        self.pending_set_replies: typing.Dict[str, dict] = {}
+        self.set_reply_flush_handle: typing.Optional[asyncio.Handle] = None
         self.read_data = {}
         self.spheres = []
+        self.sphere_index = {}
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -267,10 +625,9 @@ class Context:
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
         self.all_location_and_group_names = {}
-        self.item_names = collections.defaultdict(
-            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})'))
-        self.location_names = collections.defaultdict(
-            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})'))
+        self.game_name_tables = {}
+        self.item_names = collections.defaultdict(lambda: NameTable(unknown_item_name))
+        self.location_names = collections.defaultdict(lambda: NameTable(unknown_location_name))
         self.non_hintable_names = collections.defaultdict(frozenset)
 
         self._load_game_data()
@@ -278,39 +635,53 @@ class Context:
     # Data package retrieval
     def _load_game_data(self):
         import worlds
-        self.gamespackage = worlds.network_data_package["games"]
-
-        self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
-                                 worlds.AutoWorldRegister.world_types.items()}
-        self.location_name_groups = {world_name: world.location_name_groups for world_name, world in
-                                     worlds.AutoWorldRegister.world_types.items()}
-        for world_name, world in worlds.AutoWorldRegister.world_types.items():
-            self.non_hintable_names[world_name] = world.hint_blacklist
-
-        for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+        # served from the world manifest, so lazily loaded worlds don't have to be imported
+        for world_name, game_manifest in worlds.game_manifests.items():
+            self.non_hintable_names[world_name] = frozenset(game_manifest["hint_blacklist"])
+        # data packages are only added for the games of the loaded multidata, see load
+
+    def _add_game_data(self, game_name: str, game_package: typing.Dict[str, typing.Any]):
+        self.item_name_groups[game_name] = game_package.get("item_name_groups", {})
+        self.location_name_groups[game_name] = game_package.get("location_name_groups", {})
+        # remove groups from data sent to clients
+        self.gamespackage[game_name] = {key: value for key, value in game_package.items()
+                                        if key not in ("item_name_groups", "location_name_groups")}
 
     def _init_game_data(self):
+        archipelago_package = self.gamespackage.get("Archipelago")
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
                 self.checksums[game_name] = game_package["checksum"]
-            for item_name, item_id in game_package["item_name_to_id"].items():
-                self.item_names[game_name][item_id] = item_name
-            for location_name, location_id in game_package["location_name_to_id"].items():
-                self.location_names[game_name][location_id] = location_name
-            self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
-            self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
-
-        archipelago_item_names = self.item_names["Archipelago"]
-        archipelago_location_names = self.location_names["Archipelago"]
-        for game in [game_name for game_name in self.gamespackage if game_name != "Archipelago"]:
-            # Add Archipelago items and locations to each data package.
-            self.item_names[game].update(archipelago_item_names)
-            self.location_names[game].update(archipelago_location_names)
+            tables = self.game_name_tables[game_name] = get_game_name_tables(
+                game_name, game_package, self.item_name_groups.get(game_name, {}),
+                self.location_name_groups.get(game_name, {}),
+                None if game_name == "Archipelago" else archipelago_package)
+            self.item_names[game_name] = tables.item_names
+            self.location_names[game_name] = tables.location_names
+            self.all_item_and_group_names[game_name] = tables.all_item_and_group_names
+            self.all_location_and_group_names[game_name] = tables.all_location_and_group_names
+
+    def get_encoded_game_package(self, game: str) -> str:
+        """Returns the JSON of a game's data package. Packages are encoded once per (game, checksum) and shared
+        between contexts, which the WebHost runs many of in a single process."""
+        game_package = self.gamespackage[game]
+        checksum = game_package.get("checksum")
+        if not checksum:
+            return self.dumper(game_package)  # can't be told apart from other versions of the package
+        key = game, checksum
+        encoded = encoded_game_packages.get(key)
+        if encoded is None:
+            encoded = encoded_game_packages[key] = self.dumper(game_package)
+            if len(encoded_game_packages) > encoded_game_packages_limit:
+                encoded_game_packages.popitem(last=False)
+        else:
+            encoded_game_packages.move_to_end(key)
+        return encoded
+
+    def get_encoded_data_package(self, games: typing.Iterable[str]) -> str:
+        """Returns an encoded DataPackage message for games, identical to encoding it in send_msgs."""
+        encoded_games = ",".join(f"{self.dumper(game)}:{self.get_encoded_game_package(game)}" for game in games)
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{encoded_games}}}}}}}]'
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -318,55 +689,83 @@ class Context:
     def location_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
+    def get_name_matcher(self, game: str, names: str) -> Utils.FuzzyMatcher:
+        """Returns a fuzzy matcher for one of the name collections of a known game, see GameNameTables."""
+        return self.game_name_tables[game].get_name_matcher(names)
+
     # General networking
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
-        if not endpoint.socket or not endpoint.socket.open:
-            return False
-        msg = self.dumper(msgs)
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception(f"Exception during send_msgs, could not send {msg}")
-            await self.disconnect(endpoint)
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+        return self.queue_msgs(endpoint, msgs)
 
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        return self.queue_encoded_msgs(endpoint, msg)
+
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        self.queue_broadcast(endpoints, msg)
+        return True
+
+    def queue_msgs(self, endpoint: Client, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception("Exception during send_encoded_msgs")
-            await self.disconnect(endpoint)
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+        return self.queue_encoded_msgs(endpoint, self.dumper(msgs))
 
-    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
-        sockets = []
+    def queue_broadcast(self, endpoints: typing.Iterable[Client], msg: str) -> None:
         for endpoint in endpoints:
-            if endpoint.socket and endpoint.socket.open:
-                sockets.append(endpoint.socket)
-        try:
-            websockets.broadcast(sockets, msg)
-        except RuntimeError:
-            self.logger.exception("Exception during broadcast_send_encoded_msgs")
+            self.queue_encoded_msgs(endpoint, msg)
+
+    def queue_encoded_msgs(self, endpoint: Client, msg: str) -> bool:
+        """Queues an encoded list of commands for endpoint. Everything queued within one event loop iteration,
+        or while the previous frame is still being sent, goes out as a single frame."""
+        if not endpoint.socket or not endpoint.socket.open:
             return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing broadcast: {msg}")
-            return True
+        endpoint.outbound.append(msg)
+        endpoint.outbound_size += len(msg)
+        if self.outbound_limit and endpoint.outbound_size > self.outbound_limit:
+            if endpoint.tracker_only:
+                # trackers and text clients can catch up on reconnect, game clients keep everything
+                self.logger.info(f"Disconnecting {endpoint.name}, over {self.outbound_limit} queued outgoing bytes.")
+                endpoint.outbound.clear()
+                endpoint.outbound_size = 0
+                async_start(endpoint.socket.close(reason="Outgoing buffer limit exceeded"), name="close slow client")
+                return False
+            if endpoint.outbound_size - len(msg) <= self.outbound_limit:
+                self.logger.warning(f"Client of slot {endpoint.slot} has over {self.outbound_limit} queued outgoing "
+                                    f"bytes.")
+        if not endpoint.outbound_writing:
+            endpoint.outbound_writing = True
+            async_start(self.write_outbound(endpoint), name="write outbound")
+        return True
+
+    async def write_outbound(self, endpoint: Client) -> None:
+        try:
+            while endpoint.outbound:
+                queued, endpoint.outbound = endpoint.outbound, []
+                endpoint.outbound_size = 0
+                for msg in merge_encoded_msgs_limited(queued, self.outbound_frame_size):
+                    if not endpoint.socket.open:
+                        return
+                    try:
+                        await endpoint.socket.send(msg)
+                    except websockets.ConnectionClosed as e:
+                        self.logger.info(f"Could not send {len(msg)} characters to {endpoint.name}, "
+                                         f"connection closed: {e}")
+                        await self.disconnect(endpoint)
+                        return
+                    if self.metrics:
+                        self.metrics.observe_frame(msg)
+                    if self.log_network:
+                        self.logger.info(f"Outgoing message: {msg}")
+        finally:
+            endpoint.outbound_writing = False
+
+    def get_outbound_backlog(self) -> typing.Tuple[int, int]:
+        """Returns the amount of queued outgoing bytes of all clients and of the client with the most."""
+        sizes = [endpoint.outbound_size for endpoint in self.endpoints]
+        return sum(sizes), max(sizes, default=0)
 
     def broadcast_all(self, msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
-        endpoints = (endpoint for endpoint in self.endpoints if endpoint.auth)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_broadcast((endpoint for endpoint in self.endpoints if endpoint.auth), msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -374,32 +773,31 @@ class Context:
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
-        endpoints = (endpoint for endpoint in itertools.chain.from_iterable(self.clients[team].values()))
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_broadcast(itertools.chain.from_iterable(self.clients[team].values()), msgs)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_broadcast(endpoints, msgs)
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
             self.clients[endpoint.team][endpoint.slot].remove(endpoint)
+            self.unindex_bounce_routes(endpoint)
         await on_client_disconnected(self, endpoint)
 
     def notify_client(self, client: Client, text: str, additional_arguments: dict = {}):
         if not client.auth:
             return
         self.logger.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}])
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
+                                 for text in texts])
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -416,7 +814,13 @@ class Context:
             with open(multidatapath, 'rb') as f:
                 data = f.read()
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        decoded_obj = self.decompress(data)
+        import worlds
+        games_packages = worlds.network_data_package["games"]
+        for game_name in {"Archipelago", *(slot_info.game for slot_info in decoded_obj["slot_info"].values())}:
+            if game_name in games_packages:
+                self._add_game_data(game_name, games_packages[game_name])
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
     @staticmethod
@@ -457,7 +861,7 @@ class Context:
             self.player_names[0, slot_id] = slot_info.name
             self.player_name_lookup[slot_info.name] = 0, slot_id
             self.read_data[f"hints_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
-                list(self.get_rechecked_hints(local_team, local_player))
+                list(self.hints[local_team, local_player])
             self.read_data[f"client_status_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
                 self.client_game_state[local_team, local_player]
 
@@ -477,6 +881,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            self.index_hints(0, hints)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -493,12 +898,7 @@ class Context:
             if game_name in game_data_packages:
                 data = game_data_packages[game_name]
             self.logger.info(f"Loading embedded data package for game {game_name}")
-            self.gamespackage[game_name] = data
-            self.item_name_groups[game_name] = data["item_name_groups"]
-            if "location_name_groups" in data:
-                self.location_name_groups[game_name] = data["location_name_groups"]
-                del data["location_name_groups"]
-            del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
+            self._add_game_data(game_name, data)
         self._init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
@@ -507,6 +907,7 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.sphere_index = self.build_sphere_index(self.spheres)
 
     # saving
 
@@ -523,16 +924,50 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            start = time.perf_counter()
+            encoded_save, journal_generation = self.get_encoded_save()
+            compressed_save = zlib.compress(encoded_save)
+            if self.save_journal:
+                import os
+                # a crash while writing must not lose the snapshot the journal continues from
+                with open(self.save_filename + ".tmp", "wb") as f:
+                    f.write(compressed_save)
+                os.replace(self.save_filename + ".tmp", self.save_filename)
+                self.save_journal.remove_before(journal_generation)
+            else:
+                with open(self.save_filename, "wb") as f:
+                    f.write(compressed_save)
+            if self.metrics:
+                self.metrics.observe_save(time.perf_counter() - start, len(compressed_save))
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
-    def init_save(self, enabled: bool = True):
+    def get_encoded_save(self) -> typing.Tuple[bytes, int]:
+        """Pickles get_save and returns it with the journal generation that continues from it.
+        This happens on the event loop, so saving from another thread never sees changes in progress."""
+        def encode_save() -> typing.Tuple[bytes, int]:
+            save_data = self.get_save()
+            journal_generation = 0
+            if self.save_journal:
+                save_data["journal_generation"] = journal_generation = self.save_journal.rotate()
+            return pickle.dumps(save_data), journal_generation
+
+        async def encode_save_async() -> typing.Tuple[bytes, int]:
+            return encode_save()
+
+        if self.loop and self.loop.is_running():
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is not self.loop:
+                return asyncio.run_coroutine_threadsafe(encode_save_async(), self.loop).result(timeout=60)
+        return encode_save()
+
+    def init_save(self, enabled: bool = True, journal: bool = False):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
@@ -540,17 +975,68 @@ class Context:
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            save_data: typing.Optional[dict] = None
             try:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
+            try:
+                if journal:
+                    save_data = self.replay_journal(save_data)
+                if save_data:
+                    self.set_save(save_data)
+            except Exception as e:
+                self.logger.exception(e)
             self._start_async_saving()
 
+    def replay_journal(self, save_data: typing.Optional[dict]) -> typing.Optional[dict]:
+        """Applies the journaled changes made after save_data was written and starts journaling new changes."""
+        generation = save_data.get("journal_generation", 0) if save_data else 0
+        timer_fields = ("client_activity_timers", "client_connection_timers")
+        replayed = 0
+        for record in SaveJournal.read(self.save_filename, generation):
+            if save_data is None:  # stopped before the first snapshot was written
+                save_data = self.get_save()
+            if not replayed:
+                for field in timer_fields:
+                    save_data[field] = dict(save_data[field])
+                save_data["received_items"] = collections.defaultdict(
+                    ReceivedItemsLog, self.load_received_items(save_data["received_items"]))
+                # bitmaps can't be updated by union records on their own
+                location_checks = LocationChecks(self)
+                for key, checks in save_data["location_checks"].items():
+                    location_checks[key] = checks
+                save_data["location_checks"] = location_checks
+            apply_journal_record(save_data, record)
+            replayed += 1
+        if replayed:
+            for field in timer_fields:
+                save_data[field] = tuple(save_data[field].items())
+            self.logger.info(f"Replayed {replayed} journaled changes.")
+            self.save_dirty = True
+        # a new generation, as the last one may end in a record cut short by a crash
+        self.save_journal = SaveJournal(self.save_filename,
+                                        max([generation - 1, *SaveJournal.get_generations(self.save_filename)]) + 1)
+        return save_data
+
+    def journal(self, operation: str, field: str, key: typing.Any, value: typing.Any = None) -> None:
+        """Records a change to the save data, if journaling is enabled. See apply_journal_record."""
+        if self.save_journal:
+            self.save_journal.append((operation, field, key, value))
+
+    def journal_hints(self, team: int, slot: int) -> None:
+        if self.save_journal:
+            self.journal("set", "hints", (team, slot), list(self.hints[team, slot]))
+
     def _start_async_saving(self, atexit_save: bool = True):
+        if not self.loop:
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass  # started before the event loop, see server
         if not self.auto_saver_thread:
             def save_regularly():
                 # time.time() is platform dependent, so using the expensive datetime method instead
@@ -565,12 +1051,14 @@ class Context:
                         time.sleep(max(1.0, next_wakeup))
                         if self.save_dirty:
                             self.logger.debug("Saving via thread.")
-                            self._save()
+                            self.save_dirty = False  # changes made while saving are saved next time
+                            if not self._save():
+                                self.save_dirty = True
+                                self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
                     except OperationalError as e:
+                        self.save_dirty = True
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
-                    else:
-                        self.save_dirty = False
                 if not atexit_save:  # if atexit is used, that keeps a reference anyway
                     queue_gc()
 
@@ -582,14 +1070,13 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
-            "received_items": self.received_items,
+            "received_items": {key: log.to_save() for key, log in self.received_items.items()},
             "hints_used": dict(self.hints_used),
-            "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
+            "hints": {key: list(hints) for key, hints in self.hints.items() if hints},
+            "location_checks": {key: checks.bits for key, checks in self.location_checks.items()},
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -599,6 +1086,8 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
+            "stored_data_versions": self.stored_data_versions,
+            "stored_data_writers": self.stored_data_writers,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -614,9 +1103,12 @@ class Context:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
             raise Exception("This savegame is newer than the server.")
-        self.received_items = savedata["received_items"]
+        self.received_items = self.load_received_items(savedata["received_items"])
         self.hints_used.update(savedata["hints_used"])
-        self.hints.update(savedata["hints"])
+        # version 4 and older saves have sets of hints instead of lists
+        for key, hints in savedata["hints"].items():
+            self.hints[key] = HintSet(hints)
+            self.index_hints(key[0], self.hints[key])
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -626,8 +1118,12 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
+        # version 2 and older saves have sets of locations instead of bitmaps
+        for key, checks in savedata["location_checks"].items():
+            self.location_checks[key] = checks
         self.random.setstate(savedata["random_state"])
+        # hints are kept up to date from here on, see recheck_location_hints
+        self.recheck_hints()
 
         if "game_options" in savedata:
             self.hint_cost = savedata["game_options"]["hint_cost"]
@@ -645,10 +1141,30 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
-        # count items and slots from lists for items_handling = remote
+        if "stored_data_versions" in savedata:
+            self.stored_data_versions = savedata["stored_data_versions"]
+        # values from saves without writers are charged to no slot
+        if "stored_data_writers" in savedata:
+            self.stored_data_writers = savedata["stored_data_writers"]
+        if self.stored_data_key_limit or self.stored_data_slot_limit:
+            self.index_stored_data_sizes()
         self.logger.info(
-            f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
-            f'for {sum(k[2] for k in self.received_items)} players')
+            f'Loaded save file with {sum(len(log) for log in self.received_items.values())} received items '
+            f'for {len(self.received_items)} players')
+
+    @staticmethod
+    def load_received_items(saved: dict) -> typing.Dict[team_slot, ReceivedItemsLog]:
+        received_items: typing.Dict[team_slot, ReceivedItemsLog] = {}
+        for key, data in saved.items():
+            if isinstance(data, ReceivedItemsLog):  # replayed from the journal
+                received_items[key] = data
+            elif len(key) == 2:
+                received_items[key] = ReceivedItemsLog.from_save(data)
+            elif key[2]:
+                # version 3 and older saves have separate lists of items for remote and local items handling
+                team, slot, _ = key
+                received_items[team, slot] = ReceivedItemsLog.from_lists(data, saved.get((team, slot, False), []))
+        return received_items
 
     # rest
 
@@ -668,31 +1184,65 @@ class Context:
                 continue  # Check specified team only, all if team is None
             if slot != hint_slot and slot is not None:
                 continue  # Check specified slot only, all if slot is None
-            new_hints: typing.Set[Hint] = set()
-            for hint in self.hints[hint_team, hint_slot]:
+            hints = self.hints[hint_team, hint_slot]
+            modified = False
+            for hint in list(hints):
                 new_hint = hint.re_check(self, hint_team)
-                new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                hints.add(new_hint)
+                modified = True
+                self.hint_index[hint_team, new_hint.finding_player, new_hint.location] = new_hint
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
-            self.hints[hint_team, hint_slot] = new_hints
-
-    def get_rechecked_hints(self, team: int, slot: int):
+            if modified:
+                self.journal_hints(hint_team, hint_slot)
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int]) -> typing.Set[team_slot]:
+        """Refreshes only the hints for the given locations of slot, such as newly checked ones.
+        Returns each (team,slot) pair that has at least one hint modified."""
+        changed: typing.Set[team_slot] = set()
+        for location in locations:
+            hint = self.hint_index.get((team, slot, location))
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                self.replace_hint(team, player, hint, new_hint)
+                changed.add((team, player))
+            self.hint_index[team, slot, location] = new_hint
+        return changed
+
+    def index_hints(self, team: int, hints: typing.Iterable[Hint]) -> None:
+        for hint in hints:
+            self.hint_index[team, hint.finding_player, hint.location] = hint
+
+    def get_rechecked_hints(self, team: int, slot: int) -> HintSet:
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
+    @staticmethod
+    def build_sphere_index(spheres: typing.Iterable[typing.Dict[int, typing.Set[int]]]
+                           ) -> typing.Dict[int, typing.Dict[int, int]]:
+        sphere_index: typing.Dict[int, typing.Dict[int, int]] = {}
+        for i, sphere in enumerate(spheres):
+            for player, location_ids in sphere.items():
+                sphere_index.setdefault(player, {}).update(dict.fromkeys(location_ids, i))
+        return sphere_index
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
-            raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
-                           f"Location or player may not exist.")
+            try:
+                return self.sphere_index[player][location_id]
+            except KeyError:
+                raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
+                               f"Location or player may not exist.") from None
         return -1
 
     def get_players_package(self):
@@ -749,6 +1299,7 @@ class Context:
             # we can check once if hint already exists
             if hint not in self.hints[team, hint.finding_player]:
                 self.hints[team, hint.finding_player].add(hint)
+                self.hint_index[team, hint.finding_player, hint.location] = hint
                 new_hint_events.add(hint.finding_player)
                 for player in self.slot_set(hint.receiving_player):
                     self.hints[team, player].add(hint)
@@ -756,6 +1307,7 @@ class Context:
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
         for slot in new_hint_events:
+            self.journal_hints(team, slot)
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
             if recipients is None or slot in recipients:
@@ -764,18 +1316,18 @@ class Context:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
                 for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                    self.queue_msgs(client, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location:
-                return hint
-        return None
-    
+        return self.hint_index.get((team, finding_player, seeked_location))
+
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
-        if old_hint in self.hints[team, slot]:
-            self.hints[team, slot].remove(old_hint)
-            self.hints[team, slot].add(new_hint)
+        hints = self.hints[team, slot]
+        if old_hint in hints:
+            hints.discard(old_hint)
+            hints.add(new_hint)
+            self.hint_index[team, new_hint.finding_player, new_hint.location] = new_hint
+            self.journal_hints(team, slot)
     
     # "events"
 
@@ -798,15 +1350,140 @@ class Context:
 
     def on_changed_hints(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
-        if targets:
-            self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
+        self.notify_stored_data(key, {"cmd": "SetReply", "key": key, "value": list(self.hints[team, slot])})
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        self.notify_stored_data(key, {"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]})
+
+    # bounce routing
+
+    def index_bounce_routes(self, client: Client) -> None:
+        """Makes client reachable by Bounce through its slot's game and its tags. Slots are routed through clients."""
+        self.bounce_game_routes[client.team][self.games[client.slot]].add(client)
+        for tag in client.tags:
+            self.bounce_tag_routes[client.team][tag].add(client)
+
+    def unindex_bounce_routes(self, client: Client) -> None:
+        """Has to be called before the team, slot or tags of client change."""
+        for routes, keys in ((self.bounce_game_routes, (self.games.get(client.slot),)),
+                             (self.bounce_tag_routes, client.tags)):
+            team_routes = routes.get(client.team, {})
+            for key in keys:
+                clients = team_routes.get(key)
+                if clients is not None:
+                    clients.discard(client)
+                    if not clients:
+                        del team_routes[key]
+
+    def get_bounce_targets(self, team: int, games: typing.Iterable[str], tags: typing.Iterable[str],
+                           slots: typing.Iterable[int]) -> typing.Set[Client]:
+        targets: typing.Set[Client] = set()
+        for routes, keys in ((self.bounce_game_routes.get(team, {}), games),
+                             (self.bounce_tag_routes.get(team, {}), tags),
+                             (self.clients.get(team, {}), slots)):
+            for key in keys:
+                targets.update(routes.get(key, ()))
+        return targets
+
+    def is_bounce_rate_limited(self, team: int, tags: typing.Iterable[str]) -> bool:
+        """Checks the rate limits of tags, counting the bounce for all of them if it is let through."""
+        limited_tags = [tag for tag in tags if tag in self.bounce_rate_limits]
+        if not limited_tags:
+            return False
+        now = time.monotonic()
+        for tag in limited_tags:
+            if now - self.last_tagged_bounce.get((team, tag), -math.inf) < self.bounce_rate_limits[tag]:
+                return True
+        for tag in limited_tags:
+            self.last_tagged_bounce[team, tag] = now
+        return False
+
+    # data storage
+
+    def get_stored_data_limit_error(self, key: str, size: int, writer: team_slot) -> typing.Optional[str]:
+        if self.stored_data_key_limit and size > self.stored_data_key_limit:
+            return f"Value of {key} would exceed {self.stored_data_key_limit} bytes"
+        if self.stored_data_slot_limit:
+            growth = size - self.stored_data_sizes.get(key, 0)
+            # shrinking is always allowed, to get back under the limit
+            if growth > 0 and self.stored_data_slot_sizes[writer] + growth > self.stored_data_slot_limit:
+                return f"Data storage of slot would exceed {self.stored_data_slot_limit} bytes"
+        return None
+
+    def index_stored_data_sizes(self) -> None:
+        """Rebuilds the sizes of stored values and what each slot is charged for them, after loading a save."""
+        self.stored_data_sizes = {key: len(pickle.dumps(value)) for key, value in self.stored_data.items()}
+        self.stored_data_writers = {key: charges for key, charges in self.stored_data_writers.items()
+                                    if key in self.stored_data_sizes}
+        self.stored_data_slot_sizes.clear()
+        for key, charges in self.stored_data_writers.items():
+            for writer, charged in charges.items():
+                self.stored_data_slot_sizes[writer] += charged
+            # pickled sizes can differ between Python versions
+            self.release_stored_data_charges(key)
+
+    def charge_stored_data(self, key: str, size: int, writer: team_slot) -> None:
+        """Charges writer for the growth of key's value to size. If it shrinks, charges are released, writer's first."""
+        growth = size - self.stored_data_sizes.get(key, 0)
+        self.stored_data_sizes[key] = size
+        charges = self.stored_data_writers.setdefault(key, {})
+        if growth > 0:
+            charges[writer] = charges.get(writer, 0) + growth
+            self.stored_data_slot_sizes[writer] += growth
+        else:
+            self.release_stored_data_charges(key, writer)
+        self.journal("set", "stored_data_writers", key, dict(charges))
+
+    def release_stored_data_charges(self, key: str, writer: typing.Optional[team_slot] = None) -> None:
+        """Releases charges for key that exceed its size, starting with writer."""
+        charges = self.stored_data_writers[key]
+        excess = sum(charges.values()) - self.stored_data_sizes[key]
+        for slot in sorted(charges, key=lambda slot: slot != writer):
+            if excess <= 0:
+                break
+            released = min(excess, charges[slot])
+            self.stored_data_slot_sizes[slot] -= released
+            excess -= released
+            if released == charges[slot]:
+                del charges[slot]
+            else:
+                charges[slot] -= released
+
+    def set_stored_data(self, key: str, value: typing.Any, writer: team_slot, size: int = 0) -> int:
+        """Stores value, accounting its size to writer, and returns the new version of key."""
+        if self.stored_data_key_limit or self.stored_data_slot_limit:
+            self.charge_stored_data(key, size, writer)
+        self.stored_data[key] = value
+        version = self.stored_data_versions[key] = self.stored_data_versions.get(key, 0) + 1
+        self.journal("set", "stored_data", key, value)
+        self.journal("set", "stored_data_versions", key, version)
+        return version
+
+    def notify_stored_data(self, key: str, reply: dict, client: typing.Optional[Client] = None) -> None:
+        """Sends reply to the subscribers of key and to client, if given.
+        Subscribers that asked for coalesced updates get the latest reply once per event loop iteration instead."""
+        targets: typing.Set[Client] = set(self.stored_data_notification_clients.get(key, ()))
+        if client:
+            targets.add(client)
         if targets:
-            self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
+            self.broadcast(targets, [reply])
+        if self.stored_data_coalesced_clients.get(key):
+            pending = self.pending_set_replies.get(key)
+            if pending and "original_value" in pending:
+                # coalesced replies describe all changes since the last one
+                reply = {**reply, "original_value": pending["original_value"]}
+            self.pending_set_replies[key] = reply
+            if not self.set_reply_flush_handle:
+                self.set_reply_flush_handle = asyncio.get_running_loop().call_soon(self.flush_set_replies)
+
+    def flush_set_replies(self) -> None:
+        self.set_reply_flush_handle = None
+        replies, self.pending_set_replies = self.pending_set_replies, {}
+        for key, reply in replies.items():
+            targets = set(self.stored_data_coalesced_clients.get(key, ()))
+            if targets:
+                self.broadcast(targets, [reply])
 
 
 def update_aliases(ctx: Context, team: int):
@@ -815,12 +1492,13 @@ def update_aliases(ctx: Context, team: int):
 
     for clients in ctx.clients[team].values():
         for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+            ctx.queue_encoded_msgs(client, cmd)
 
 
 async def server(websocket, path: str = "/", ctx: Context = None):
     client = Client(websocket, ctx)
     ctx.endpoints.append(client)
+    connection = ctx.network_capture.connect() if ctx.network_capture else 0
 
     try:
         if ctx.log_network:
@@ -831,14 +1509,22 @@ async def server(websocket, path: str = "/", ctx: Context = None):
         async for data in websocket:
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
+            if ctx.network_capture:
+                ctx.network_capture.message(connection, data)
             for msg in decode(data):
+                start = time.perf_counter()
                 await process_client_cmd(ctx, client, msg)
+                if ctx.metrics:
+                    ctx.metrics.observe_command(msg.get("cmd") if type(msg) is dict else None,
+                                                time.perf_counter() - start)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
             ctx.logger.exception(e)
     finally:
         if ctx.log_network:
             ctx.logger.info("Disconnected")
+        if ctx.network_capture:
+            ctx.network_capture.disconnect(connection)
         await ctx.disconnect(client)
 
 
@@ -909,13 +1595,19 @@ async def on_client_joined(ctx: Context, client: Client):
                               "If your client supports it, "
                               "you may have additional local commands you can list with /help.",
                       {"type": "Tutorial"})
-    ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    set_connection_timer(ctx, client)
+
+
+def set_connection_timer(ctx: Context, client: Client):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    ctx.client_connection_timers[client.team, client.slot] = now
+    ctx.journal("set", "client_connection_timers", (client.team, client.slot), now.timestamp())
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
-        ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        set_connection_timer(ctx, client)
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -985,29 +1677,74 @@ def get_status_string(ctx: Context, team: int, tag: str):
     return text
 
 
-def get_received_items(ctx: Context, team: int, player: int, remote_items: bool) -> typing.List[NetworkItem]:
-    return ctx.received_items.setdefault((team, player, remote_items), [])
+def get_received_items(ctx: Context, team: int, player: int) -> ReceivedItemsLog:
+    received_items = ctx.received_items.get((team, player))
+    if received_items is None:
+        received_items = ctx.received_items[team, player] = ReceivedItemsLog()
+    return received_items
 
 
 def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool) -> typing.List[NetworkItem]:
     return ctx.start_inventory.setdefault(player, []) if remote_start_inventory else []
 
 
+def get_resync_items(ctx: Context, client: Client, args: dict) -> typing.Optional[dict]:
+    """Returns the ReceivedItems packet for a client (re)synchronizing its items. If the client sent items_index with
+    a matching items_checksum, only items after that index are sent, otherwise everything is."""
+    start_inventory = get_start_inventory(ctx, client.slot, client.remote_start_inventory)
+    items = get_received_items(ctx, client.team, client.slot)
+    item_count = len(start_inventory) + items.count(client.remote_items)
+    index = args.get("items_index", 0)
+    if client.no_items or not item_count:
+        client.send_index = 0
+        if not client.no_items and type(index) is int and index > 0:
+            return {"cmd": "ReceivedItems", "index": 0, "items": []}  # client has items from something else
+        return None
+    client.send_index = item_count
+    start = 0
+    if type(index) is int and 0 < index <= item_count:
+        # only the items the client doesn't have yet are built, the ones it has are checksummed from the log
+        known_items = itertools.chain(start_inventory[:index],
+                                      items.iter_fields(client.remote_items, 0, max(0, index - len(start_inventory))))
+        if args.get("items_checksum") == get_items_checksum(known_items):
+            if index == item_count:
+                return None  # client is up to date
+            start = index
+    return {"cmd": "ReceivedItems", "index": start,
+            "items": start_inventory[start:] + items.get_items(client.remote_items,
+                                                               max(0, start - len(start_inventory)))}
+
+
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Schedules sending the items of pending receivers, so everything received within one event loop iteration
+    is sent as a single ReceivedItems per client. Without a running event loop they are sent right away."""
+    if ctx.pending_item_receivers and not ctx.item_flush_handle:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            flush_new_items(ctx)
+        else:
+            ctx.item_flush_handle = loop.call_soon(flush_new_items, ctx)
+
+
+def flush_new_items(ctx: Context):
+    ctx.item_flush_handle = None
+    receivers, ctx.pending_item_receivers = ctx.pending_item_receivers, set()
+    for team, slot in receivers:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot)
+            item_count = len(start_inventory) + items.count(client.remote_items)
+            if item_count > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                ctx.queue_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items.get_items(client.remote_items,
+                                                                                   first_new_item)}])
+                client.send_index = item_count
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1021,8 +1758,7 @@ def release_player(ctx: Context, team: int, slot: int):
     ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
-    update_checked_locations(ctx, team, slot)
+    register_location_checks_batch(ctx, team, {slot: all_locations})
 
 
 def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
@@ -1032,15 +1768,14 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
-        update_checked_locations(ctx, team, source_player)
+    register_location_checks_batch(ctx, team, all_locations, count_activity=False)
 
     if not is_group:
         for group, group_players in ctx.groups.items():
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.journal("union", "group_collected", group, {slot})
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1049,21 +1784,31 @@ def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[typing.Tupl
     return ctx.locations.get_remaining(ctx.location_checks, team, slot)
 
 
+def append_received_items(ctx: Context, team: int, target: int, items: typing.Sequence[NetworkItem],
+                          local: typing.Sequence[bool]) -> None:
+    """Adds items for target, local[i] telling if items[i] also goes to clients that don't handle items remotely."""
+    received_items = get_received_items(ctx, team, target)
+    ctx.journal("splice", "received_items", (team, target), (len(received_items), items, local))
+    received_items.splice(len(received_items), items, local)
+
+
 def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem):
+    local = [item.player != target_slot for item in items]
     for target in ctx.slot_set(target_slot):
-        for item in items:
-            if item.player != target_slot:
-                get_received_items(ctx, team, target, False).append(item)
-            get_received_items(ctx, team, target, True).append(item)
+        append_received_items(ctx, team, target, items, local)
+        ctx.pending_item_receivers.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
                              count_activity: bool = True):
-    new_locations = set(locations) - ctx.location_checks[team, slot]
+    checked = ctx.location_checks[team, slot]
+    new_locations = {location for location in locations if location not in checked}
     new_locations.intersection_update(ctx.locations[slot])  # ignore location IDs unknown to this multidata
     if new_locations:
         if count_activity:
-            ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            ctx.client_activity_timers[team, slot] = now
+            ctx.journal("set", "client_activity_timers", (team, slot), now.timestamp())
         for location in new_locations:
             item_id, target_player, flags = ctx.locations[slot][location]
             new_item = NetworkItem(item_id, location, slot, flags)
@@ -1076,19 +1821,81 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             ctx.broadcast_team(team, [info_text])
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.journal("union", "location_checks", (team, slot), new_locations)
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
         }])
-        updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
-        for hint_team, hint_slot in updated_slots:
+        for hint_team, hint_slot in ctx.recheck_location_hints(team, slot, new_locations):
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
 
 
+def register_location_checks_batch(ctx: Context, team: int, checks: typing.Mapping[int, typing.Iterable[int]],
+                                   count_activity: bool = True) -> int:
+    """Registers locations of several slots at once, as used by release and collect.
+    Hints are rechecked and the game is saved once, and each slot gets a single RoomUpdate.
+    Instead of broadcasting every sent item to the whole team, the team gets a summary per slot, while the ItemSend
+    messages are only sent to the receiving slots and to clients with the ItemSendDetails tag, in one message each.
+    Returns the amount of newly checked locations."""
+    item_messages: typing.Dict[int, typing.List[dict]] = collections.defaultdict(list)
+    all_item_messages: typing.List[dict] = []
+    summaries: typing.List[dict] = []
+    changed_hints: typing.Set[team_slot] = set()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    total = 0
+    for slot, locations in checks.items():
+        checked = ctx.location_checks[team, slot]
+        new_locations = {location for location in locations if location not in checked}
+        new_locations.intersection_update(ctx.locations[slot])  # ignore location IDs unknown to this multidata
+        if not new_locations:
+            continue
+        if count_activity:
+            ctx.client_activity_timers[team, slot] = now
+            ctx.journal("set", "client_activity_timers", (team, slot), now.timestamp())
+        receivers: typing.Set[int] = set()
+        for location in new_locations:
+            item_id, target_player, flags = ctx.locations[slot][location]
+            new_item = NetworkItem(item_id, location, slot, flags)
+            send_items_to(ctx, team, target_player, new_item)
+            info_text = json_format_send_event(new_item, target_player)
+            for target in ctx.slot_set(target_player):
+                item_messages[target].append(info_text)
+            all_item_messages.append(info_text)
+            receivers.add(target_player)
+
+        summaries.append(json_format_send_summary(team, slot, len(new_locations), len(receivers)))
+        ctx.logger.info('(Team #%d) %s sent %d items to %d players' % (
+            team + 1, ctx.player_names[(team, slot)], len(new_locations), len(receivers)))
+        ctx.location_checks[team, slot] |= new_locations
+        ctx.journal("union", "location_checks", (team, slot), new_locations)
+        ctx.broadcast(ctx.clients[team][slot], [{
+            "cmd": "RoomUpdate",
+            "hint_points": get_slot_points(ctx, team, slot),
+            "checked_locations": new_locations,  # send back new checks only
+        }])
+        changed_hints |= ctx.recheck_location_hints(team, slot, new_locations)
+        total += len(new_locations)
+
+    if total:
+        send_new_items(ctx)
+        ctx.broadcast_team(team, summaries)
+        detail_clients = [client for clients in ctx.clients[team].values() for client in clients
+                          if "ItemSendDetails" in client.tags]
+        if detail_clients:
+            ctx.broadcast(detail_clients, all_item_messages)
+        for target, messages in item_messages.items():
+            receivers = [client for client in ctx.clients[team].get(target, ()) if client not in detail_clients]
+            if receivers:
+                ctx.broadcast(receivers, messages)
+        for hint_team, hint_slot in changed_hints:
+            ctx.on_changed_hints(hint_team, hint_slot)
+        ctx.save()
+    return total
+
+
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str], auto_status: HintStatus) \
         -> typing.List[Hint]:
     hints = []
@@ -1100,7 +1907,7 @@ def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, st
     seeked_item_id = item if isinstance(item, int) else ctx.item_names_for_game(ctx.games[slot])[item]
     for finding_player, location_id, item_id, receiving_player, item_flags \
             in ctx.locations.find_item(slots, seeked_item_id):
-        prev_hint = ctx.get_hint(team, slot, location_id)
+        prev_hint = ctx.get_hint(team, finding_player, location_id)
         if prev_hint:
             hints.append(prev_hint)
         else:
@@ -1184,6 +1991,13 @@ def json_format_send_event(net_item: NetworkItem, receiving_player: int):
             "item": net_item}
 
 
+def json_format_send_summary(team: int, slot: int, item_count: int, player_count: int):
+    parts = []
+    NetUtils.add_json_text(parts, slot, type=NetUtils.JSONTypes.player_id)
+    NetUtils.add_json_text(parts, f" sent {item_count} items to {player_count} players.")
+    return {"cmd": "PrintJSON", "data": parts, "type": "ItemSendSummary", "team": team, "slot": slot}
+
+
 class CommandMeta(type):
     def __new__(cls, name, bases, attrs):
         commands = attrs["commands"] = {}
@@ -1523,12 +2337,14 @@ class ClientMessageProcessor(CommonCommandProcessor):
         if alias_name:
             alias_name = alias_name[:16].strip()
             self.ctx.name_aliases[self.client.team, self.client.slot] = alias_name
+            self.ctx.journal("set", "name_aliases", (self.client.team, self.client.slot), alias_name)
             self.output(f"Hello, {alias_name}")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
             return True
         elif (self.client.team, self.client.slot) in self.ctx.name_aliases:
             del (self.ctx.name_aliases[self.client.team, self.client.slot])
+            self.ctx.journal("delete", "name_aliases", (self.client.team, self.client.slot))
             self.output("Removed Alias")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
@@ -1539,15 +2355,16 @@ class ClientMessageProcessor(CommonCommandProcessor):
     def _cmd_getitem(self, item_name: str) -> bool:
         """Cheat in an item, if it is enabled on this server"""
         if self.ctx.item_cheat:
-            names = self.ctx.item_names_for_game(self.ctx.games[self.client.slot])
+            game = self.ctx.games[self.client.slot]
+            names = self.ctx.item_names_for_game(game)
             item_name, usable, response = get_intended_text(
                 item_name,
-                names
+                self.ctx.get_name_matcher(game, "items")
             )
             if usable:
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
-                get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
-                get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                append_received_items(self.ctx, self.client.team, self.client.slot, [new_item], [True])
+                self.ctx.pending_item_receivers.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1566,9 +2383,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
         auto_status = HintStatus.HINT_UNSPECIFIED if for_location else HintStatus.HINT_PRIORITY
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1599,9 +2414,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
             if game not in self.ctx.all_item_and_group_names:
                 self.output("Can't look up item/location for unknown game. Hint for ID instead.")
                 return False
-            names = self.ctx.all_location_and_group_names[game] \
-                if for_location else \
-                self.ctx.all_item_and_group_names[game]
+            names = self.ctx.get_name_matcher(game, "locations_and_groups" if for_location else "items_and_groups")
             hint_name, usable, response = get_intended_text(input_text, names)
 
             if usable:
@@ -1658,6 +2471,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     hints.append(hint)
                     can_pay -= 1
                     self.ctx.hints_used[self.client.team, self.client.slot] += 1
+                    self.ctx.journal("set", "hints_used", (self.client.team, self.client.slot),
+                                     self.ctx.hints_used[self.client.team, self.client.slot])
 
                 self.ctx.notify_hints(self.client.team, hints)
                 if not_found_hints:
@@ -1776,6 +2591,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
         else:
             team, slot = ctx.connect_names[args['name']]
             if client.auth and client.team is not None and client.slot in ctx.clients[client.team]:
+                ctx.unindex_bounce_routes(client)
                 ctx.clients[team][slot].remove(client)  # re-auth, remove old entry
                 if client.team != team or client.slot != slot:
                     client.auth = False  # swapping Team/Slot
@@ -1787,6 +2603,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.version = args['version']
             client.tags = args['tags']
             client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
+            ctx.index_bounce_routes(client)
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1797,11 +2614,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 "hint_points": get_slot_points(ctx, team, slot),
             }
             reply = [connected_packet]
-            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-            items = get_received_items(ctx, client.team, client.slot, client.remote_items)
-            if (start_inventory or items) and not client.no_items:
-                reply.append({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items})
-                client.send_index = len(start_inventory) + len(items)
+            received_items = get_resync_items(ctx, client, args)
+            if received_items:
+                reply.append(received_items)
             if not client.auth:  # if this was a Re-Connect, don't print to console
                 client.auth = True
                 await on_client_joined(ctx, client)
@@ -1812,23 +2627,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1840,14 +2647,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             if args.get('items_handling', None) is not None and client.items_handling != args['items_handling']:
                 try:
                     client.items_handling = args['items_handling']
-                    start_inventory = get_start_inventory(ctx, client.slot, client.remote_start_inventory)
-                    items = get_received_items(ctx, client.team, client.slot, client.remote_items)
-                    if (items or start_inventory) and not client.no_items:
-                        client.send_index = len(start_inventory) + len(items)
-                        await ctx.send_msgs(client, [{"cmd": "ReceivedItems", "index": 0,
-                                                      "items": start_inventory + items}])
-                    else:
-                        client.send_index = 0
+                    received_items = get_resync_items(ctx, client, args)
+                    if received_items:
+                        await ctx.send_msgs(client, [received_items])
                 except (ValueError, TypeError) as err:
                     await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', 'type': 'arguments',
                                                   'text': f'Invalid items_handling: {err}',
@@ -1856,7 +2658,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
 
             if "tags" in args:
                 old_tags = client.tags
+                ctx.unindex_bounce_routes(client)
                 client.tags = args["tags"]
+                ctx.index_bounce_routes(client)
                 if set(old_tags) != set(client.tags):
                     client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
                     ctx.broadcast_text_all(
@@ -1865,12 +2669,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                         {"type": "TagsChanged", "team": client.team, "slot": client.slot, "tags": client.tags})
 
         elif cmd == 'Sync':
-            start_inventory = get_start_inventory(ctx, client.slot, client.remote_start_inventory)
-            items = get_received_items(ctx, client.team, client.slot, client.remote_items)
-            if (start_inventory or items) and not client.no_items:
-                client.send_index = len(start_inventory) + len(items)
-                await ctx.send_msgs(client, [{"cmd": "ReceivedItems", "index": 0,
-                                              "items": start_inventory + items}])
+            received_items = get_resync_items(ctx, client, args)
+            if received_items:
+                await ctx.send_msgs(client, [received_items])
 
         elif cmd == 'LocationChecks':
             if client.no_locations:
@@ -1958,14 +2759,13 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             games = set(args.get("games", []))
             tags = set(args.get("tags", []))
             slots = set(args.get("slots", []))
-            args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            if ctx.is_bounce_rate_limited(client.team, tags):
+                ctx.logger.debug(f"Dropped Bounce with tags {tags} from {client.name}, rate limited.")
+                return
+            targets = ctx.get_bounce_targets(client.team, games, tags, slots)
+            if targets:
+                args["cmd"] = "Bounced"
+                await ctx.broadcast_send_encoded_msgs(targets, ctx.dumper([args]))
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -1993,12 +2793,17 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
-            if args.get("want_reply", True):
-                targets.add(client)
-            if targets:
-                ctx.broadcast(targets, [args])
+            size = 0
+            if ctx.stored_data_key_limit or ctx.stored_data_slot_limit:
+                size = len(pickle.dumps(value))
+                error = ctx.get_stored_data_limit_error(args["key"], size, (client.team, client.slot))
+                if error:
+                    await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
+                                                  "text": f"Set: {error}", "original_cmd": cmd}])
+                    return
+            args["version"] = ctx.set_stored_data(args["key"], value, (client.team, client.slot), size)
+            args["value"] = value
+            ctx.notify_stored_data(args["key"], args, client if args.get("want_reply", True) else None)
             ctx.save()
 
         elif cmd == "SetNotify":
@@ -2006,8 +2811,14 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
+            if args.get("coalesce", False):
+                subscribers, other_subscribers = ctx.stored_data_coalesced_clients, ctx.stored_data_notification_clients
+            else:
+                subscribers, other_subscribers = ctx.stored_data_notification_clients, ctx.stored_data_coalesced_clients
             for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+                subscribers[key].add(client)
+                if key in other_subscribers:
+                    other_subscribers[key].discard(client)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2022,6 +2833,7 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.journal("set", "client_game_state", (client.team, client.slot), new_status)
         ctx.on_client_status_change(client.team, client.slot)
         ctx.save()
 
@@ -2081,12 +2893,14 @@ class ServerCommandProcessor(CommonCommandProcessor):
                     if alias_name:
                         alias_name = alias_name.strip()[:15]
                         self.ctx.name_aliases[team, slot] = alias_name
+                        self.ctx.journal("set", "name_aliases", (team, slot), alias_name)
                         self.output(f"Named {player_name} as {alias_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
                         return True
                     else:
                         del (self.ctx.name_aliases[team, slot])
+                        self.ctx.journal("delete", "name_aliases", (team, slot))
                         self.output(f"Removed Alias for {player_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
@@ -2170,8 +2984,9 @@ class ServerCommandProcessor(CommonCommandProcessor):
         if usable:
             team, slot = self.ctx.player_name_lookup[seeked_player]
             item_name = " ".join(item_name)
-            names = self.ctx.item_names_for_game(self.ctx.games[slot])
-            item_name, usable, response = get_intended_text(item_name, names)
+            game = self.ctx.games[slot]
+            names = self.ctx.item_names_for_game(game)
+            item_name, usable, response = get_intended_text(item_name, self.ctx.get_name_matcher(game, "items"))
             if usable:
                 amount: int = int(amount)
                 if amount > 100:
@@ -2206,7 +3021,8 @@ class ServerCommandProcessor(CommonCommandProcessor):
             if full_name.isnumeric():
                 location, usable, response = int(full_name), True, None
             elif self.ctx.location_names_for_game(game) is not None:
-                location, usable, response = get_intended_text(full_name, self.ctx.location_names_for_game(game))
+                location, usable, response = get_intended_text(full_name,
+                                                               self.ctx.get_name_matcher(game, "locations"))
             else:
                 self.output("Can't look up location for unknown game. Send by ID instead.")
                 return False
@@ -2237,7 +3053,8 @@ class ServerCommandProcessor(CommonCommandProcessor):
             if full_name.isnumeric():
                 item, usable, response = int(full_name), True, None
             elif game in self.ctx.all_item_and_group_names:
-                item, usable, response = get_intended_text(full_name, self.ctx.all_item_and_group_names[game])
+                item, usable, response = get_intended_text(full_name,
+                                                           self.ctx.get_name_matcher(game, "items_and_groups"))
             else:
                 self.output("Can't look up item for unknown game. Hint for ID instead.")
                 return False
@@ -2276,7 +3093,8 @@ class ServerCommandProcessor(CommonCommandProcessor):
             if full_name.isnumeric():
                 location, usable, response = int(full_name), True, None
             elif game in self.ctx.all_location_and_group_names:
-                location, usable, response = get_intended_text(full_name, self.ctx.all_location_and_group_names[game])
+                location, usable, response = get_intended_text(
+                    full_name, self.ctx.get_name_matcher(game, "locations_and_groups"))
             else:
                 self.output("Can't look up location for unknown game. Hint for ID instead.")
                 return False
@@ -2379,6 +3197,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--save_journal', default=defaults["save_journal"], action='store_true',
+                        help="Journal every change and only write the full save file periodically.")
+    parser.add_argument('--datastore_key_limit', default=defaults["datastore_key_limit"], type=int,
+                        help="Maximum size of a single data storage value in bytes, 0 for no limit.")
+    parser.add_argument('--bounce_rate_limits', default=defaults["bounce_rate_limits"],
+                        help="Minimum seconds between bounces with a tag per team, as in DeathLink=2,OtherTag=0.5")
+    parser.add_argument('--datastore_slot_limit', default=defaults["datastore_slot_limit"], type=int,
+                        help="Maximum size one slot grew data storage values by in bytes, 0 for no limit.")
+    parser.add_argument('--metrics_port', default=defaults["metrics_port"], type=int,
+                        help="Serve metrics in the Prometheus text format on this port of localhost, 0 to disable.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2426,6 +3254,9 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--capture_network', metavar="FILE",
+                        help="Record all packets sent by clients to FILE, to replay them with NetworkCapture.py. "
+                             "Passwords are left out, but captures contain player data like chat messages.")
     args = parser.parse_args()
     return args
 
@@ -2456,6 +3287,16 @@ async def auto_shutdown(ctx, to_cancel=None):
                     await asyncio.wait_for(ctx.exit_event.wait(), seconds)
 
 
+def parse_bounce_rate_limits(text: str) -> typing.Dict[str, float]:
+    """Parses tag=seconds pairs separated by commas."""
+    rate_limits: typing.Dict[str, float] = {}
+    for pair in text.split(","):
+        if pair.strip():
+            tag, seconds = pair.split("=", 1)
+            rate_limits[tag.strip()] = float(seconds)
+    return rate_limits
+
+
 def load_server_cert(path: str, cert_key: typing.Optional[str]) -> "ssl.SSLContext":
     import ssl
     ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
@@ -2473,6 +3314,10 @@ async def main(args: argparse.Namespace):
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.remaining_mode,
                   args.auto_shutdown, args.compatibility, args.log_network)
+    ctx.stored_data_key_limit = args.datastore_key_limit
+    ctx.stored_data_slot_limit = args.datastore_slot_limit
+    if args.bounce_rate_limits:
+        ctx.bounce_rate_limits = parse_bounce_rate_limits(args.bounce_rate_limits)
     data_filename = args.multidata
 
     if not data_filename:
@@ -2502,7 +3347,10 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
-    ctx.init_save(not args.disable_save)
+    ctx.init_save(not args.disable_save, args.save_journal)
+    if args.capture_network:
+        from NetworkCapture import NetworkRecorder
+        ctx.network_capture = NetworkRecorder(args.capture_network, ctx.seed_name)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
@@ -2513,10 +3361,20 @@ async def main(args: argparse.Namespace):
 
     await ctx.server
     console_task = asyncio.create_task(console(ctx))
+    tasks = [console_task]
+    if args.metrics_port:
+        from ServerMetrics import MetricsServer
+        metrics = MetricsServer()
+        metrics.add_room(ctx.seed_name, ctx)
+        tasks.append(asyncio.create_task(metrics.serve(args.metrics_port)))
+        logging.info(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics")
     if ctx.auto_shutdown:
-        ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
+        ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, tasks))
     await ctx.exit_event.wait()
-    console_task.cancel()
+    for task in tasks:
+        task.cancel()
+    if ctx.network_capture:
+        ctx.network_capture.close()
     if ctx.shutdown_task:
         await ctx.shutdown_task
 
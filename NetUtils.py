@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import array
+import sys
 import typing
 import enum
+import hashlib
 import warnings
 from json import JSONEncoder, JSONDecoder
+from json.encoder import encode_basestring as _encode_string
 
 import websockets
 
@@ -112,10 +116,114 @@ _encode = JSONEncoder(
 ).encode
 
 
-def encode(obj: typing.Any) -> str:
+def _encode_generic(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
+# item -> fragment, keyed by value as received items are rebuilt from ReceivedItemsLog for every packet
+_encoded_network_items: typing.Dict[NetworkItem, str] = {}
+_encoded_network_items_limit = 100_000
+
+
+def _encode_network_item(item: NetworkItem) -> str:
+    item_id, location, player, flags = item
+    # bools and other subclasses of int could encode differently, and would compare equal to cached ints
+    if type(item_id) is int and type(location) is int and type(player) is int and type(flags) is int:
+        encoded = _encoded_network_items.get(item)
+        if encoded is None:
+            encoded = '{"item":%d,"location":%d,"player":%d,"flags":%d,"class":"NetworkItem"}' % item
+            if len(_encoded_network_items) >= _encoded_network_items_limit:
+                _encoded_network_items.clear()
+            _encoded_network_items[item] = encoded
+        return encoded
+    return _encode_generic(item)
+
+
+def _encode_network_player(player: NetworkPlayer) -> str:
+    team, slot, alias, name = player
+    if type(team) is int and type(slot) is int and type(alias) is str and type(name) is str:
+        return '{"team":%d,"slot":%d,"alias":%s,"name":%s,"class":"NetworkPlayer"}' % (
+            team, slot, _encode_string(alias), _encode_string(name))
+    return _encode_generic(player)
+
+
+def _encode_network_slot(slot: NetworkSlot) -> str:
+    name, game, slot_type, group_members = slot
+    if type(name) is str and type(game) is str and type(slot_type) is SlotType:
+        return '{"name":%s,"game":%s,"type":%d,"group_members":%s,"class":"NetworkSlot"}' % (
+            _encode_string(name), _encode_string(game), slot_type,
+            "[]" if type(group_members) in (list, tuple) and not group_members else _encode_generic(group_members))
+    return _encode_generic(slot)
+
+
+_typed_tuple_encoders: typing.Dict[type, typing.Callable[[typing.Any], str]] = {
+    NetworkItem: _encode_network_item,
+    NetworkPlayer: _encode_network_player,
+    NetworkSlot: _encode_network_slot,
+}
+
+
+def _has_typed_tuples(obj: typing.Any) -> bool:
+    """Whether obj is one of the typed tuples with a fast encoder, or a container of them, judged by its first entry."""
+    obj_type = type(obj)
+    if obj_type in _typed_tuple_encoders:
+        return True
+    if not obj:
+        return False
+    if obj_type is list or obj_type is tuple or obj_type is set or obj_type is frozenset:
+        return type(next(iter(obj))) in _typed_tuple_encoders
+    if obj_type is dict:
+        return type(next(iter(obj.values()))) in _typed_tuple_encoders
+    return False
+
+
+def _encode_fast(obj: typing.Any) -> str:
+    encoder = _typed_tuple_encoders.get(type(obj))
+    if encoder:
+        return encoder(obj)
+    if type(obj) is dict:
+        return _encode_dict(obj)
+    return "[" + ",".join([_encode_fast(value) if type(value) in _typed_tuple_encoders else _encode_generic(value)
+                           for value in obj]) + "]"
+
+
+def _encode_dict(obj: dict) -> str:
+    """Encodes the values of obj separately, so the ones holding typed tuples can take the fast path."""
+    entries = []
+    for key, value in obj.items():
+        if type(key) is str:
+            key = _encode_string(key)
+        elif type(key) is int:
+            key = '"%d"' % key
+        else:
+            return _encode_generic(obj)
+        encoder = _typed_tuple_encoders.get(type(value))
+        if encoder:
+            entries.append(f"{key}:{encoder(value)}")
+        else:
+            entries.append(f"{key}:{_encode_fast(value) if _has_typed_tuples(value) else _encode_generic(value)}")
+    return "{" + ",".join(entries) + "}"
+
+
+def encode(obj: typing.Any) -> str:
+    """Encodes obj to JSON, with NamedTuples as objects that name their class.
+    Commands holding NetworkItem, NetworkPlayer or NetworkSlot are written by a faster path with identical output."""
+    if type(obj) is list and any(type(command) is dict and any(map(_has_typed_tuples, command.values()))
+                                 for command in obj):
+        return "[" + ",".join([_encode_dict(command) if type(command) is dict else _encode_generic(command)
+                               for command in obj]) + "]"
+    return _encode_generic(obj)
+
+
+def get_items_checksum(items: typing.Iterable[typing.Tuple[int, int, int, int]]) -> str:
+    """Checksum of received items, used to resume ReceivedItems, see items_index in Sync.
+    Takes NetworkItems or plain (item, location, player, flags) tuples."""
+    checksum = hashlib.sha1()
+    for item, location, player, flags in items:
+        checksum.update(b"%d,%d,%d,%d;" % (item, location, player, flags))
+    return checksum.hexdigest()
+
+
 def get_any_version(data: dict) -> Version:
     data = {key.lower(): value for key, value in data.items()}  # .NET version classes have capitalized keys
     return Version(int(data["major"]), int(data["minor"]), int(data["build"]))
@@ -389,6 +497,146 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+class ReceivedItemsLog:
+    """Items received by a slot in order, kept as one array per NetworkItem field.
+    local holds the indexes of the items that are also sent to clients that don't handle their own items remotely,
+    so both views share the same storage."""
+    __slots__ = ("items", "locations", "players", "flags", "local")
+    typecodes = ("q", "q", "i", "i", "i")
+
+    def __init__(self) -> None:
+        self.items, self.locations, self.players, self.flags, self.local = \
+            (array.array(typecode) for typecode in self.typecodes)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self)} items, {len(self.local)} local)"
+
+    def count(self, remote_items: bool) -> int:
+        return len(self.items) if remote_items else len(self.local)
+
+    def get_items(self, remote_items: bool, start: int = 0) -> typing.List[NetworkItem]:
+        """Returns the items of the remote or local view, beginning at index start of that view."""
+        return [NetworkItem(*fields) for fields in self.iter_fields(remote_items, start)]
+
+    def iter_fields(self, remote_items: bool, start: int = 0, stop: typing.Optional[int] = None
+                    ) -> typing.Iterator[typing.Tuple[int, int, int, int]]:
+        """Iterates (item, location, player, flags) of the remote or local view from start to stop,
+        without building NetworkItems."""
+        if remote_items:
+            return zip(self.items[start:stop], self.locations[start:stop],
+                       self.players[start:stop], self.flags[start:stop])
+        items, locations, players, flags = self.items, self.locations, self.players, self.flags
+        return ((items[index], locations[index], players[index], flags[index]) for index in self.local[start:stop])
+
+    def splice(self, index: int, items: typing.Sequence[NetworkItem], local: typing.Sequence[bool]) -> None:
+        """Replaces everything from index on with items, local[i] telling if items[i] is in the local view.
+        Splicing the same items at the same index again changes nothing."""
+        if index < len(self):
+            for column in (self.items, self.locations, self.players, self.flags):
+                del column[index:]
+            while self.local and self.local[-1] >= index:
+                self.local.pop()
+        for item, is_local in zip(items, local):
+            if is_local:
+                self.local.append(len(self.items))
+            self.items.append(item.item)
+            self.locations.append(item.location)
+            self.players.append(item.player)
+            self.flags.append(item.flags)
+
+    def to_save(self) -> typing.Tuple[bytes, ...]:
+        """Returns the arrays as little endian raw bytes."""
+        columns = (self.items, self.locations, self.players, self.flags, self.local)
+        if sys.byteorder == "big":
+            columns = tuple(array.array(column.typecode, column) for column in columns)
+            for column in columns:
+                column.byteswap()
+        return tuple(column.tobytes() for column in columns)
+
+    @classmethod
+    def from_save(cls, data: typing.Tuple[bytes, ...]) -> ReceivedItemsLog:
+        log = cls()
+        for column, raw in zip((log.items, log.locations, log.players, log.flags, log.local), data):
+            column.frombytes(raw)
+            if sys.byteorder == "big":
+                column.byteswap()
+        return log
+
+    @classmethod
+    def from_lists(cls, remote: typing.Sequence[NetworkItem], local: typing.Sequence[NetworkItem]
+                   ) -> ReceivedItemsLog:
+        """Builds a log from the separate lists of remote and local items that older saves have.
+        The local items are a subsequence of the remote ones."""
+        is_local = []
+        local_index = 0
+        for item in remote:
+            matches = local_index < len(local) and local[local_index] == item
+            is_local.append(matches)
+            local_index += matches
+        log = cls()
+        log.splice(0, remote, is_local)
+        return log
+
+
+def bitmap_to_locations(locations: typing.Iterable[int], bitmap: int) -> typing.List[int]:
+    """Returns the locations set in bitmap, where bit i stands for the i-th of the sorted locations."""
+    locations = sorted(locations)
+    if bitmap < 0:  # inverted, everything above the highest location is set
+        bitmap &= (1 << len(locations)) - 1
+    return [location for location, bit in zip(locations, reversed(bin(bitmap)[2:])) if bit == "1"]
+
+
+class LocationBitmap(typing.MutableSet[int]):
+    """Checked locations of a slot, stored as bits over the slot's locations in a LocationStore.
+    Behaves like a set of location ids, iterating in location order."""
+    __slots__ = ("store", "slot", "bits")
+
+    def __init__(self, store: LocationStore, slot: int, bits: int = 0):
+        self.store = store
+        self.slot = slot
+        self.bits = bits
+
+    @classmethod
+    def _from_iterable(cls, it: typing.Iterable[int]) -> typing.Set[int]:
+        # results of set operations are plain sets, as they don't know the store
+        return set(it)
+
+    def __contains__(self, location: object) -> bool:
+        if not isinstance(location, int):
+            return False
+        index = self.store.get_location_index(self.slot, location)
+        return index >= 0 and bool(self.bits >> index & 1)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        if not self.bits:  # also covers slots without locations, like groups
+            return iter(())
+        return iter(self.store.bitmap_to_locations(self.slot, self.bits))
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self)})"
+
+    def add(self, location: int) -> None:
+        self.update((location,))
+
+    def discard(self, location: int) -> None:
+        if location in self:
+            self.bits &= ~(1 << self.store.get_location_index(self.slot, location))
+
+    def update(self, locations: typing.Iterable[int]) -> None:
+        """Adds locations, ignoring the ones that don't belong to the slot."""
+        self.bits |= self.store.locations_to_bitmap(self.slot, locations)
+
+    def __ior__(self, locations: typing.AbstractSet[int]) -> LocationBitmap:
+        self.update(locations)
+        return self
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
@@ -402,25 +650,52 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        # reverse indexes, built once as the store is not modified after loading
+        self._item_index: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int]]] = {}
+        """(receiving player, item id) -> [(finding player, location id, item flags)]"""
+        self._receiver_index: typing.Dict[int, typing.Dict[int, typing.Set[int]]] = {}
+        """receiving player -> finding player -> location ids"""
+        self._location_indexes: typing.Dict[int, typing.Dict[int, int]] = {}
+        """finding player -> location id -> bit in location bitmaps"""
+        for finding_player, check_data in sorted(self.items()):
+            self._location_indexes[finding_player] = {location_id: index for index, location_id
+                                                      in enumerate(sorted(check_data))}
+            for location_id, (item_id, receiving_player, *rest) in sorted(check_data.items()):
+                item_flags = rest[0] if rest else 0
+                self._item_index.setdefault((receiving_player, item_id), []).append(
+                    (finding_player, location_id, item_flags))
+                self._receiver_index.setdefault(receiving_player, {}).setdefault(finding_player, set()).add(location_id)
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        for receiving_player in slots:
+            for finding_player, location_id, item_flags in self._item_index.get((receiving_player, seeked_item_id), ()):
+                yield finding_player, location_id, seeked_item_id, receiving_player, item_flags
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
-        return all_locations
+        return {finding_player: set(location_ids)
+                for finding_player, location_ids in self._receiver_index.get(slot, {}).items()}
+
+    def get_location_index(self, slot: int, location: int) -> int:
+        return self._location_indexes.get(slot, {}).get(location, -1)
+
+    def locations_to_bitmap(self, slot: int, locations: typing.Iterable[int]) -> int:
+        location_indexes = self._location_indexes[slot]
+        bitmap = 0
+        for location in locations:
+            index = location_indexes.get(location)
+            if index is not None:
+                bitmap |= 1 << index
+        return bitmap
+
+    def bitmap_to_locations(self, slot: int, bitmap: int) -> typing.List[int]:
+        return bitmap_to_locations(self._location_indexes[slot], bitmap)
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
+        if isinstance(checked, LocationBitmap):
+            return self.bitmap_to_locations(slot, checked.bits)
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             if slot not in self:
@@ -433,6 +708,8 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
     def get_missing(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
+        if isinstance(checked, LocationBitmap):
+            return bitmap_to_locations(self._location_indexes[slot], ~checked.bits)
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             return list(self[slot])
@@ -444,6 +721,9 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                       ) -> typing.List[typing.Tuple[int, int]]:
         checked = state[team, slot]
         player_locations = self[slot]
+        if isinstance(checked, LocationBitmap):
+            return sorted([(player_locations[location_id][1], player_locations[location_id][0]) for
+                           location_id in bitmap_to_locations(self._location_indexes[slot], ~checked.bits)])
         return sorted([(player_locations[location_id][1], player_locations[location_id][0]) for
                         location_id in player_locations if
                         location_id not in checked])
@@ -0,0 +1,213 @@
+"""
+Records the packets clients send to MultiServer and replays them against a fresh server, for benchmarking.
+
+MultiServer.py writes a capture with --capture_network <file>. Each line of a capture is a JSON object with
+"time" in seconds since the capture started, "event" and, depending on the event, "connection" and "data".
+Events are "start" (first line, with the seed name), "connect", "message" (data is the frame text)
+and "disconnect". Passwords of Connect packets and arguments of admin commands are blanked before writing,
+everything else players send, like chat and data storage values, is recorded as is.
+
+Replay with `python NetworkCapture.py <capture> <multidata>`, see --help.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from MultiServer import Context
+
+
+class NetworkRecorder:
+    """Appends inbound packets of all connections to a JSONL capture file."""
+    flush_interval = 1.0
+
+    def __init__(self, path: str, seed_name: str) -> None:
+        self.file = open(path, "w", encoding="utf-8", buffering=1 << 16)
+        self.start = time.monotonic()
+        self.last_flush = self.start
+        self.connections = 0
+        self.write({"event": "start", "seed_name": seed_name, "wall_time": time.time()})
+
+    def write(self, record: typing.Dict[str, typing.Any]) -> None:
+        now = time.monotonic()
+        record["time"] = round(now - self.start, 6)
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if now - self.last_flush > self.flush_interval:
+            self.file.flush()
+            self.last_flush = now
+
+    def connect(self) -> int:
+        """Records a new connection and returns its identity for the following records."""
+        self.connections += 1
+        self.write({"event": "connect", "connection": self.connections})
+        return self.connections
+
+    def message(self, connection: int, data: typing.Union[str, bytes]) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "replace")
+        if '"password"' in data or "!admin" in data:
+            data = redact_secrets(data)
+        self.write({"event": "message", "connection": connection, "data": data})
+
+    def disconnect(self, connection: int) -> None:
+        self.write({"event": "disconnect", "connection": connection})
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def redact_secrets(data: str) -> str:
+    """Blanks Connect passwords and the arguments of admin commands, which can hold the server password, in a frame."""
+    try:
+        msgs = json.loads(data)
+    except ValueError:
+        return data  # the server rejects it too
+    if not isinstance(msgs, list):
+        return data
+    for msg in msgs:
+        if not isinstance(msg, dict):
+            continue
+        if msg.get("cmd") == "Connect" and msg.get("password"):
+            msg["password"] = ""
+        elif msg.get("cmd") == "Say" and str(msg.get("text", "")).lower().startswith("!admin"):
+            msg["text"] = "!admin"
+    return json.dumps(msgs, separators=(",", ":"))
+
+
+def read_capture(path: str) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplaySocket:
+    """Stands in for the websocket of a recorded connection, handing the recorded frames to MultiServer.server
+    and counting what is sent back instead of sending it."""
+
+    def __init__(self, connection: int) -> None:
+        self.remote_address = ("replay", connection)
+        self.open = True
+        self.frames: asyncio.Queue[typing.Optional[str]] = asyncio.Queue()
+        self.handling = False
+        self.task: typing.Optional[asyncio.Task] = None
+        """the MultiServer.server call handling this connection"""
+        self.sent_frames = 0
+        self.sent_bytes = 0
+
+    async def send(self, msg: str) -> None:
+        self.sent_frames += 1
+        self.sent_bytes += len(msg)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.open = False
+
+    def __aiter__(self) -> ReplaySocket:
+        return self
+
+    async def __anext__(self) -> str:
+        if self.handling:  # asking for the next frame means the last one was handled completely
+            self.frames.task_done()
+        data = await self.frames.get()
+        self.handling = True
+        if data is None:
+            self.frames.task_done()
+            self.handling = False
+            self.open = False
+            raise StopAsyncIteration
+        return data
+
+    async def feed(self, data: typing.Optional[str]) -> None:
+        """Hands data to the server and waits until it was handled, None ends the connection."""
+        if self.task.done():
+            return  # the server dropped the connection
+        await self.frames.put(data)
+        handled = asyncio.ensure_future(self.frames.join())
+        await asyncio.wait((handled, self.task), return_when=asyncio.FIRST_COMPLETED)
+        handled.cancel()
+
+
+def make_replay_context(multidata: str) -> Context:
+    import Utils
+    from MultiServer import Context
+    options = Utils.get_settings().server_options.as_dict()
+    # the room password is not part of captures, so everyone gets to connect
+    ctx = Context("", 0, None, None, options["location_check_points"], options["hint_cost"],
+                  not options["disable_item_cheat"], options["release_mode"], options["collect_mode"],
+                  options["remaining_mode"], 0, options["compatibility"])
+    ctx.load(multidata, True)
+    ctx.init_save(False)
+    ctx.random.seed(0)
+    return ctx
+
+
+async def replay(ctx: Context, capture: str, recorded_pace: bool = False, speed: float = 1.0) -> float:
+    """Feeds the packets of capture to ctx in order, as fast as possible or at the recorded pace divided by speed.
+    Each packet is handled completely before the next one, so replays are repeatable.
+    Returns the seconds the replay took."""
+    from MultiServer import server
+    sockets: typing.Dict[int, ReplaySocket] = {}
+    tasks: typing.List[asyncio.Task] = []
+    start = time.perf_counter()
+    for record in read_capture(capture):
+        event = record["event"]
+        if event == "start":
+            if record["seed_name"] != ctx.seed_name:
+                ctx.logger.warning(f"Capture was recorded with seed {record['seed_name']}, not {ctx.seed_name}.")
+            continue
+        if recorded_pace:
+            delay = start + record["time"] / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        connection = record["connection"]
+        if event == "connect":
+            socket = sockets[connection] = ReplaySocket(connection)
+            socket.task = asyncio.create_task(server(socket, ctx=ctx))
+            tasks.append(socket.task)
+        elif event == "message" and connection in sockets:
+            await sockets[connection].feed(record["data"])
+        elif event == "disconnect" and connection in sockets:
+            await sockets.pop(connection).feed(None)
+    for socket in sockets.values():
+        await socket.feed(None)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+def main(args: argparse.Namespace) -> None:
+    import Utils
+    from ServerMetrics import MetricsServer, latency_buckets
+
+    Utils.init_logging("NetworkReplay", loglevel=args.loglevel)
+    ctx = make_replay_context(args.multidata)
+    metrics = MetricsServer()
+    metrics.add_room(ctx.seed_name, ctx)
+    seconds = asyncio.run(replay(ctx, args.capture, args.pace == "recorded", args.speed))
+    print(f"Replayed {args.capture} in {seconds:.3f} seconds")
+    print(f"{'command':<20}{'count':>8}{'total ms':>12}{'mean ms':>10}  slowest bucket")
+    for cmd, histogram in sorted(ctx.metrics.commands.items(), key=lambda item: -item[1].sum):
+        slowest = max(index for index, count in enumerate(histogram.bucket_counts) if count)
+        bound = f"<= {latency_buckets[slowest] * 1000:g} ms" if slowest < len(latency_buckets) else \
+            f"> {latency_buckets[-1] * 1000:g} ms"
+        print(f"{cmd:<20}{histogram.count:>8}{histogram.sum * 1000:>12.1f}"
+              f"{histogram.sum * 1000 / histogram.count:>10.3f}  {bound}")
+    print(f"sent {ctx.metrics.outbound_frames} frames with {ctx.metrics.outbound_bytes} bytes")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay a network capture of MultiServer against a fresh server.")
+    parser.add_argument("capture", help="JSONL file written by MultiServer.py --capture_network")
+    parser.add_argument("multidata", help="Multiworld data the capture was recorded with.")
+    parser.add_argument("--pace", choices=["fast", "recorded"], default="fast",
+                        help="Replay as fast as possible, or with the delays between packets that were recorded.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speeds up replays at recorded pace.")
+    parser.add_argument("--loglevel", default="warning", choices=["debug", "info", "warning", "error", "critical"])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
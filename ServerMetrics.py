@@ -0,0 +1,173 @@
+"""
+Opt-in metrics of running MultiServer rooms, served over HTTP in the Prometheus text format.
+
+MultiServer.py serves them with --metrics_port, WebHost room hosters with the METRICS_PORT config option.
+The endpoint only listens on localhost.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from MultiServer import Context
+
+latency_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+"""upper bounds of histogram buckets in seconds"""
+
+
+class Histogram:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self) -> None:
+        self.bucket_counts = [0] * (len(latency_buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(latency_buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def format(self, name: str, labels: str) -> typing.List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*latency_buckets, "+Inf"), self.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RoomMetrics:
+    """Counters a Context keeps while metrics are enabled, see Context.metrics."""
+    max_command_types = 64
+    """commands are named by clients, so only this many get their own series and the rest count as other"""
+
+    def __init__(self) -> None:
+        self.commands: typing.Dict[str, Histogram] = {}
+        self.outbound_bytes = 0
+        self.outbound_frames = 0
+        self.saves = 0
+        self.last_save_seconds = 0.0
+        self.last_save_bytes = 0
+
+    def observe_command(self, cmd: object, seconds: float) -> None:
+        histogram = self.commands.get(cmd) if type(cmd) is str else None
+        if histogram is None:
+            if type(cmd) is not str or len(self.commands) >= self.max_command_types:
+                cmd = "other"
+            histogram = self.commands.setdefault(cmd, Histogram())
+        histogram.observe(seconds)
+
+    def observe_frame(self, msg: str) -> None:
+        self.outbound_frames += 1
+        self.outbound_bytes += len(msg) if msg.isascii() else len(msg.encode("utf-8"))
+
+    def observe_save(self, seconds: float, size: int) -> None:
+        self.saves += 1
+        self.last_save_seconds = seconds
+        self.last_save_bytes = size
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsServer:
+    """Collects the metrics of the rooms hosted by this process and serves them to scrapers."""
+    loop_lag_interval = 1.0
+
+    def __init__(self) -> None:
+        self.rooms: typing.Dict[str, Context] = {}
+        self.loop_lag = 0.0
+        self.server: typing.Optional[asyncio.AbstractServer] = None
+
+    def add_room(self, name: str, ctx: Context) -> None:
+        ctx.metrics = RoomMetrics()
+        self.rooms[name] = ctx
+
+    def remove_room(self, name: str) -> None:
+        self.rooms.pop(name, None)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP archipelago_event_loop_lag_seconds How late the event loop last ran a scheduled callback.",
+            "# TYPE archipelago_event_loop_lag_seconds gauge",
+            f"archipelago_event_loop_lag_seconds {self.loop_lag}",
+            "# HELP archipelago_rooms Rooms hosted by this process.",
+            "# TYPE archipelago_rooms gauge",
+            f"archipelago_rooms {len(self.rooms)}",
+        ]
+        series: typing.Dict[typing.Tuple[str, str, str], typing.List[str]] = {}
+
+        def add(name: str, metric_type: str, description: str, *samples: str) -> None:
+            series.setdefault((name, metric_type, description), []).extend(samples)
+
+        for room, ctx in self.rooms.items():
+            metrics = ctx.metrics
+            labels = f'room="{escape_label(room)}"'
+            connected = sum(len(clients) for team in ctx.clients.values() for clients in team.values())
+            queued_bytes, largest_queue = ctx.get_outbound_backlog()
+            add("archipelago_room_connections", "gauge", "Open websocket connections.",
+                f"archipelago_room_connections{{{labels}}} {len(ctx.endpoints)}")
+            add("archipelago_room_clients", "gauge", "Clients connected to a slot.",
+                f"archipelago_room_clients{{{labels}}} {connected}")
+            add("archipelago_room_outbound_bytes_total", "counter", "Bytes sent to clients.",
+                f"archipelago_room_outbound_bytes_total{{{labels}}} {metrics.outbound_bytes}")
+            add("archipelago_room_outbound_frames_total", "counter", "Websocket frames sent to clients.",
+                f"archipelago_room_outbound_frames_total{{{labels}}} {metrics.outbound_frames}")
+            add("archipelago_room_outbound_queued_bytes", "gauge", "Bytes waiting to be sent to all clients.",
+                f"archipelago_room_outbound_queued_bytes{{{labels}}} {queued_bytes}")
+            add("archipelago_room_outbound_queued_bytes_max", "gauge", "Bytes waiting to be sent to one client.",
+                f"archipelago_room_outbound_queued_bytes_max{{{labels}}} {largest_queue}")
+            add("archipelago_room_saves_total", "counter", "Completed saves.",
+                f"archipelago_room_saves_total{{{labels}}} {metrics.saves}")
+            add("archipelago_room_save_seconds", "gauge", "Duration of the last save.",
+                f"archipelago_room_save_seconds{{{labels}}} {metrics.last_save_seconds}")
+            add("archipelago_room_save_bytes", "gauge", "Size of the last save.",
+                f"archipelago_room_save_bytes{{{labels}}} {metrics.last_save_bytes}")
+            add("archipelago_room_datastore_keys", "gauge", "Keys in data storage.",
+                f"archipelago_room_datastore_keys{{{labels}}} {len(ctx.stored_data)}")
+            for cmd, histogram in sorted(metrics.commands.items()):
+                add("archipelago_room_command_seconds", "histogram", "Time spent handling client commands.",
+                    *histogram.format("archipelago_room_command_seconds", f'{labels},cmd="{escape_label(cmd)}"'))
+
+        for (name, metric_type, description), samples in series.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    async def handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while await asyncio.wait_for(reader.readline(), 10) not in (b"\r\n", b"\n", b""):
+                pass  # headers are not needed
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            if method == "GET" and path.split("?", 1)[0] in ("/", "/metrics"):
+                status, body = "200 OK", self.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass  # broken or slow scraper
+        finally:
+            writer.close()
+
+    async def measure_loop_lag(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.loop_lag_interval)
+            self.loop_lag = max(0.0, time.perf_counter() - start - self.loop_lag_interval)
+
+    async def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serves metrics until cancelled."""
+        self.server = await asyncio.start_server(self.handle_request, host, port)
+        async with self.server:
+            await self.measure_loop_lag()
@@ -0,0 +1,93 @@
+"""
+Measures how long entry points take to import, by importing them in a fresh interpreter with `-X importtime`.
+
+Used by `Launcher.py --profile-startup` and test/benchmark/startup.py.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+import typing
+
+from Utils import is_frozen, local_path
+
+if typing.TYPE_CHECKING:
+    from worlds.LauncherComponents import Component
+
+# runs in the child interpreter; reports the world sources that were imported along with the entry point
+_child_code = """
+import importlib, json, sys, time
+import ModuleUpdate
+# checking requirements is not part of the profile and may prompt for input
+ModuleUpdate._skip_update = ModuleUpdate.update_ran = True
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+total = time.perf_counter() - start
+worlds = sys.modules.get("worlds")
+world_times = {source.path: source.time_taken for source in getattr(worlds, "world_sources", ())
+               if source.time_taken >= 0}
+print(json.dumps({"total": total, "worlds": world_times}))
+"""
+
+
+@dataclasses.dataclass
+class StartupProfile:
+    module: str
+    total: float
+    """seconds spent importing the module, measured inside the child interpreter"""
+    modules: typing.Dict[str, float]
+    """cumulative import seconds per top level module, including everything it imported first"""
+    worlds: typing.Dict[str, float]
+    """WorldSource.time_taken per imported world source"""
+
+    def format(self, limit: int = 15) -> str:
+        lines = [f"{self.module} imported in {self.total:.3f} seconds"]
+        lines.append("  slowest modules:")
+        for module, seconds in sorted(self.modules.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"    {seconds:8.3f}s {module}")
+        if self.worlds:
+            lines.append(f"  {len(self.worlds)} worlds imported in {sum(self.worlds.values()):.3f} seconds, slowest:")
+            for world, seconds in sorted(self.worlds.items(), key=lambda item: -item[1])[:limit]:
+                lines.append(f"    {seconds:8.3f}s {world}")
+        return "\n".join(lines)
+
+
+def parse_import_times(output: str) -> typing.Dict[str, float]:
+    """Collects cumulative seconds of top level modules from `-X importtime` output."""
+    modules: typing.Dict[str, float] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # nested imports are indented by two spaces per level, only top level imports are reported
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # also skips the header line
+        name = name.strip()
+        modules[name] = modules.get(name, 0) + int(cumulative) / 1_000_000
+    return modules
+
+
+def profile_startup(module: str) -> StartupProfile:
+    """Imports module in a fresh interpreter and returns how long that took."""
+    if is_frozen():
+        raise RuntimeError("Startup profiling requires running from source.")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (local_path(), os.environ.get("PYTHONPATH"))))}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", _child_code, module],
+                            capture_output=True, text=True, cwd=local_path(), env=env)
+    if result.returncode:
+        raise RuntimeError(f"Could not import {module}:\n{result.stderr[-2000:]}")
+    # the child may print to stdout while importing, the report is the last line
+    report = json.loads(result.stdout.splitlines()[-1])
+    return StartupProfile(module, report["total"], parse_import_times(result.stderr), report["worlds"])
+
+
+def get_component_module(component: Component) -> typing.Optional[str]:
+    """Returns the module that has to be imported to start component, if it can be determined."""
+    if component.script_name and os.path.isfile(local_path(f"{component.script_name}.py")):
+        return component.script_name
+    if component.func:
+        return component.func.__module__
+    return None
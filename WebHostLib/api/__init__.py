@@ -12,4 +12,4 @@ def get_players(seed: Seed) -> List[Tuple[str, str]]:
     return [(slot.player_name, slot.game) for slot in seed.slots]
 
 
-from . import datapackage, generate, room, user  # trigger registration
+from . import datapackage, generate, room, spoiler, user  # trigger registration
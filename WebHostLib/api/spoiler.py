@@ -0,0 +1,27 @@
+import json
+from typing import Any, Dict
+from uuid import UUID
+
+from flask import abort, request
+
+from . import api_endpoints
+from ..models import SpoilerIndex
+
+
+@api_endpoints.route('/spoiler/<suuid:seed_id>/<int:player>')
+def get_spoiler_index(seed_id: UUID, player: int) -> Dict[str, Any]:
+    """
+    One player's part of the spoiler index: name, game, entrances, starting items and locations. Player 0 returns the
+    playthrough, unreachable items and paths instead. Passing `location` returns only what that location holds.
+    """
+    spoiler_index = SpoilerIndex.get(seed=seed_id, player=player)
+    if spoiler_index is None:
+        return abort(404)
+    data = json.loads(spoiler_index.data)
+    location = request.args.get("location")
+    if location is None:
+        return data
+    if player == 0 or location not in data["locations"]:
+        return abort(404)
+    item = data["locations"][location]
+    return {"location": location, "item": item[0] if item else None, "item_player": item[1] if item else None}
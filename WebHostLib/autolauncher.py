@@ -165,6 +165,8 @@ class MultiworldInstance():
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
+        # each hoster serves the metrics of its rooms on its own port
+        self.metrics_port = config["METRICS_PORT"] + id if config["METRICS_PORT"] else 0
 
     def start(self):
         if self.process and self.process.is_alive():
@@ -173,7 +175,7 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.metrics_port),
                                           name=self.name)
         process.start()
         self.process = process
@@ -6,7 +6,6 @@ import datetime
 import functools
 import logging
 import multiprocessing
-import pickle
 import random
 import socket
 import threading
@@ -20,6 +19,7 @@ from pony.orm import commit, db_session, select
 import Utils
 
 from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from ServerMetrics import MetricsServer
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
 from .models import Command, GameDataPackage, Room, db
@@ -155,8 +155,17 @@ class WebHostContext(Context):
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
+        start = time.perf_counter()
+        try:
+            # waits for the event loop, which may be busy or stopping
+            encoded_save, _ = self.get_encoded_save()
+        except Exception as e:
+            self.logger.exception(e)
+            return False
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        room.multisave = encoded_save
+        if self.metrics:
+            self.metrics.observe_save(time.perf_counter() - start, len(room.multisave))
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
@@ -175,10 +184,12 @@ def get_random_port():
 @cache_argsless
 def get_static_server_data() -> dict:
     import worlds
+    # built from the world cache, so lazily loaded worlds are not imported
+    games_packages = worlds.network_data_package["games"]
     data = {
         "non_hintable_names": {
-            world_name: world.hint_blacklist
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
+            world_name: frozenset(game_manifest["hint_blacklist"])
+            for world_name, game_manifest in worlds.game_manifests.items()
         },
         "gamespackage": {
             world_name: {
@@ -186,15 +197,15 @@ def get_static_server_data() -> dict:
                 for key, value in game_package.items()
                 if key not in ("item_name_groups", "location_name_groups")
             }
-            for world_name, game_package in worlds.network_data_package["games"].items()
+            for world_name, game_package in games_packages.items()
         },
         "item_name_groups": {
-            world_name: world.item_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
+            world_name: game_package["item_name_groups"]
+            for world_name, game_package in games_packages.items()
         },
         "location_name_groups": {
-            world_name: world.location_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
+            world_name: game_package["location_name_groups"]
+            for world_name, game_package in games_packages.items()
         },
     }
 
@@ -223,7 +234,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       metrics_port: int = 0):
     Utils.init_logging(name)
     try:
         import resource
@@ -249,6 +261,11 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    metrics: typing.Optional[MetricsServer] = None
+    if metrics_port:
+        metrics = MetricsServer()
+        loop.create_task(metrics.serve(metrics_port))
+        logging.info(f"Serving metrics of {name} at http://127.0.0.1:{metrics_port}/metrics")
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -257,6 +274,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                if metrics:
+                    metrics.add_room(str(room_id), ctx)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -307,6 +326,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
+                if metrics:
+                    metrics.remove_room(str(room_id))
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
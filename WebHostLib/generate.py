@@ -135,6 +135,8 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
                                                                        {"bosses", "items", "connections", "texts"}))
         erargs.skip_prog_balancing = False
         erargs.skip_output = False
+        erargs.memory_profile = False
+        erargs.release_logic = True
         erargs.csv_output = False
 
         name_counter = Counter()
@@ -41,9 +41,18 @@ class Seed(db.Entity):
     creation_time = Required(datetime, default=lambda: datetime.utcnow(), index=True)  # index used by landing page
     slots = Set(Slot)
     spoiler = Optional(LongStr, lazy=True)
+    spoiler_index = Set('SpoilerIndex')
     meta = Required(LongStr, default=lambda: "{\"race\": false}")  # additional meta information/tags
 
 
+class SpoilerIndex(db.Entity):
+    """One player's part of a seed's spoiler index, player 0 holds the parts that are not per player."""
+    seed = Required(Seed)
+    player = Required(int)
+    data = Required(LongStr)  # json
+    PrimaryKey(seed, player)
+
+
 class Command(db.Entity):
     id = PrimaryKey(int, auto=True)
     room = Required(Room)
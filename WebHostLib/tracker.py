@@ -9,7 +9,8 @@ from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
-from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, ReceivedItemsLog, SlotType, \
+    bitmap_to_locations
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
 from .models import GameDataPackage, Room
@@ -109,18 +110,26 @@ class TrackerData:
         """Retrieves a list of all item codes a given slot starts with."""
         return self._multidata["precollected_items"][player]
 
+    @_cache_results
     def get_player_checked_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations marked complete by this player."""
-        return self._multisave.get("location_checks", {}).get((team, player), set())
+        checks = self._multisave.get("location_checks", {}).get((team, player), set())
+        if isinstance(checks, int):  # bitmap over the player's locations, see NetUtils.LocationBitmap
+            return set(bitmap_to_locations(self.get_player_locations(team, player), checks))
+        return checks
 
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
         return set(self.get_player_locations(team, player)) - self.get_player_checked_locations(team, player)
 
+    @_cache_results
     def get_player_received_items(self, team: int, player: int) -> List[NetworkItem]:
         """Returns all items received to this player in order of received."""
-        return self._multisave.get("received_items", {}).get((team, player, True), [])
+        received_items = self._multisave.get("received_items", {})
+        if (team, player) in received_items:
+            return ReceivedItemsLog.from_save(received_items[team, player]).get_items(True)
+        return received_items.get((team, player, True), [])  # saves before version 4
 
     @_cache_results
     def get_player_inventory_counts(self, team: int, player: int) -> collections.Counter:
@@ -138,7 +147,7 @@ class TrackerData:
     @_cache_results
     def get_player_hints(self, team: int, player: int) -> Set[Hint]:
         """Retrieves a set of all hints relevant for a particular player."""
-        return self._multisave.get("hints", {}).get((team, player), set())
+        return set(self._multisave.get("hints", {}).get((team, player), ()))  # lists since save version 5
 
     @_cache_results
     def get_player_last_activity(self, team: int, player: int) -> Optional[datetime.timedelta]:
@@ -293,10 +302,29 @@ class TrackerData:
         return video_feeds
 
     @_cache_results
-    def get_spheres(self) -> List[List[int]]:
+    def get_spheres(self) -> List[Dict[int, Set[int]]]:
         """ each sphere is { player: { location_id, ... } } """
         return self._multidata.get("spheres", [])
 
+    @_cache_results
+    def get_sphere_index(self) -> Dict[int, Dict[int, int]]:
+        """ { player: { location_id: sphere, ... } } """
+        return Context.build_sphere_index(self.get_spheres())
+
+    @_cache_results
+    def get_checked_sphere_locations(self, team: int) -> List[Tuple[int, int, int]]:
+        """Retrieves (sphere, player, location_id) of all checked locations that belong to a sphere, ordered by sphere.
+        Spheres are counted from 1."""
+        sphere_index = self.get_sphere_index()
+        checked_sphere_locations = []
+        for player in self.get_all_players()[team]:
+            player_spheres = sphere_index.get(player, {})
+            for location_id in self.get_player_checked_locations(team, player):
+                if location_id in player_spheres:
+                    checked_sphere_locations.append((player_spheres[location_id] + 1, player, location_id))
+        checked_sphere_locations.sort()
+        return checked_sphere_locations
+
 
 def _process_if_request_valid(incoming_request: Request, room: Optional[Room]) -> Optional[Response]:
     if not room:
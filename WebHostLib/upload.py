@@ -20,7 +20,7 @@ from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
-from .models import Seed, Room, Slot, GameDataPackage
+from .models import Seed, Room, Slot, GameDataPackage, SpoilerIndex
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
 allowed_options_extensions = (".yaml", ".json", ".yml", ".txt", ".zip")
@@ -35,6 +35,23 @@ games_package_schema = schema.Schema({
     schema.Optional("version"): int,
 })
 
+# see BaseClasses.SpoilerIndex, objects may be empty
+spoiler_index_schema = schema.Schema({
+    "version": int,
+    "seed": str,
+    "players": {schema.Optional(schema.And(str, str.isdecimal)): {
+        "name": str,
+        "game": str,
+        "entrances": [{"entrance": str, "exit": str, "direction": str}],
+        "starting_items": [str],
+        "locations": {schema.Optional(str): schema.Or(None, schema.And(
+            list, lambda item: len(item) == 2 and isinstance(item[0], str) and isinstance(item[1], int)))},
+    }},
+    "playthrough": {schema.Optional(str): schema.Or([str], {schema.Optional(str): str})},
+    "unreachables": [str],
+    "paths": {schema.Optional(str): [[schema.Or(str, None)]]},
+})
+
 
 def allowed_options(filename: str) -> bool:
     return filename.endswith(allowed_options_extensions)
@@ -48,6 +65,15 @@ def banned_file(filename: str) -> bool:
     return filename.endswith(banned_extensions)
 
 
+def load_spoiler_index(data: bytes) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Returns the decoded spoiler index, or None with a warning if it is malformed, as the seed works without it."""
+    try:
+        return spoiler_index_schema.validate(json.loads(data))
+    except (ValueError, schema.SchemaError):
+        flash("Warning: The spoiler index (_Spoiler.json) could not be read, the seed was uploaded without it.")
+        return None
+
+
 def process_multidata(compressed_multidata, files={}):
     game_data: GamesPackage
 
@@ -106,6 +132,7 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
         return
 
     spoiler = ""
+    spoiler_index = None
     files = {}
     multidata = None
 
@@ -124,6 +151,9 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
             files[patch.player] = data
 
         # Spoiler
+        elif file.filename.endswith("_Spoiler.json"):
+            spoiler_index = load_spoiler_index(zfile.open(file, "r").read())
+
         elif file.filename.endswith(".txt"):
             spoiler = zfile.open(file, "r").read().decode("utf-8-sig")
 
@@ -170,6 +200,12 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
         flush()  # create seed
         for slot in slots:
             slot.seed = seed
+        if spoiler_index:
+            # split up, so that looking up a player does not have to load everyone's locations
+            players = spoiler_index.pop("players")
+            SpoilerIndex(seed=seed, player=0, data=json.dumps(spoiler_index))
+            for player, player_index in players.items():
+                SpoilerIndex(seed=seed, player=int(player), data=json.dumps(player_index))
         return seed
     else:
         flash("No multidata was found in the zip file, which is required.")
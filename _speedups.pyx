@@ -14,6 +14,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -69,6 +70,26 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverSortKey:
+    # only used while building LocationStore.receiver_order
+    ap_player_t receiver
+    ap_id_t item
+    size_t entry
+
+
+cdef int _compare_receiver_sort_keys(const void* a, const void* b) noexcept nogil:
+    # sort by receiver, then item, keeping the (sender, location) order of entries for equal items
+    cdef const ReceiverSortKey* lhs = <const ReceiverSortKey*>a
+    cdef const ReceiverSortKey* rhs = <const ReceiverSortKey*>b
+    if lhs.receiver != rhs.receiver:
+        return -1 if lhs.receiver < rhs.receiver else 1
+    if lhs.item != rhs.item:
+        return -1 if lhs.item < rhs.item else 1
+    if lhs.entry != rhs.entry:
+        return -1 if lhs.entry < rhs.entry else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -92,6 +113,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef size_t* receiver_order  # 800KB/100k items, entries sorted by (receiver, item)
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, range of receiver_order per receiver
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +124,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(size_t) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -117,6 +142,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -131,6 +157,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -150,10 +177,12 @@ cdef class LocationStore:
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
 
         assert (not self.entries) == (not count)
         assert self.sender_index
         assert self._raw_proxies
+        assert self.receiver_index
 
         # build entries and index
         cdef size_t i = 0
@@ -172,6 +201,27 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
+        # build reverse index, so find_item and get_for_player only have to look at a receiver's items
+        cdef ReceiverSortKey* sort_keys
+        cdef ap_player_t receiver_id
+        if count:
+            self.receiver_order = <size_t*>self._mem.alloc(count, sizeof(size_t))
+            sort_keys = <ReceiverSortKey*>self._mem.alloc(count, sizeof(ReceiverSortKey))
+            assert self.receiver_order
+            assert sort_keys
+            for i in range(count):
+                sort_keys[i].receiver = self.entries[i].receiver
+                sort_keys[i].item = self.entries[i].item
+                sort_keys[i].entry = i
+            qsort(sort_keys, count, sizeof(ReceiverSortKey), _compare_receiver_sort_keys)
+            for i in range(count):
+                receiver_id = sort_keys[i].receiver
+                if not self.receiver_index[receiver_id].count:
+                    self.receiver_index[receiver_id].start = i
+                self.receiver_index[receiver_id].count += 1
+                self.receiver_order[i] = sort_keys[i].entry
+            self._mem.free(sort_keys)
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -187,6 +237,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_index_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -217,47 +268,101 @@ cdef class LocationStore:
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef LocationEntry* entry
+        cdef size_t low, high, middle, end
+        for slot in slots:
+            if slot < 1 or slot >= self.receiver_index_size:
+                continue
+            # binary search for the first entry of the item in the receiver's range of receiver_order
+            low = self.receiver_index[<size_t>slot].start
+            end = low + self.receiver_index[<size_t>slot].count
+            high = end
+            while low < high:
+                middle = low + (high - low) // 2
+                if self.entries[self.receiver_order[middle]].item < item:
+                    low = middle + 1
+                else:
+                    high = middle
+            while low < end:
+                entry = &self.entries[self.receiver_order[low]]
+                if entry.item != item:
+                    break
+                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                low += 1
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if slot < 1 or slot >= self.receiver_index_size:
+            return all_locations
+        cdef LocationEntry* entry
+        cdef size_t start = self.receiver_index[<size_t>slot].start
+        cdef size_t i
+        for i in range(start, start + self.receiver_index[<size_t>slot].count):
+            entry = &self.entries[self.receiver_order[i]]
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
+    # location bitmaps, bit i stands for the i-th location of a slot in location order
+
+    cdef size_t _location_index(self, ap_player_t sender, ap_id_t location):
+        # binary search in the sender's range of entries, which is sorted by location
+        cdef size_t start = self.sender_index[sender].start
+        cdef size_t low = start
+        cdef size_t high = start + self.sender_index[sender].count
+        cdef size_t middle
+        while low < high:
+            middle = low + (high - low) // 2
+            if self.entries[middle].location < location:
+                low = middle + 1
+            else:
+                high = middle
+        if low < start + self.sender_index[sender].count and self.entries[low].location == location:
+            return low - start
+        return INVALID_SIZE
+
+    cdef bytes _bitmap_bytes(self, ap_player_t sender, object bitmap):
+        cdef size_t count = self.sender_index[sender].count
+        return (bitmap & ((1 << count) - 1)).to_bytes((count + 7) // 8, "little")
+
+    def get_location_index(self, slot: int, location: int) -> int:
+        """Returns the bit of location in bitmaps of slot, -1 if the location does not exist."""
+        cdef ap_player_t sender = slot
+        if sender < 1 or sender >= self.sender_index_size or not -(1 << 63) <= location < (1 << 63):
+            return -1
+        cdef size_t index = self._location_index(sender, location)
+        return -1 if index == INVALID_SIZE else index
+
+    def locations_to_bitmap(self, slot: int, locations: Iterable[int]) -> int:
+        """Returns the bitmap of locations of slot, locations that do not exist are ignored."""
+        cdef ap_player_t sender = slot
+        if sender < 1 or sender >= self.sender_index_size:
+            raise KeyError(slot)
+        cdef bytearray data = bytearray((self.sender_index[sender].count + 7) // 8)
+        cdef unsigned char* raw = data
+        cdef size_t index
+        for location in locations:
+            if not -(1 << 63) <= location < (1 << 63):
+                continue
+            index = self._location_index(sender, location)
+            if index != INVALID_SIZE:
+                raw[index >> 3] |= 1 << (index & 7)
+        return int.from_bytes(data, "little")
+
+    def bitmap_to_locations(self, slot: int, bitmap: int) -> List[int]:
+        """Returns the locations of slot that are set in bitmap, in location order."""
+        cdef ap_player_t sender = slot
+        if sender < 1 or sender >= self.sender_index_size:
+            raise KeyError(slot)
+        cdef bytes data = self._bitmap_bytes(sender, bitmap)
+        cdef const unsigned char* raw = data
+        cdef size_t start = self.sender_index[sender].start
+        cdef size_t i
+        return [self.entries[start + i].location for i in range(self.sender_index[sender].count)
+                if raw[i >> 3] >> (i & 7) & 1]
+
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
@@ -265,7 +370,10 @@ cdef class LocationStore:
 
         # This used to validate checks actually exist. A remnant from the past.
         # If the order of locations becomes relevant at some point, we could not do sorted(set), so leaving it.
-        cdef set checked = state[team, slot]
+        checked = state[team, slot]
+        bits = getattr(checked, "bits", None)
+        if bits is not None:  # LocationBitmap
+            return self.bitmap_to_locations(slot, bits)
 
         if not len(checked):
             # Skips loop if none have been checked.
@@ -285,9 +393,17 @@ cdef class LocationStore:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
-        cdef set checked = state[team, slot]
+        checked = state[team, slot]
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
+        cdef size_t i
+        cdef bytes data
+        cdef const unsigned char* raw
+        bits = getattr(checked, "bits", None)
+        if bits is not None:  # LocationBitmap
+            data = self._bitmap_bytes(sender, bits)
+            raw = data
+            return [self.entries[start + i].location for i in range(count) if not raw[i >> 3] >> (i & 7) & 1]
         if not len(checked):
             # Skip `in` if none have been checked.
             # This optimizes the case where everyone connects to a fresh game at the same time.
@@ -304,9 +420,18 @@ cdef class LocationStore:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
-        cdef set checked = state[team, slot]
+        checked = state[team, slot]
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
+        cdef size_t i
+        cdef bytes data
+        cdef const unsigned char* raw
+        bits = getattr(checked, "bits", None)
+        if bits is not None:  # LocationBitmap
+            data = self._bitmap_bytes(sender, bits)
+            raw = data
+            return sorted([(self.entries[start + i].receiver, self.entries[start + i].item) for i in range(count)
+                           if not raw[i >> 3] >> (i & 7) & 1])
         return sorted([(entry.receiver, entry.item) for
                         entry in self.entries[start:start+count] if
                         entry.location not in checked])
@@ -23,24 +23,32 @@ __all__ = [
 
 no_gui = False
 skip_autosave = False
-_world_settings_name_cache: Dict[str, str] = {}  # TODO: cache on disk and update when worlds change
+_world_settings_name_cache: Dict[str, str] = {}  # settings key -> game, served from the world manifest
 _world_settings_name_cache_updated = False
 _lock = Lock()
 
 
 def _update_cache() -> None:
-    """Load all worlds and update world_settings_name_cache"""
+    """Update world_settings_name_cache from the world manifest"""
     global _world_settings_name_cache_updated
     if _world_settings_name_cache_updated:
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
-            annotation = world.__annotations__.get("settings", None)
-            if annotation is None or annotation == "ClassVar[Optional['Group']]":
-                continue
-            _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
+        import worlds
+        if hasattr(worlds, "game_manifests"):
+            for game, game_manifest in worlds.game_manifests.items():
+                if game_manifest["has_settings"]:
+                    _world_settings_name_cache[game_manifest["settings_key"]] = game
+        else:  # worlds are still being imported, the manifest is not available yet
+            from worlds.AutoWorld import AutoWorldRegister, LazyWorld
+            for game, world in dict.items(AutoWorldRegister.world_types):
+                if isinstance(world, LazyWorld):
+                    continue
+                annotation = world.__annotations__.get("settings", None)
+                if annotation is None or annotation == "ClassVar[Optional['Group']]":
+                    continue
+                _world_settings_name_cache[world.settings_key] = game
     finally:
         _world_settings_name_cache_updated = True
 
@@ -592,12 +600,37 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class DatastoreKeyLimit(int):
+        """Maximum size of a single data storage value in bytes, 0 for no limit"""
+
+    class DatastoreSlotLimit(int):
+        """Maximum size one slot grew data storage values by in bytes, 0 for no limit"""
+
+    class BounceRateLimits(str):
+        """
+        Minimum seconds between bounces with a tag per team, to stop storms of DeathLink and similar
+        Comma separated, for example: DeathLink=2,OtherTag=0.5
+        """
+
+    class SaveJournal(Bool):
+        """
+        Append every change to a journal next to the save file, so a crash loses at most about a second of progress
+        The full save file is then only rewritten periodically, as a compacted snapshot
+        """
+
+    class MetricsPort(int):
+        """
+        Serve metrics of the room in the Prometheus text format on this port of localhost, 0 to disable
+        Covers clients, commands handled with their latency, outgoing traffic, saves, data storage and event loop lag
+        """
+
     host: Optional[str] = None
     port: int = 38281
     password: Optional[str] = None
     multidata: Optional[str] = None
     savefile: Optional[str] = None
     disable_save: bool = False
+    save_journal: Union[SaveJournal, bool] = False
     loglevel: str = "info"
     logtime: bool = False
     server_password: Optional[ServerPassword] = None
@@ -610,6 +643,10 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    datastore_key_limit: DatastoreKeyLimit = DatastoreKeyLimit(0)
+    datastore_slot_limit: DatastoreSlotLimit = DatastoreSlotLimit(0)
+    bounce_rate_limits: Optional[BounceRateLimits] = None
+    metrics_port: MetricsPort = MetricsPort(0)
 
 
 class GeneratorOptions(Group):
@@ -744,9 +781,11 @@ class Settings(Group):
             if key not in _world_settings_name_cache:
                 # not a world group
                 return super().__getattribute__(key)
-            # directly import world and grab settings class
-            world_mod, world_cls_name = _world_settings_name_cache[key].rsplit(".", 1)
-            world = cast(type, getattr(__import__(world_mod, fromlist=[world_cls_name]), world_cls_name))
+            # import world, if it was not yet, and grab settings class
+            from worlds.AutoWorld import AutoWorldRegister
+            world = cast(type, AutoWorldRegister.world_types[_world_settings_name_cache[key]])
+            world_cls_name = world.__name__
+            world_mod = world.__module__
             assert getattr(world, "settings_key") == key
             try:
                 cls_or_name = world.__annotations__["settings"]
@@ -0,0 +1,40 @@
+def run_room_memory_benchmark(rooms: int = 10):
+    """Reports the memory each additional room's game data takes in a process already hosting one,
+    for a small room and one with all data packages, like WebHost rooms without custom data packages."""
+    import gc
+    import logging
+    import tracemalloc
+
+    from Utils import init_logging
+    from MultiServer import Context
+    import worlds
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    packages = worlds.network_data_package["games"]
+
+    def make_context(games):
+        ctx = Context("", 0, "", "", 0, 0, False)
+        for game in games:
+            ctx._add_game_data(game, packages[game])
+        ctx._init_game_data()
+        return ctx
+
+    small_room = [game for game in ("Archipelago", "A Link to the Past", "Ocarina of Time") if game in packages]
+    for label, games in ((f"{len(small_room)} data packages", small_room),
+                         (f"all {len(packages)} data packages", list(packages))):
+        contexts = [make_context(games)]
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        contexts.extend(make_context(games) for _ in range(rooms))
+        gc.collect()
+        per_room = (tracemalloc.get_traced_memory()[0] - start) / rooms
+        tracemalloc.stop()
+        logger.info(f"Room with {label}: {per_room / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_room_memory_benchmark()
@@ -0,0 +1,44 @@
+def run_startup_benchmark() -> bool:
+    """Cold start import times of entry points, compared to the seconds stored in startup_budget.json.
+    Returns False if any entry point is over budget. Since timings depend on the machine, budgets are about twice the
+    best of 3 cold starts measured locally, catching regressions like an eagerly imported GUI toolkit or world."""
+    import argparse
+    import json
+    import logging
+    import os
+
+    from StartupProfiler import profile_startup
+
+    # no log file, this runs in CI and should not leave anything behind
+    logging.basicConfig(level=logging.INFO, format="[%(name)s]: %(message)s")
+    logger = logging.getLogger("Benchmark")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1, help="Best of how many cold starts to use per entry point.")
+    parser.add_argument("--verbose", action="store_true", help="Log the slowest modules and worlds as well.")
+    args, _ = parser.parse_known_args()
+
+    with open(os.path.join(os.path.dirname(__file__), "startup_budget.json")) as f:
+        budgets = json.load(f)
+
+    within_budget = True
+    for module, budget in budgets.items():
+        profile = min((profile_startup(module) for _ in range(args.runs)), key=lambda p: p.total)
+        if profile.total > budget:
+            within_budget = False
+            logger.error(f"{module} took {profile.total:.3f} seconds to import, over its budget of {budget} seconds.")
+            logger.info(profile.format())
+        else:
+            logger.info(f"{module} took {profile.total:.3f} of {budget} seconds.")
+            if args.verbose:
+                logger.info(profile.format())
+    return within_budget
+
+
+if __name__ == "__main__":
+    import sys
+
+    from path_change import change_home
+    change_home()
+    if not run_startup_benchmark():
+        sys.exit(1)
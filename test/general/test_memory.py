@@ -14,3 +14,17 @@ class TestWorldMemory(unittest.TestCase):
                 weak = weakref.ref(setup_solo_multiworld(world_type))
                 gc.collect()
                 self.assertFalse(weak(), "World leaked a reference")
+
+    def test_release_logic(self):
+        """Tests that releasing logic drops rules and connections, but keeps locations and their items."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"])
+        locations = {location.name: location.item for location in multiworld.get_locations()}
+        multiworld.release_logic()
+        self.assertEqual({location.name: location.item for location in multiworld.get_locations()}, locations)
+        self.assertFalse(list(multiworld.get_entrances()))
+        for region in multiworld.get_regions():
+            self.assertFalse(region.entrances)
+            self.assertFalse(region.exits)
+        for location in multiworld.get_locations():
+            self.assertNotIn("access_rule", location.__dict__)
+            self.assertNotIn("item_rule", location.__dict__)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from worlds import CachedGamesPackages, WorldCache, game_manifests, network_data_package
+from worlds.AutoWorld import AutoWorldRegister, WorldTypes
+
+
+class TestWorldManifest(unittest.TestCase):
+    def test_manifest_matches_worlds(self):
+        """The manifest has to describe worlds exactly like importing them would."""
+        for game_name, game_manifest in game_manifests.items():
+            with self.subTest(game=game_name):
+                world_type = AutoWorldRegister.world_types[game_name]
+                self.assertEqual(game_manifest["world_class"], f"{world_type.__module__}.{world_type.__name__}")
+                self.assertEqual(game_manifest["settings_key"], world_type.settings_key)
+                self.assertEqual(set(game_manifest["hint_blacklist"]), set(world_type.hint_blacklist))
+                self.assertEqual(game_manifest["option_names"], list(world_type.options_dataclass.type_hints))
+                self.assertEqual(game_manifest["checksum"], world_type.get_data_package_data()["checksum"])
+                self.assertEqual(network_data_package["games"][game_name]["checksum"], game_manifest["checksum"])
+
+    def test_world_cache(self):
+        """Data packages can be read back from the world cache one by one, raw or decoded."""
+        packages = {game_name: network_data_package["games"][game_name] for game_name in game_manifests}
+        sources = {"worlds/fake": {"key": "0:0", "games": game_manifests}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with mock.patch.object(WorldCache, "path", lambda: os.path.join(temp_dir, "world_cache.bin")):
+                written = WorldCache.store(sources, packages)
+                # packages that did not have to be decoded are copied over raw
+                WorldCache.store(sources, {game_name: written.get_raw_package(game_name) for game_name in packages})
+                world_cache = WorldCache.load()
+                self.assertIsNotNone(world_cache)
+                self.assertEqual(world_cache.sources, sources)
+                lazy_packages = CachedGamesPackages(world_cache, packages)
+                for game_name, package in packages.items():
+                    with self.subTest(game=game_name):
+                        self.assertEqual(lazy_packages[game_name], package)
+                        self.assertIs(lazy_packages[game_name], lazy_packages[game_name])
+                world_cache.close()  # release the memory map before the file is removed
+
+    def test_malformed_world_cache(self):
+        """A cache that can't be understood is treated like a missing one."""
+        headers = [b"{}", b"[]", b'{"version": "0.0.0"}', b"not json", b'{"version": null, "sources": {}}']
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "world_cache.bin")
+            with mock.patch.object(WorldCache, "path", lambda: path):
+                for header in headers:
+                    with self.subTest(header=header):
+                        with open(path, "wb") as f:
+                            f.write(WorldCache.header_size.pack(WorldCache.magic, len(header)) + header)
+                        self.assertIsNone(WorldCache.load())
+                with open(path, "wb") as f:
+                    f.write(b"APW")
+                self.assertIsNone(WorldCache.load())
+
+    def test_lazy_world_types(self):
+        """Lazily registered games are imported on first access and dropped if the import fails."""
+        class FakeWorld:
+            pass
+
+        world_types = WorldTypes()
+        loads = []
+
+        def load() -> bool:
+            loads.append("Fake Game")
+            world_types["Fake Game"] = FakeWorld
+            return True
+
+        world_types.add_lazy("Fake Game", load)
+        world_types.add_lazy("Broken Game", lambda: False)
+        self.assertEqual(sorted(world_types), ["Broken Game", "Fake Game"])
+        self.assertIn("Fake Game", world_types)
+        self.assertFalse(loads)
+
+        self.assertIs(world_types["Fake Game"], FakeWorld)
+        self.assertIs(world_types["Fake Game"], FakeWorld)
+        self.assertEqual(loads, ["Fake Game"])
+
+        self.assertIsNone(world_types.get("Broken Game"))
+        self.assertNotIn("Broken Game", world_types)
+        with self.assertRaises(KeyError):
+            _ = world_types["Broken Game"]
+        self.assertEqual(world_types.items(), [("Fake Game", FakeWorld)])
+        self.assertEqual(world_types.values(), [FakeWorld])
@@ -0,0 +1,286 @@
+# Puts sustained load on a MultiServer or WebHost room and reports round trip latencies of the commands sent.
+# This spawns processes and may modify your local AP, so this is not run as part of unit testing.
+# Run with `python -m test.hosting.load --help`.
+import argparse
+import asyncio
+import collections
+import dataclasses
+import itertools
+import random
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from CommonClient import CommonContext, server_loop
+
+__all__ = [
+    "TrafficMix",
+    "LatencyStats",
+    "SimulatedClient",
+    "run_load",
+]
+
+
+@dataclasses.dataclass
+class TrafficMix:
+    """Commands per second each simulated client sends, at random (exponentially distributed) intervals."""
+    checks: float = 0.05
+    scouts: float = 0.2
+    hints: float = 0.02
+    sets: float = 0.5
+    gets: float = 0.5
+    bounces: float = 0.1
+    deathlinks: float = 0.01
+
+    def rates(self) -> Dict[str, float]:
+        return {field.name: getattr(self, field.name) for field in dataclasses.fields(self)
+                if getattr(self, field.name) > 0}
+
+
+class LatencyStats:
+    """Round trip times per kind of traffic, from sending a command to receiving the reply it caused."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.sent: Dict[str, int] = collections.defaultdict(int)
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.latencies[kind].append(seconds)
+
+    @staticmethod
+    def percentile(values: List[float], percent: float) -> float:
+        """Nearest rank percentile of sorted values."""
+        return values[max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))]
+
+    def format(self) -> str:
+        lines = [f"{'traffic':<12}{'sent':>9}{'replies':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for kind in sorted(self.sent.keys() | self.latencies.keys()):
+            values = sorted(self.latencies.get(kind, ()))
+            if values:
+                times = "".join(f"{self.percentile(values, percent) * 1000:>10.1f}" for percent in (50, 90, 99))
+                times += f"{values[-1] * 1000:>10.1f}"
+            else:
+                times = f"{'-':>10}" * 4
+            lines.append(f"{kind:<12}{self.sent.get(kind, 0):>9}{len(values):>9}{times}")
+        return "\n".join(lines)
+
+
+class SimulatedClient(CommonContext):
+    """Headless CommonContext, so replies go through process_server_cmd like in any other client.
+    Replies are matched to the commands that caused them to measure their latency."""
+    ids = itertools.count()
+    items_handling = 0b111
+    want_slot_data = False
+
+    def __init__(self, address: str, slot: str, game: str, tags: List[str], stats: LatencyStats,
+                 password: Optional[str] = None) -> None:
+        self.game = game
+        self.tags = set(tags)
+        super().__init__(address, password)
+        self.username = slot
+        self.stats = stats
+        self.key = f"load_test_{next(self.ids)}"
+        self.connected: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.unchecked_locations: List[int] = []
+        self.all_locations: List[int] = []
+        # (kind of traffic, send time) of commands without a reply yet
+        self.pending: Dict[str, Tuple[str, float]] = {}
+        self.pending_checks: Dict[int, float] = {}
+        # scouted location -> (kind of traffic, send time) of every scout of it without a reply yet
+        self.pending_scouts: Dict[int, Deque[Tuple[str, float]]] = collections.defaultdict(collections.deque)
+
+    async def server_auth(self, password_requested: bool = False) -> None:
+        if password_requested and not self.password:
+            raise ConnectionError(f"{self.username}: the room requires a password")
+        await self.get_username()
+        await self.send_connect(uuid=self.key)
+
+    def event_invalid_slot(self) -> None:
+        raise ConnectionError(f"{self.username}: InvalidSlot")
+
+    def event_invalid_game(self) -> None:
+        raise ConnectionError(f"{self.username}: InvalidGame")
+
+    def on_print_json(self, args: dict) -> None:
+        pass  # thousands of clients would log every message thousands of times
+
+    async def connect(self, address: Optional[str] = None) -> None:
+        """Connects and waits for the server to accept the slot."""
+        # CommonContext.connect would disconnect first, which updates the UI this doesn't have
+        self.server_task = asyncio.create_task(server_loop(self, address), name="server loop")
+        # server_loop ending before Connected arrives means the connection was refused or lost
+        done, _ = await asyncio.wait((self.connected, self.server_task), return_when=asyncio.FIRST_COMPLETED)
+        if self.connected not in done:
+            self.disconnected_intentionally = True
+            self.cancel_autoreconnect()
+            raise ConnectionError(f"{self.username}: could not connect to {self.server_address}")
+
+    def on_package(self, cmd: str, args: dict) -> None:
+        now = time.perf_counter
+        if cmd == "Connected":
+            self.unchecked_locations = list(self.missing_locations)
+            self.all_locations = list(self.server_locations)
+            random.shuffle(self.unchecked_locations)
+            if not self.connected.done():
+                self.connected.set_result(None)
+        elif cmd == "RoomUpdate":
+            for location in args.get("checked_locations", ()):
+                start = self.pending_checks.pop(location, None)
+                if start is not None:
+                    self.stats.add("checks", now() - start)
+        elif cmd == "LocationInfo":
+            for item in args["locations"]:
+                pending = self.pending_scouts.get(item.location)
+                if pending:
+                    kind, start = pending.popleft()
+                    self.stats.add(kind, now() - start)
+        elif cmd in ("SetReply", "Retrieved"):
+            self.resolve(args.get("load_id"))
+        elif cmd == "Bounced":
+            self.resolve(args.get("data", {}).get("load_id"))
+
+    def resolve(self, load_id: Any) -> None:
+        if load_id is not None:
+            pending = self.pending.pop(load_id, None)
+            if pending:
+                kind, start = pending
+                self.stats.add(kind, time.perf_counter() - start)
+
+    async def send_traffic(self, kind: str) -> None:
+        load_id = f"{self.key}_{next(self.ids)}"
+        start = time.perf_counter()
+        if kind == "checks":
+            if "Tracker" in self.tags or not self.unchecked_locations:
+                return  # trackers don't play, or everything was checked already
+            location = self.unchecked_locations.pop()
+            self.pending_checks[location] = start
+            msg = {"cmd": "LocationChecks", "locations": [location]}
+        elif kind in ("scouts", "hints"):
+            if not self.all_locations:
+                return
+            location = random.choice(self.all_locations)
+            self.pending_scouts[location].append((kind, start))
+            msg = {"cmd": "LocationScouts", "locations": [location], "create_as_hint": 2 if kind == "hints" else 0}
+        elif kind == "sets":
+            self.pending[load_id] = (kind, start)
+            msg = {"cmd": "Set", "key": self.key, "default": 0, "want_reply": True, "load_id": load_id,
+                   "operations": [{"operation": "add", "value": 1}]}
+        elif kind == "gets":
+            self.pending[load_id] = (kind, start)
+            msg = {"cmd": "Get", "keys": [self.key], "load_id": load_id}
+        elif kind == "bounces":
+            self.pending[load_id] = (kind, start)
+            msg = {"cmd": "Bounce", "slots": [self.slot], "data": {"load_id": load_id}}
+        elif kind == "deathlinks":
+            self.pending[load_id] = (kind, start)
+            msg = {"cmd": "Bounce", "tags": ["DeathLink"], "data": {
+                "time": time.time(), "source": self.username, "cause": "load test", "load_id": load_id}}
+        else:
+            raise ValueError(f"Unknown traffic {kind}")
+        self.stats.sent[kind] += 1
+        await self.send_msgs([msg])
+
+    async def run(self, mix: TrafficMix, duration: float) -> None:
+        async def send_regularly(kind: str, rate: float) -> None:
+            while True:
+                await asyncio.sleep(random.expovariate(rate))
+                await self.send_traffic(kind)
+
+        senders = [asyncio.create_task(send_regularly(kind, rate)) for kind, rate in mix.rates().items()]
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            for sender in senders:
+                sender.cancel()
+            await asyncio.sleep(1)  # late replies still count
+            await self.shutdown()
+
+
+async def run_load(address: str, slots: List[str], game: str, mix: TrafficMix, duration: float,
+                   clients_per_slot: int = 1, connect_rate: float = 100, password: Optional[str] = None
+                   ) -> LatencyStats:
+    """Connects clients_per_slot clients to each slot, with connect_rate new connections per second,
+    lets all of them send traffic for duration seconds and returns the measured latencies.
+    Additional clients of a slot connect as trackers, which send everything but location checks."""
+    stats = LatencyStats()
+    tags = ["DeathLink"] if mix.deathlinks > 0 else []
+    clients = [SimulatedClient(address, slot, game, tags + (["Tracker"] if n else []), stats, password)
+               for slot in slots for n in range(clients_per_slot)]
+    connect_start = time.perf_counter()
+    for n, client in enumerate(clients):
+        delay = connect_start + n / connect_rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await client.connect()
+        stats.add("connect", time.perf_counter() - start)
+    stats.sent["connect"] = len(clients)
+    print(f"Connected {len(clients)} clients in {time.perf_counter() - connect_start:.1f} seconds")
+    await asyncio.gather(*(client.run(mix, duration) for client in clients))
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = TrafficMix()
+    parser = argparse.ArgumentParser(description="Load test a room with simulated clients on localhost.")
+    parser.add_argument("--players", type=int, default=10, help="Slots to generate and connect to.")
+    parser.add_argument("--clients_per_slot", type=int, default=1,
+                        help="Clients per slot, everything past the first one connects as a tracker.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to send traffic for.")
+    parser.add_argument("--connect_rate", type=float, default=100, help="New connections per second.")
+    parser.add_argument("--webhost", action="store_true",
+                        help="Host the fixture seed in a WebHost room instead of MultiServer.")
+    parser.add_argument("--address", help="Load an already running room instead, "
+                                          "with slots named Player1 to Player<players> playing --game.")
+    parser.add_argument("--game", default="Clique")
+    parser.add_argument("--password")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the simulated traffic.")
+    for field in dataclasses.fields(TrafficMix):
+        parser.add_argument(f"--{field.name}", type=float, default=getattr(defaults, field.name),
+                            help=f"{field.name.capitalize()} per second per client.")
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    mix = TrafficMix(**{field.name: getattr(args, field.name) for field in dataclasses.fields(TrafficMix)})
+    slots = [f"Player{n}" for n in range(1, args.players + 1)]
+
+    def load(address: str) -> None:
+        stats = asyncio.run(run_load(address, slots, args.game, mix, args.duration, args.clients_per_slot,
+                                     args.connect_rate, args.password))
+        print(stats.format())
+
+    if args.address:
+        load(args.address)
+        return
+
+    from test.hosting.generate import generate_local
+    from test.hosting.serve import LocalServeGame, WebHostServeGame
+
+    with TemporaryDirectory() as tempdir:
+        print(f"Generating fixture seed with {args.players} slots of {args.game}")
+        multidata = generate_local([args.game] * args.players, tempdir)
+        if not args.webhost:
+            with LocalServeGame(multidata) as host:
+                load(host.address)
+            return
+
+        from test.hosting.webhost import create_room, get_app, stop_autohost, upload_multidata
+        from WebHostLib.autolauncher import autohost
+        webapp = get_app(tempdir)
+        webhost_client = webapp.test_client()
+        room = create_room(webhost_client, upload_multidata(webhost_client, multidata))
+        autohost(webapp.config)
+        try:
+            with WebHostServeGame(webhost_client, room) as host:
+                load(host.address)
+        finally:
+            stop_autohost(False)
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", ResourceWarning)
+    warnings.simplefilter("ignore", UserWarning)
+    main(parse_args())
@@ -0,0 +1,86 @@
+# Tests for the fast path of NetUtils.encode
+import random
+import unittest
+
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, _encode, \
+    _scan_for_TypedTuples, encode
+
+
+def reference_encode(obj) -> str:
+    return _encode(_scan_for_TypedTuples(obj))
+
+
+class TestEncode(unittest.TestCase):
+    def assert_same_encoding(self, obj) -> None:
+        self.assertEqual(encode(obj), reference_encode(obj))
+        self.assertEqual(encode(obj), reference_encode(obj))  # again, from cached fragments
+
+    def test_commands(self) -> None:
+        rng = random.Random(42)
+        items = [NetworkItem(rng.randrange(1 << 40), rng.randrange(-2, 1 << 20), rng.randrange(100), rng.randrange(8))
+                 for _ in range(1000)]
+        players = [NetworkPlayer(0, 1, "Alias \"quoted\" \\ \n", "Näme ✓"), NetworkPlayer(1, 2, "", "Name")]
+        slot_info = {
+            1: NetworkSlot("Player1", "A Game", SlotType.player),
+            2: NetworkSlot("Group", "A Game", SlotType.group, [1, 3]),
+            3: NetworkSlot("Spectator", "Ünicode ", SlotType.spectator, ()),
+        }
+        commands = [
+            {"cmd": "ReceivedItems", "index": 0, "items": items},
+            {"cmd": "ReceivedItems", "index": 5, "items": []},
+            {"cmd": "Connected", "team": 0, "slot": 1, "players": players, "missing_locations": [1, 2, 3],
+             "checked_locations": {4, 5}, "slot_info": slot_info, "hint_points": 3,
+             "slot_data": {"nested": {"list": [1.5, None, True, "text"]}, "hint": Hint(1, 2, 3, 4, False)}},
+            {"cmd": "LocationInfo", "locations": items[:10]},
+            {"cmd": "PrintJSON", "type": "ItemSend", "receiving": 1, "item": items[0],
+             "data": [{"text": "sent"}]},
+            {"cmd": "RoomUpdate", "players": tuple(players)},
+            {"cmd": "Bounced", "data": {"time": 1.25, "cause": None}},
+        ]
+        for command in commands:
+            with self.subTest(cmd=command["cmd"]):
+                self.assert_same_encoding([command])
+        self.assert_same_encoding(commands)
+        self.assert_same_encoding({"cmd": "ReceivedItems", "items": items})
+
+    def test_unusual_values(self) -> None:
+        """Values the fast path does not handle itself have to be encoded like before."""
+        item = NetworkItem(1, 2, 3, 0)
+        values = [
+            NetworkItem(True, 2, 3, False),
+            NetworkItem(1, 2, 3, ClientStatus.CLIENT_GOAL),
+            NetworkPlayer(0, 1, "alias", None),
+            NetworkSlot("name", "game", 1),
+            NetworkSlot("name", "game", SlotType.player, None),
+            [1, item, "mixed"],
+            [item, 1, "mixed", [item]],
+            {item, NetworkItem(4, 5, 6, 7)},
+            {1.5: item},
+            {None: item, True: item},
+            {"a": item, 2: [item], "b": {}},
+            {"deep": {"deeper": [item]}},
+            (),
+            [],
+            {},
+            "text",
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                self.assert_same_encoding([{"cmd": "Test", "value": value}])
+                self.assert_same_encoding(value)
+
+    def test_equal_items(self) -> None:
+        """Equal items of different types can't share cached fragments."""
+        for item in (NetworkItem(1, 2, 3, 0), NetworkItem(True, 2, 3, 0), NetworkItem(1.0, 2, 3, 0)):
+            with self.subTest(item=item):
+                self.assert_same_encoding([{"cmd": "ReceivedItems", "index": 0, "items": [item]}])
+
+    def test_received_items_cached(self) -> None:
+        """Items rebuilt from a ReceivedItemsLog for every packet reuse the cached fragments."""
+        import NetUtils
+        log = NetUtils.ReceivedItemsLog()
+        log.splice(0, [NetworkItem(item, item, 1, 0) for item in range(1000)], [True] * 1000)
+        NetUtils._encoded_network_items.clear()
+        for _ in range(5):
+            self.assert_same_encoding([{"cmd": "ReceivedItems", "index": 0, "items": log.get_items(True)}])
+        self.assertEqual(len(NetUtils._encoded_network_items), 1000)
@@ -3,7 +3,7 @@ import os
 import typing
 import unittest
 import warnings
-from NetUtils import LocationStore, _LocationStore
+from NetUtils import LocationBitmap, LocationStore, _LocationStore
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
 RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
@@ -165,6 +165,46 @@ class Base:
             with self.assertRaises(KeyError):
                 self.store.get_remaining(bad_state, 0, 9999)
 
+        def test_location_bitmap(self) -> None:
+            self.assertEqual(self.store.get_location_index(1, 12), 1)
+            self.assertEqual(self.store.get_location_index(2, 21), 0)
+            self.assertEqual(self.store.get_location_index(1, 21), -1)
+            self.assertEqual(self.store.get_location_index(9999, 9), -1)
+            self.assertEqual(self.store.locations_to_bitmap(1, [13, 11, 99]), 0b101)
+            self.assertEqual(self.store.bitmap_to_locations(1, 0b101), [11, 13])
+            self.assertEqual(self.store.bitmap_to_locations(1, ~0b101), [12])
+            with self.assertRaises(KeyError):
+                self.store.locations_to_bitmap(9999, [9])
+
+            checks = LocationBitmap(self.store, 1)
+            checks.add(12)
+            checks |= {13, 21}  # 21 belongs to slot 2, so it's ignored
+            self.assertEqual(checks, {12, 13})
+            self.assertEqual(len(checks), 2)
+            self.assertIn(13, checks)
+            self.assertNotIn(11, checks)
+            self.assertNotIn("13", checks)
+            self.assertEqual(checks - {12}, {13})
+            checks.discard(12)
+            checks.discard(21)
+            self.assertEqual(list(checks), [13])
+
+        def test_location_bitmap_queries(self) -> None:
+            for state in (full_state, one_state, empty_state):
+                bitmap_state = {key: LocationBitmap(self.store, key[1], self.store.locations_to_bitmap(key[1], checks))
+                                for key, checks in state.items()}
+                for slot in (1, 3):
+                    key = (0, slot)
+                    if key not in state:
+                        continue
+                    with self.subTest(state=state, slot=slot):
+                        self.assertEqual(self.store.get_checked(bitmap_state, 0, slot),
+                                         self.store.get_checked(state, 0, slot))
+                        self.assertEqual(self.store.get_missing(bitmap_state, 0, slot),
+                                         self.store.get_missing(state, 0, slot))
+                        self.assertEqual(self.store.get_remaining(bitmap_state, 0, slot),
+                                         self.store.get_remaining(state, 0, slot))
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -298,3 +338,43 @@ class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
             self.type({
                 1: {1: None},
             })
+
+
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestLocationStoreIndexes(unittest.TestCase):
+    """Compare the reverse index lookups of both implementations on a larger store."""
+    def setUp(self) -> None:
+        self.assertFalse(LocationStore is _LocationStore, "Failed to load _speedups")
+        import random
+        rng = random.Random(0)
+        # receivers above the player count act like item link groups
+        self.data: RawLocations = {
+            sender: {
+                location: (rng.randint(1, 20), rng.randint(1, 12), rng.choice((0, 1, 2, 4)))
+                for location in rng.sample(range(1, 1000), rng.randint(0, 50))
+            } for sender in range(1, 11)
+        }
+        self.stores = (_LocationStore(self.data), LocationStore(self.data))
+
+    def test_find_item(self) -> None:
+        slot_sets = [{slot} for slot in range(14)] + [set(range(14)), {2, 11}, {1, 5, 12}]
+        for slots in slot_sets:
+            for item in range(22):
+                expected = sorted((sender, location, item_id, receiver, flags)
+                                  for sender, locations in self.data.items()
+                                  for location, (item_id, receiver, flags) in locations.items()
+                                  if item_id == item and receiver in slots)
+                for store in self.stores:
+                    with self.subTest(store=type(store).__name__, slots=slots, item=item):
+                        self.assertEqual(sorted(store.find_item(slots, item)), expected)
+
+    def test_get_for_player(self) -> None:
+        for slot in range(14):
+            expected: typing.Dict[int, typing.Set[int]] = {}
+            for sender, locations in self.data.items():
+                for location, (_, receiver, _) in locations.items():
+                    if receiver == slot:
+                        expected.setdefault(sender, set()).add(location)
+            for store in self.stores:
+                with self.subTest(store=type(store).__name__, slot=slot):
+                    self.assertEqual(store.get_for_player(slot), expected)
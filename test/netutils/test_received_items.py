@@ -0,0 +1,42 @@
+import unittest
+
+from NetUtils import NetworkItem, ReceivedItemsLog
+
+items = [NetworkItem(1, 10, 1, 1), NetworkItem(2, 20, 2, 0), NetworkItem(2 ** 40, -1, 2, 4), NetworkItem(3, 30, 1)]
+local = [True, False, False, True]
+
+
+class TestReceivedItemsLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.log = ReceivedItemsLog()
+        self.log.splice(0, items[:2], local[:2])
+        self.log.splice(2, items[2:], local[2:])
+
+    def test_views(self) -> None:
+        self.assertEqual(len(self.log), 4)
+        self.assertEqual(self.log.count(True), 4)
+        self.assertEqual(self.log.count(False), 2)
+        self.assertEqual(self.log.get_items(True), items)
+        self.assertEqual(self.log.get_items(False), [items[0], items[3]])
+        self.assertEqual(self.log.get_items(True, 3), [items[3]])
+        self.assertEqual(self.log.get_items(False, 1), [items[3]])
+        self.assertEqual(list(self.log.iter_fields(True, 1, 3)), [tuple(item) for item in items[1:3]])
+        self.assertEqual(list(self.log.iter_fields(False, 0, 1)), [tuple(items[0])])
+
+    def test_splice_again(self) -> None:
+        """Replaying a splice, like a journal record already contained in a save, changes nothing."""
+        self.log.splice(2, items[2:], local[2:])
+        self.assertEqual(self.log.get_items(True), items)
+        self.assertEqual(self.log.get_items(False), [items[0], items[3]])
+
+    def test_save(self) -> None:
+        data = self.log.to_save()
+        self.assertTrue(all(isinstance(column, bytes) for column in data))
+        loaded = ReceivedItemsLog.from_save(data)
+        self.assertEqual(loaded.get_items(True), items)
+        self.assertEqual(loaded.get_items(False), [items[0], items[3]])
+
+    def test_from_lists(self) -> None:
+        log = ReceivedItemsLog.from_lists(items, [items[0], items[3]])
+        self.assertEqual(log.get_items(True), items)
+        self.assertEqual(log.get_items(False), [items[0], items[3]])
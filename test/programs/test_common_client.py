@@ -1,7 +1,8 @@
 import unittest
+from unittest import mock
 
 import NetUtils
-from CommonClient import CommonContext
+from CommonClient import CommonContext, process_server_cmd
 
 
 class TestCommonContext(unittest.IsolatedAsyncioTestCase):
@@ -104,3 +105,40 @@ class TestCommonContext(unittest.IsolatedAsyncioTestCase):
         assert self.ctx.item_names.lookup_in_slot(-1, 3) == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame1") == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame2") == "Nothing"
+
+
+class TestResumeItems(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.ctx = CommonContext()
+        self.ctx.slot = 1
+        self.items = [NetUtils.NetworkItem(1, location, 2, 0) for location in range(3)]
+        self.ctx.items_received = list(self.items)
+
+    async def test_resume_on_connect(self):
+        self.ctx.reset_server_state()
+        self.assertEqual(self.ctx.items_received, [])
+        with mock.patch.object(self.ctx, "send_msgs", mock.AsyncMock()) as send_msgs:
+            await self.ctx.send_connect()
+        connect = send_msgs.call_args_list[0].args[0][0]
+        self.assertEqual(connect["items_index"], 3)
+        self.assertEqual(connect["items_checksum"], NetUtils.get_items_checksum(self.items))
+        self.assertTrue(self.ctx.resume_items_offered)
+
+    async def test_no_resume_on_other_slot(self):
+        self.ctx.auth = "Player1"
+        self.ctx.reset_server_state()
+        self.ctx.auth = "Player2"
+        with mock.patch.object(self.ctx, "send_msgs", mock.AsyncMock()) as send_msgs:
+            await self.ctx.send_connect()
+        connect = send_msgs.call_args_list[0].args[0][0]
+        self.assertNotIn("items_index", connect)
+        self.assertFalse(self.ctx.resume_items_offered)
+        self.assertEqual(self.ctx.resume_items, [])
+
+    async def test_sync_with_checksum(self):
+        with mock.patch.object(self.ctx, "send_msgs", mock.AsyncMock()) as send_msgs:
+            await process_server_cmd(self.ctx, {"cmd": "ReceivedItems", "index": 5, "items": self.items[:1]})
+        sync = send_msgs.call_args_list[0].args[0][0]
+        self.assertEqual(sync, {"cmd": "Sync", "items_index": 3,
+                                "items_checksum": NetUtils.get_items_checksum(self.items)})
+        self.assertEqual(len(self.ctx.items_received), 3)
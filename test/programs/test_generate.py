@@ -1,6 +1,7 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
 import unittest
+import unittest.mock
 import os
 import os.path
 import sys
@@ -72,6 +73,41 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_release_logic(self):
+        """Logic is dropped before output if no world needs it, the spoiler still gets its playthrough."""
+        import json
+        import zipfile
+        with TemporaryDirectory() as input_dir:
+            with open(os.path.join(input_dir, "clique.yaml"), "w") as f:
+                f.write("name: Player1\ngame: Clique\nClique: {}\n")
+            sys.argv = [sys.argv[0], '--seed', '0', '--spoiler', '3',
+                        '--player_files_path', input_dir,
+                        '--outputpath', self.output_tempdir.name]
+            args, seed = Generate.main()
+        args.release_logic = True
+        calls = []
+        release_logic = Main.MultiWorld.release_logic
+        call_stage = Main.AutoWorld.call_stage
+
+        def record_release_logic(multiworld: Main.MultiWorld) -> None:
+            calls.append("release_logic")
+            release_logic(multiworld)
+
+        def record_call_stage(multiworld: Main.MultiWorld, method_name: str, *args) -> None:
+            calls.append(method_name)
+            call_stage(multiworld, method_name, *args)
+
+        with unittest.mock.patch.object(Main.MultiWorld, "release_logic", record_release_logic), \
+                unittest.mock.patch.object(Main.AutoWorld, "call_stage", record_call_stage):
+            multiworld = Main.main(args, seed)
+
+        self.assertOutput(self.output_tempdir.name)
+        self.assertLess(calls.index("release_logic"), calls.index("generate_output"))
+        self.assertFalse(list(multiworld.get_entrances()))
+        with zipfile.ZipFile(next(Path(self.output_tempdir.name).glob("*.zip"))) as zf:
+            spoiler_index = json.loads(zf.read(next(name for name in zf.namelist() if name.endswith("_Spoiler.json"))))
+        self.assertTrue(spoiler_index["playthrough"])
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +144,7 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_release_logic = None
 
     def test_generate_yaml(self):
         from settings import get_settings
@@ -1,5 +1,40 @@
+import asyncio
+import json
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from unittest import mock
+
+from MultiServer import Client, Context, HintSet, SaveJournal, ServerCommandProcessor, collect_hint_location_id, \
+    collect_player, get_resync_items, parse_bounce_rate_limits, process_client_cmd, register_location_checks, \
+    release_player
+from NetUtils import Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType, encode, get_items_checksum
+from Utils import Version
+
+
+def make_context(players: int = 3) -> Context:
+    """Sets up a Context for a single team without clients, each slot has 3 locations that send item 1 around."""
+    ctx = Context("", 0, "", "", 0, 0, False)
+    ctx.locations = LocationStore({
+        slot: {slot * 10 + index: (1, slot % players + 1, 0) for index in range(3)} for slot in range(1, players + 1)
+    })
+    ctx.clients = {0: {slot: [] for slot in range(1, players + 1)}}
+    for slot in range(1, players + 1):
+        ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Archipelago", SlotType.player)
+        ctx.player_names[0, slot] = f"Player{slot}"
+        ctx.games[slot] = "Archipelago"
+    return ctx
+
+
+def connect_client(ctx: Context, slot: int, team: int = 0) -> Client:
+    client = Client(None, ctx)
+    client.auth = True
+    client.team = team
+    client.slot = slot
+    client.items_handling = 0b111
+    ctx.clients[team][slot].append(client)
+    return client
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +73,658 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestHintRecheck(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.hint = Hint(2, 1, 10, 1, False, status=HintStatus.HINT_PRIORITY)
+        self.other_hint = Hint(1, 3, 30, 1, False)
+        self.ctx.notify_hints(0, [self.hint, self.other_hint])
+
+    async def test_check_updates_affected_hints(self) -> None:
+        with mock.patch.object(self.ctx, "on_changed_hints") as on_changed_hints:
+            register_location_checks(self.ctx, 0, 1, [11])
+            on_changed_hints.assert_not_called()
+            register_location_checks(self.ctx, 0, 1, [10])
+        self.assertEqual({call.args for call in on_changed_hints.call_args_list}, {(0, 1), (0, 2)})
+        found_hint = self.hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(self.ctx.hints[0, 1], {found_hint, self.other_hint})
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint})
+        self.assertEqual(self.ctx.hints[0, 3], {self.other_hint})
+        self.assertEqual(self.ctx.hint_index[0, 1, 10], found_hint)
+
+    async def test_index_follows_replaced_hints(self) -> None:
+        new_hint = self.hint.re_prioritize(self.ctx, HintStatus.HINT_AVOID)
+        self.ctx.replace_hint(0, 1, self.hint, new_hint)
+        self.ctx.replace_hint(0, 2, self.hint, new_hint)
+        self.assertEqual(self.ctx.hint_index[0, 1, 10].status, HintStatus.HINT_AVOID)
+        register_location_checks(self.ctx, 0, 1, [10])
+        self.assertTrue(all(hint.found for hint in self.ctx.hints[0, 2]))
+
+
+class TestHintSet(unittest.TestCase):
+    def test_replace(self) -> None:
+        """Each location has one hint in a set, adding a hint with a new status replaces the old one."""
+        hint = Hint(2, 1, 10, 1, False)
+        hints = HintSet([hint, Hint(1, 3, 10, 1, False)])
+        self.assertIn(hint, hints)
+        self.assertEqual(hints.get(1, 10), hint)
+        avoided = hint.re_prioritize(None, HintStatus.HINT_AVOID)
+        self.assertNotIn(avoided, hints)
+        hints.add(avoided)
+        self.assertEqual(len(hints), 2)
+        self.assertNotIn(hint, hints)
+        self.assertEqual(hints, {avoided, Hint(1, 3, 10, 1, False)})
+        hints.discard(hint)
+        self.assertEqual(len(hints), 2)
+        hints.discard(avoided)
+        self.assertEqual(set(hints), {Hint(1, 3, 10, 1, False)})
+
+    def test_collect_existing_hint(self) -> None:
+        """Previous hints are found by their finding player, not the one asking."""
+        ctx = make_context()
+        hint = Hint(2, 1, 10, 1, False, status=HintStatus.HINT_PRIORITY)
+        ctx.notify_hints(0, [hint])
+        self.assertEqual(collect_hint_location_id(ctx, 0, 1, 10, HintStatus.HINT_UNSPECIFIED), [hint])
+        self.assertIsNone(ctx.get_hint(0, 2, 10))
+
+
+class TestItemDispatch(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesce_received_items(self) -> None:
+        ctx = make_context()
+        receiver = connect_client(ctx, 2)
+        bystander = connect_client(ctx, 3)
+        with mock.patch.object(ctx, "queue_msgs") as send_msgs:
+            register_location_checks(ctx, 0, 1, [10])
+            register_location_checks(ctx, 0, 1, [11, 12])
+            await asyncio.sleep(0)  # flush
+        received = [(call.args[0], call.args[1][0]) for call in send_msgs.call_args_list
+                    if call.args[1][0]["cmd"] == "ReceivedItems"]
+        self.assertEqual(len(received), 1)
+        client, msg = received[0]
+        self.assertIs(client, receiver)
+        self.assertEqual(msg["index"], 0)
+        self.assertEqual(sorted(item.location for item in msg["items"]), [10, 11, 12])
+        self.assertEqual(receiver.send_index, 3)
+        self.assertEqual(bystander.send_index, 0)
+
+
+class TestItemDispatchWithoutLoop(unittest.TestCase):
+    def test_send_right_away(self) -> None:
+        """Console and admin commands may run without an event loop, items are sent immediately then."""
+        ctx = make_context()
+        receiver = connect_client(ctx, 2)
+        with mock.patch.object(ctx, "queue_msgs") as send_msgs:
+            register_location_checks(ctx, 0, 1, [10])
+        received = [call.args[1][0] for call in send_msgs.call_args_list if call.args[1][0]["cmd"] == "ReceivedItems"]
+        self.assertEqual(len(received), 1)
+        self.assertEqual(receiver.send_index, 1)
+        self.assertIsNone(ctx.item_flush_handle)
+        self.assertFalse(ctx.pending_item_receivers)
+
+
+class TestReleaseCollect(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.clients = {slot: connect_client(self.ctx, slot) for slot in (1, 2, 3)}
+        self.sent: typing.List[typing.Tuple[typing.List[Client], typing.List[dict]]] = []
+        self.ctx.broadcast = lambda endpoints, msgs: self.sent.append((list(endpoints), msgs))
+        self.ctx.broadcast_team = lambda team, msgs: self.sent.append(
+            ([client for clients in self.ctx.clients[team].values() for client in clients], msgs))
+
+    def messages_for(self, slot: int, cmd: str) -> typing.List[dict]:
+        return [msg for endpoints, msgs in self.sent if self.clients[slot] in endpoints
+                for msg in msgs if msg["cmd"] == cmd]
+
+    async def test_release(self) -> None:
+        self.ctx.hints[0, 2].add(Hint(2, 1, 11, 1, False))
+        self.ctx.index_hints(0, self.ctx.hints[0, 2])
+        with mock.patch.object(self.ctx, "save") as save, \
+                mock.patch.object(self.ctx, "on_changed_hints") as on_changed_hints:
+            release_player(self.ctx, 0, 1)
+        save.assert_called_once()
+        self.assertEqual({call.args for call in on_changed_hints.call_args_list}, {(0, 1), (0, 2)})
+        self.assertEqual(self.ctx.location_checks[0, 1], {10, 11, 12})
+        room_updates = self.messages_for(1, "RoomUpdate")
+        self.assertEqual(len(room_updates), 1)
+        self.assertEqual(room_updates[0]["checked_locations"], {10, 11, 12})
+        # the team gets a summary, only the receiver gets the details, in one message
+        for slot in (1, 2, 3):
+            self.assertEqual([(msg["type"], msg["slot"]) for msg in self.messages_for(slot, "PrintJSON")
+                              if msg.get("type") != "ItemSend"], [("ItemSendSummary", 1)])
+        self.assertEqual(len([msg for msg in self.messages_for(2, "PrintJSON") if msg["type"] == "ItemSend"]), 3)
+        self.assertFalse([msg for msg in self.messages_for(3, "PrintJSON") if msg["type"] == "ItemSend"])
+        await asyncio.sleep(0)
+        self.assertEqual(self.clients[2].send_index, 3)
+
+    async def test_release_details(self) -> None:
+        """Clients with the ItemSendDetails tag get every ItemSend of the team, once."""
+        self.clients[3].tags = ["ItemSendDetails"]
+        extra_receiver = connect_client(self.ctx, 2)
+        extra_receiver.tags = ["ItemSendDetails"]
+        release_player(self.ctx, 0, 1)
+        for client in (self.clients[3], extra_receiver):
+            item_sends = [msg for endpoints, msgs in self.sent if client in endpoints
+                          for msg in msgs if msg.get("type") == "ItemSend"]
+            self.assertEqual(sorted(msg["item"].location for msg in item_sends), [10, 11, 12])
+        self.assertFalse([msg for msg in self.messages_for(1, "PrintJSON") if msg["type"] == "ItemSend"])
+
+    async def test_collect(self) -> None:
+        self.ctx.location_checks[0, 3] = {30}
+        collect_player(self.ctx, 0, 1)
+        # slot 1 receives from slot 3 only, one location was already checked
+        self.assertEqual(self.ctx.location_checks[0, 3], {30, 31, 32})
+        self.assertEqual([msg["checked_locations"] for msg in self.messages_for(3, "RoomUpdate")], [{31, 32}])
+        self.assertFalse(self.messages_for(2, "RoomUpdate"))
+
+
+class TestSpheres(unittest.TestCase):
+    def test_get_sphere(self) -> None:
+        ctx = make_context()
+        self.assertEqual(ctx.get_sphere(1, 10), -1)
+        ctx.spheres = [{1: {10}, 2: {20}}, {1: {11, 12}}]
+        ctx.sphere_index = ctx.build_sphere_index(ctx.spheres)
+        self.assertEqual(ctx.get_sphere(1, 10), 0)
+        self.assertEqual(ctx.get_sphere(2, 20), 0)
+        self.assertEqual(ctx.get_sphere(1, 12), 1)
+        with self.assertRaises(KeyError):
+            ctx.get_sphere(3, 30)
+
+
+class TestDataPackage(unittest.TestCase):
+    def test_encoded_data_package(self) -> None:
+        """Cached data package messages have to be identical to encoding them directly."""
+        from worlds import network_data_package
+
+        ctx = make_context()
+        for game in ("Archipelago", "Clique", "Timespinner"):
+            ctx.gamespackage[game] = network_data_package["games"][game]
+        ctx.gamespackage["Old Game"] = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {}}
+        for games in ([], ["Clique"], list(ctx.gamespackage)):
+            with self.subTest(games=games):
+                package = {game: ctx.gamespackage[game] for game in games}
+                expected = ctx.dumper([{"cmd": "DataPackage", "data": {"games": package}}])
+                self.assertEqual(ctx.get_encoded_data_package(games), expected)
+                self.assertEqual(ctx.get_encoded_data_package(games), expected)
+
+    def test_shared_name_tables(self) -> None:
+        """Contexts with the same data packages share their name tables, packages without checksum don't."""
+        from worlds import network_data_package
+
+        contexts = [make_context(), make_context()]
+        for ctx in contexts:
+            for game in ("Archipelago", "Clique"):
+                ctx._add_game_data(game, network_data_package["games"][game])
+            ctx._add_game_data("Old Game", {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Place": 2}})
+            ctx._init_game_data()
+        first, second = contexts
+        self.assertIs(first.item_names["Clique"], second.item_names["Clique"])
+        self.assertIs(first.all_location_and_group_names["Clique"], second.all_location_and_group_names["Clique"])
+        self.assertIsNot(first.item_names["Old Game"], second.item_names["Old Game"])
+        # Archipelago items and locations are part of each game's tables
+        self.assertEqual(first.item_names["Old Game"][1], "Item")
+        self.assertEqual(first.location_names["Old Game"][-1], "Cheat Console")
+        self.assertEqual(first.item_names["Old Game"][404], "Unknown item (ID:404)")
+        self.assertNotIn(404, first.item_names["Old Game"])
+        with self.assertRaises(TypeError):
+            first.item_names["Clique"][404] = "Item"
+
+
+class TestResumeItems(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.client = connect_client(self.ctx, 2)
+        self.ctx.start_inventory[2] = [NetworkItem(1, -2, 0)]
+        register_location_checks(self.ctx, 0, 1, [10, 11, 12])
+        self.items = self.ctx.start_inventory[2] + self.ctx.received_items[0, 2].get_items(True)
+
+    def test_resume(self) -> None:
+        packet = get_resync_items(self.ctx, self.client, {"items_index": 2,
+                                                          "items_checksum": get_items_checksum(self.items[:2])})
+        self.assertEqual(packet, {"cmd": "ReceivedItems", "index": 2, "items": self.items[2:]})
+        self.assertEqual(self.client.send_index, 4)
+
+    def test_resume_in_start_inventory(self) -> None:
+        packet = get_resync_items(self.ctx, self.client, {"items_index": 1,
+                                                          "items_checksum": get_items_checksum(self.items[:1])})
+        self.assertEqual(packet, {"cmd": "ReceivedItems", "index": 1, "items": self.items[1:]})
+
+    def test_up_to_date(self) -> None:
+        self.client.send_index = 0
+        packet = get_resync_items(self.ctx, self.client, {"items_index": 4,
+                                                          "items_checksum": get_items_checksum(self.items)})
+        self.assertIsNone(packet)
+        self.assertEqual(self.client.send_index, 4)
+
+    def test_fallback(self) -> None:
+        full = {"cmd": "ReceivedItems", "index": 0, "items": self.items}
+        self.assertEqual(get_resync_items(self.ctx, self.client, {}), full)
+        self.assertEqual(get_resync_items(self.ctx, self.client, {"items_index": 2, "items_checksum": "0"}), full)
+        self.assertEqual(get_resync_items(self.ctx, self.client, {
+            "items_index": 5, "items_checksum": get_items_checksum(self.items + self.items[:1])}), full)
+
+    def test_nothing_received(self) -> None:
+        client = connect_client(self.ctx, 1)
+        self.assertIsNone(get_resync_items(self.ctx, client, {}))
+        self.assertEqual(get_resync_items(self.ctx, client, {"items_index": 2, "items_checksum": "0"}),
+                         {"cmd": "ReceivedItems", "index": 0, "items": []})
+
+
+class TestSaveJournal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.save_filename = os.path.join(temp_dir.name, "test.apsave")
+
+    def load_context(self, journal: bool = True) -> Context:
+        ctx = make_context()
+        ctx.save_filename = self.save_filename
+        with mock.patch.object(ctx, "_start_async_saving"):
+            ctx.init_save(True, journal)
+        if ctx.save_journal:
+            self.addCleanup(ctx.save_journal.close)
+        return ctx
+
+    def make_changes(self, ctx: Context) -> None:
+        register_location_checks(ctx, 0, 1, [10, 11])
+        ctx.notify_hints(0, [Hint(3, 2, 21, 1, False)])
+        ctx.journal("set", "stored_data", "key", {"value": 1})
+
+    def assert_changes(self, ctx: Context) -> None:
+        self.assertEqual(ctx.location_checks[0, 1], {10, 11})
+        self.assertEqual([item.location for item in ctx.received_items[0, 2].get_items(True)], [10, 11])
+        self.assertEqual([item.location for item in ctx.received_items[0, 2].get_items(False)], [10, 11])
+        self.assertIn((0, 1), ctx.client_activity_timers)
+        self.assertEqual(ctx.hints[0, 3], {Hint(3, 2, 21, 1, False)})
+        self.assertEqual(ctx.get_hint(0, 2, 21), Hint(3, 2, 21, 1, False))
+        self.assertEqual(ctx.stored_data["key"], {"value": 1})
+
+    async def test_replay(self) -> None:
+        """Changes are recovered from the journal alone, if the server stopped before the first snapshot."""
+        ctx = self.load_context()
+        self.make_changes(ctx)
+        ctx.save_journal.close()
+        self.assertFalse(os.path.exists(self.save_filename))
+        self.assert_changes(self.load_context())
+
+    async def test_snapshot(self) -> None:
+        """Snapshots start a new journal generation and remove the ones they contain."""
+        ctx = self.load_context()
+        ctx.loop = asyncio.get_running_loop()
+        register_location_checks(ctx, 0, 1, [10])
+        self.assertTrue(await asyncio.to_thread(ctx._save))  # as done by the auto saver
+        self.assertEqual(SaveJournal.get_generations(self.save_filename), [1])
+        register_location_checks(ctx, 0, 1, [11])
+        ctx.save_journal.close()
+        loaded = self.load_context()
+        self.assertEqual(loaded.location_checks[0, 1], {10, 11})
+        self.assertEqual([item.location for item in loaded.received_items[0, 2].get_items(True)], [10, 11])
+        self.assertEqual(SaveJournal.get_generations(self.save_filename), [1, 2])
+
+    async def test_truncated_record(self) -> None:
+        ctx = self.load_context()
+        self.make_changes(ctx)
+        ctx.save_journal.close()
+        with open(SaveJournal.get_path(self.save_filename, 0), "ab") as f:
+            f.write(SaveJournal.record_header.pack(100) + b"cut short")
+        loaded = self.load_context()
+        self.assert_changes(loaded)
+        # the new changes go into the next generation, after the broken record
+        register_location_checks(loaded, 0, 1, [12])
+        loaded.save_journal.close()
+        self.assertEqual(self.load_context().location_checks[0, 1], {10, 11, 12})
+
+    async def test_location_check_bitmaps(self) -> None:
+        """Location checks are saved as one bitmap per slot, saves with sets of locations still load."""
+        ctx = self.load_context(journal=False)
+        register_location_checks(ctx, 0, 1, [10, 12])
+        self.assertEqual(ctx.get_save()["location_checks"], {(0, 1): 0b101})
+        self.assertEqual(ctx.locations.get_checked(ctx.location_checks, 0, 1), [10, 12])
+        self.assertEqual(ctx.locations.get_missing(ctx.location_checks, 0, 1), [11])
+
+        old_save = ctx.get_save()
+        old_save["version"] = 2
+        old_save["location_checks"] = {(0, 1): {10, 12}, (0, 2): {20}}
+        loaded = make_context()
+        loaded.set_save(old_save)
+        self.assertEqual(loaded.location_checks[0, 1], {10, 12})
+        self.assertEqual(loaded.get_save()["location_checks"], {(0, 1): 0b101, (0, 2): 0b1})
+
+    async def test_received_items_lists(self) -> None:
+        """Saves with separate lists of remote and local received items still load."""
+        ctx = self.load_context(journal=False)
+        self.make_changes(ctx)
+        items = ctx.received_items[0, 2].get_items(True)
+        old_save = ctx.get_save()
+        old_save["version"] = 3
+        old_save["received_items"] = {(0, 2, True): items, (0, 2, False): items[1:]}
+        loaded = make_context()
+        loaded.set_save(old_save)
+        self.assertEqual(loaded.received_items[0, 2].get_items(True), items)
+        self.assertEqual(loaded.received_items[0, 2].get_items(False), items[1:])
+
+    async def test_hint_lists(self) -> None:
+        """Hints are saved as lists, saves with sets of hints still load."""
+        ctx = self.load_context(journal=False)
+        self.make_changes(ctx)
+        hint = Hint(3, 2, 21, 1, False)
+        self.assertEqual(ctx.get_save()["hints"], {(0, 2): [hint], (0, 3): [hint]})
+        old_save = ctx.get_save()
+        old_save["version"] = 4
+        old_save["hints"] = {(0, 2): {hint}, (0, 3): {hint}}
+        loaded = make_context()
+        loaded.set_save(old_save)
+        self.assertEqual(loaded.hints[0, 3], {hint})
+        self.assertEqual(loaded.get_hint(0, 2, 21), hint)
+
+    async def test_load_save_without_journal(self) -> None:
+        ctx = self.load_context(journal=False)
+        self.assertIsNone(ctx.save_journal)
+        self.make_changes(ctx)
+        ctx.stored_data["key"] = {"value": 1}
+        self.assertTrue(ctx._save())
+        self.assert_changes(self.load_context(journal=True))
+        self.assert_changes(self.load_context(journal=False))
+
+
+class TestDataStorage(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.writer = connect_client(self.ctx, 1)
+        self.subscriber = connect_client(self.ctx, 2)
+        self.coalesced_subscriber = connect_client(self.ctx, 3)
+        self.sent: typing.List[typing.Tuple[typing.List[Client], typing.List[dict]]] = []
+        self.ctx.broadcast = lambda endpoints, msgs: self.sent.append((list(endpoints), msgs))
+        await process_client_cmd(self.ctx, self.subscriber, {"cmd": "SetNotify", "keys": ["key"]})
+        await process_client_cmd(self.ctx, self.coalesced_subscriber,
+                                 {"cmd": "SetNotify", "keys": ["key"], "coalesce": True})
+
+    async def add(self, value: int, **kwargs: typing.Any) -> None:
+        await process_client_cmd(self.ctx, self.writer, {
+            "cmd": "Set", "key": "key", "default": 0, "want_reply": False,
+            "operations": [{"operation": "add", "value": value}], **kwargs})
+
+    def replies_for(self, client: Client) -> typing.List[dict]:
+        return [msg for endpoints, msgs in self.sent if client in endpoints for msg in msgs]
+
+    async def test_coalesce(self) -> None:
+        for value in (1, 2, 3):
+            await self.add(value, tag=value)
+        self.assertEqual([(reply["value"], reply["version"]) for reply in self.replies_for(self.subscriber)],
+                         [(1, 1), (3, 2), (6, 3)])
+        self.assertFalse(self.replies_for(self.coalesced_subscriber))
+        await asyncio.sleep(0)
+        replies = self.replies_for(self.coalesced_subscriber)
+        self.assertEqual(len(replies), 1)
+        self.assertEqual((replies[0]["original_value"], replies[0]["value"], replies[0]["version"],
+                          replies[0]["tag"]), (0, 6, 3, 3))
+        self.assertFalse(self.replies_for(self.writer))
+        self.assertEqual(self.ctx.stored_data_versions, {"key": 3})
+
+    async def test_switch_mode(self) -> None:
+        await process_client_cmd(self.ctx, self.coalesced_subscriber, {"cmd": "SetNotify", "keys": ["key"]})
+        await self.add(1)
+        self.assertEqual(len(self.replies_for(self.coalesced_subscriber)), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.replies_for(self.coalesced_subscriber)), 1)
+
+    async def test_size_limits(self) -> None:
+        self.ctx.stored_data_slot_limit = 100
+        with mock.patch.object(self.ctx, "send_msgs", mock.AsyncMock()) as send_msgs:
+            await process_client_cmd(self.ctx, self.writer, {
+                "cmd": "Set", "key": "other", "operations": [{"operation": "replace", "value": "x" * 50}]})
+            await process_client_cmd(self.ctx, self.writer, {
+                "cmd": "Set", "key": "key", "operations": [{"operation": "replace", "value": "x" * 50}]})
+            self.assertEqual(send_msgs.call_args.args[1][0]["cmd"], "InvalidPacket")
+            self.assertNotIn("key", self.ctx.stored_data)
+            # other slots have their own limit
+            await process_client_cmd(self.ctx, self.subscriber, {
+                "cmd": "Set", "key": "key", "operations": [{"operation": "replace", "value": "x" * 50}]})
+            self.assertIn("key", self.ctx.stored_data)
+            # replacing a value only counts the new size
+            await process_client_cmd(self.ctx, self.writer, {
+                "cmd": "Set", "key": "other", "operations": [{"operation": "replace", "value": "y" * 50}]})
+            self.assertEqual(self.ctx.stored_data["other"], "y" * 50)
+
+            self.ctx.stored_data_key_limit = 20
+            await process_client_cmd(self.ctx, self.subscriber, {
+                "cmd": "Set", "key": "small", "operations": [{"operation": "replace", "value": "x" * 50}]})
+            self.assertNotIn("small", self.ctx.stored_data)
+            self.assertEqual(send_msgs.call_count, 2)
+
+    async def test_size_charges(self) -> None:
+        self.ctx.stored_data_slot_limit = 1000
+        writer, other = (self.writer.team, self.writer.slot), (self.subscriber.team, self.subscriber.slot)
+
+        async def replace(client: Client, value: str) -> None:
+            await process_client_cmd(self.ctx, client, {
+                "cmd": "Set", "key": "text", "operations": [{"operation": "replace", "value": value}]})
+
+        await replace(self.writer, "x" * 50)
+        size = self.ctx.stored_data_sizes["text"]
+        # only the growth is charged to the slot that made the value grow
+        await replace(self.subscriber, "x" * 80)
+        self.assertEqual(self.ctx.stored_data_slot_sizes[writer], size)
+        self.assertEqual(self.ctx.stored_data_slot_sizes[other], 30)
+        # shrinking releases the charges of the slot that shrinks it first
+        await replace(self.writer, "x" * 60)
+        self.assertEqual(self.ctx.stored_data_slot_sizes[writer], size - 20)
+        self.assertEqual(self.ctx.stored_data_slot_sizes[other], 30)
+
+        loaded = make_context()
+        loaded.stored_data_slot_limit = 1000
+        loaded.set_save(self.ctx.get_save())
+        self.assertEqual(loaded.stored_data_sizes, self.ctx.stored_data_sizes)
+        self.assertEqual(loaded.stored_data_slot_sizes, self.ctx.stored_data_slot_sizes)
+
+
+class TestBounce(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.ctx.games[3] = "Other Game"
+        self.clients = {slot: connect_client(self.ctx, slot) for slot in (1, 2, 3)}
+        self.clients[2].tags = ["DeathLink"]
+        for client in self.clients.values():
+            self.ctx.index_bounce_routes(client)
+        self.bounced: typing.List[typing.Tuple[typing.Set[Client], str]] = []
+        self.ctx.broadcast_send_encoded_msgs = mock.AsyncMock(
+            side_effect=lambda endpoints, msg: self.bounced.append((set(endpoints), msg)))
+
+    async def bounce(self, sender: int, **targets: typing.List[typing.Any]) -> typing.Set[Client]:
+        self.bounced.clear()
+        await process_client_cmd(self.ctx, self.clients[sender], {"cmd": "Bounce", "data": {}, **targets})
+        if self.bounced:
+            self.assertEqual(len(self.bounced), 1)
+            return self.bounced[0][0]
+        return set()
+
+    async def test_routes(self) -> None:
+        clients = self.clients
+        self.assertEqual(await self.bounce(1, games=["Other Game"]), {clients[3]})
+        self.assertEqual(await self.bounce(1, tags=["DeathLink"]), {clients[2]})
+        self.assertEqual(await self.bounce(1, slots=[1, 3]), {clients[1], clients[3]})
+        self.assertEqual(await self.bounce(3, games=["Archipelago"], tags=["DeathLink"]), {clients[1], clients[2]})
+        self.assertEqual(await self.bounce(1, tags=["Unknown"], slots=[99]), set())
+
+    async def test_route_updates(self) -> None:
+        await process_client_cmd(self.ctx, self.clients[3], {"cmd": "ConnectUpdate", "tags": ["DeathLink"]})
+        await process_client_cmd(self.ctx, self.clients[2], {"cmd": "ConnectUpdate", "tags": []})
+        self.assertEqual(await self.bounce(1, tags=["DeathLink"]), {self.clients[3]})
+        with mock.patch("MultiServer.on_client_disconnected", mock.AsyncMock()):
+            await self.ctx.disconnect(self.clients[3])
+        self.assertEqual(await self.bounce(1, tags=["DeathLink"], games=["Other Game"], slots=[3]), set())
+        self.assertNotIn("DeathLink", self.ctx.bounce_tag_routes[0])
+
+    async def test_rate_limit(self) -> None:
+        self.ctx.bounce_rate_limits = parse_bounce_rate_limits("DeathLink=60, Other=1")
+        self.assertEqual(self.ctx.bounce_rate_limits, {"DeathLink": 60.0, "Other": 1.0})
+        self.assertEqual(await self.bounce(1, tags=["DeathLink"]), {self.clients[2]})
+        self.assertEqual(await self.bounce(3, tags=["DeathLink"]), set())
+        # untagged bounces are not limited
+        self.assertEqual(await self.bounce(1, slots=[2]), {self.clients[2]})
+
+
+class TestOutboundQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = make_context()
+        self.client = connect_client(self.ctx, 1)
+        self.client.socket = mock.Mock(open=True, send=mock.AsyncMock(), close=mock.AsyncMock())
+        self.client.no_locations = False
+        self.ctx.endpoints.append(self.client)
+
+    def sent_frames(self) -> typing.List[typing.List[dict]]:
+        return [json.loads(call.args[0]) for call in self.client.socket.send.call_args_list]
+
+    async def test_merge_tick(self) -> None:
+        self.ctx.notify_client(self.client, "first")
+        self.ctx.broadcast([self.client], [{"cmd": "RoomUpdate"}, {"cmd": "RoomUpdate"}])
+        await self.ctx.send_msgs(self.client, [])
+        self.assertEqual(self.ctx.get_outbound_backlog()[0], self.client.outbound_size)
+        await asyncio.sleep(0)
+        self.assertEqual([[msg["cmd"] for msg in frame] for frame in self.sent_frames()],
+                         [["PrintJSON", "RoomUpdate", "RoomUpdate"]])
+        self.assertEqual(self.ctx.get_outbound_backlog(), (0, 0))
+
+    async def test_merge_while_sending(self) -> None:
+        sending = asyncio.Event()
+
+        async def send(msg: str) -> None:
+            await sending.wait()
+
+        self.client.socket.send.side_effect = send
+        self.ctx.notify_client(self.client, "first")
+        await asyncio.sleep(0)
+        # queued while the first frame is still being written
+        self.ctx.notify_client(self.client, "second")
+        await asyncio.sleep(0)
+        self.ctx.notify_client(self.client, "third")
+        self.assertEqual(len(self.client.outbound), 2)
+        sending.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual([[msg["data"][0]["text"] for msg in frame] for frame in self.sent_frames()],
+                         [["first"], ["second", "third"]])
+
+    async def test_frame_size(self) -> None:
+        """Merged frames stay below the frame size, in order, unless a single message is larger on its own."""
+        self.ctx.outbound_frame_size = 300
+        for index in range(10):
+            self.ctx.notify_client(self.client, f"{index}" * 50)
+        self.ctx.notify_client(self.client, "x" * 400)
+        self.ctx.notify_client(self.client, "last")
+        await asyncio.sleep(0)
+        frames = [call.args[0] for call in self.client.socket.send.call_args_list]
+        self.assertGreater(len(frames), 3)
+        self.assertTrue(all(len(frame) <= 300 for frame in frames if "x" * 400 not in frame))
+        texts = [msg["data"][0]["text"] for frame in frames for msg in json.loads(frame)]
+        self.assertEqual(texts, [f"{index}" * 50 for index in range(10)] + ["x" * 400, "last"])
+
+    async def test_limit(self) -> None:
+        self.ctx.outbound_limit = 200
+        async def send(msg: str) -> None:
+            await asyncio.Event().wait()  # never completes
+
+        self.client.socket.send.side_effect = send
+        for _ in range(10):
+            self.ctx.notify_client(self.client, "x" * 50)
+            await asyncio.sleep(0)
+        # game clients keep their messages
+        self.assertGreater(self.client.outbound_size, 200)
+        self.client.socket.close.assert_not_called()
+
+        self.client.no_locations = True
+        self.assertFalse(await self.ctx.send_msgs(self.client, [{"cmd": "RoomUpdate"}]))
+        await asyncio.sleep(0)
+        self.client.socket.close.assert_called_once()
+        self.assertEqual(self.client.outbound_size, 0)
+
+
+class TestServerMetrics(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from ServerMetrics import MetricsServer
+        self.ctx = make_context()
+        self.metrics = MetricsServer()
+        self.metrics.add_room("room", self.ctx)
+        connect_client(self.ctx, 1)
+
+    def test_render(self) -> None:
+        self.ctx.metrics.observe_command("Sync", 0.002)
+        self.ctx.metrics.observe_command(["not", "a", "command"], 3)
+        self.ctx.metrics.observe_frame("[]")
+        self.ctx.metrics.observe_save(0.5, 1234)
+        self.ctx.stored_data["key"] = 1
+        text = self.metrics.render()
+        self.assertIn('archipelago_room_clients{room="room"} 1\n', text)
+        self.assertIn('archipelago_room_command_seconds_bucket{room="room",cmd="Sync",le="0.0025"} 1\n', text)
+        self.assertIn('archipelago_room_command_seconds_bucket{room="room",cmd="Sync",le="0.001"} 0\n', text)
+        self.assertIn('archipelago_room_command_seconds_count{room="room",cmd="other"} 1\n', text)
+        self.assertIn('archipelago_room_outbound_bytes_total{room="room"} 2\n', text)
+        self.assertIn('archipelago_room_save_bytes{room="room"} 1234\n', text)
+        self.assertIn('archipelago_room_datastore_keys{room="room"} 1\n', text)
+        self.assertEqual(text.count("# TYPE archipelago_room_command_seconds histogram"), 1)
+
+    async def test_serve(self) -> None:
+        task = asyncio.create_task(self.metrics.serve(0))
+        self.addCleanup(task.cancel)
+        while not self.metrics.server:
+            await asyncio.sleep(0)
+        port = self.metrics.server.sockets[0].getsockname()[1]
+        for path, status in (("/metrics", b"200"), ("/other", b"404")):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            self.assertEqual(response.split(b" ", 2)[1], status)
+            if status == b"200":
+                self.assertIn(b"archipelago_rooms 1\n", response)
+
+
+class TestNetworkCapture(unittest.IsolatedAsyncioTestCase):
+    def make_context(self) -> Context:
+        ctx = make_context()
+        ctx.connect_names = {f"Player{slot}": (0, slot) for slot in range(1, 4)}
+        ctx.minimum_client_versions = {slot: Version(0, 0, 0) for slot in range(1, 4)}
+        return ctx
+
+    async def test_record_and_replay(self) -> None:
+        """Replaying a capture recorded by the server leads to the same state."""
+        from NetworkCapture import NetworkRecorder, read_capture, replay
+        from Utils import version_tuple
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        script = os.path.join(temp_dir.name, "script.jsonl")
+        capture = os.path.join(temp_dir.name, "capture.jsonl")
+
+        connect = {"cmd": "Connect", "game": "Archipelago", "name": "Player1", "password": None, "uuid": "",
+                   "version": version_tuple, "items_handling": 0b111, "tags": [], "slot_data": False}
+        packets = [connect, {"cmd": "LocationChecks", "locations": [10, 12]},
+                   {"cmd": "Set", "key": "key", "operations": [{"operation": "add", "value": 2}], "default": 1}]
+        writer = NetworkRecorder(script, "")
+        connection = writer.connect()
+        for packet in packets:
+            writer.message(connection, encode([packet]))
+        writer.disconnect(connection)
+        writer.close()
+
+        recorded = self.make_context()
+        recorded.network_capture = NetworkRecorder(capture, "")
+        await replay(recorded, script)
+        recorded.network_capture.close()
+        self.assertEqual([record["event"] for record in read_capture(capture)],
+                         ["start", "connect", "message", "message", "message", "disconnect"])
+
+        replayed = self.make_context()
+        await replay(replayed, capture)
+        for ctx in (recorded, replayed):
+            self.assertEqual(ctx.location_checks[0, 1], {10, 12})
+            self.assertEqual(ctx.stored_data["key"], 3)
+            self.assertFalse(ctx.endpoints)
+
+    def test_redact_secrets(self) -> None:
+        from NetworkCapture import redact_secrets
+        frame = encode([{"cmd": "Connect", "name": "Player1", "password": "secret"},
+                        {"cmd": "Say", "text": "!admin login secret"}, {"cmd": "Say", "text": "secret"}])
+        self.assertEqual(json.loads(redact_secrets(frame)),
+                         [{"cmd": "Connect", "name": "Player1", "password": ""},
+                          {"cmd": "Say", "text": "!admin"}, {"cmd": "Say", "text": "secret"}])
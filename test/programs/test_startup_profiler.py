@@ -0,0 +1,18 @@
+import unittest
+
+from StartupProfiler import parse_import_times
+
+
+class TestStartupProfiler(unittest.TestCase):
+    def test_parse_import_times(self):
+        output = "\n".join((
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   _io",
+            "import time:       300 |        420 | io",
+            "some warning printed while importing",
+            "import time:      1000 |       1000 |     worlds.clique",
+            "import time:       500 |       1500 |   worlds.AutoWorld",
+            "import time:       250 |       2000 | worlds",
+            "import time:        80 |         80 | io",
+        ))
+        self.assertEqual(parse_import_times(output), {"io": 0.0005, "worlds": 0.002})
@@ -0,0 +1,48 @@
+import random
+import string
+import unittest
+
+import jellyfish
+
+from Utils import FuzzyMatcher, get_fuzzy_results, get_intended_text
+
+
+def compare_all(input_word, word_list, limit=None):
+    """get_fuzzy_results as it was before FuzzyMatcher, comparing against every word"""
+    def get_fuzzy_ratio(word1, word2):
+        return (1 - jellyfish.damerau_levenshtein_distance(word1.lower(), word2.lower())
+                / max(len(word1), len(word2)))
+
+    ranked = sorted(((word, get_fuzzy_ratio(input_word, word)) for word in word_list),
+                    key=lambda element: element[1], reverse=True)
+    return [(word, int(ratio * 100)) for word, ratio in ranked[:limit if limit else len(word_list)]]
+
+
+class TestFuzzyMatcher(unittest.TestCase):
+    words = ["Progressive Sword", "progressive sword", "Progressive Shield", "Small Key (Forest Temple)",
+             "Small Key (Fire Temple)", "Small Key (Water Temple)", "Boss Key (Forest Temple)", "Bow", "Bomb",
+             "Bombs (10)", "Bombs (20)", "Heart Container", "Piece of Heart", "Rupee (1)", "Rupees (5)", "Arrows",
+             "ab", "ba", "abc", "cab"]
+
+    def test_same_results(self) -> None:
+        """Results and the order of ties match comparing against every word."""
+        random.seed(0)
+        words = self.words + ["".join(random.choice(string.ascii_letters + " ()") for _ in range(random.randint(1, 25)))
+                              for _ in range(500)]
+        matcher = FuzzyMatcher(words)
+        inputs = ["progressive sword", "PROGRESSIVE SHIELD", "small key forest", "Smal Key (Fire Temple)",
+                  "Bombs (1)", "bow", "Heart", "ab", "ba", "ca", "zzz", "x" * 40]
+        inputs += random.sample(words, 20)
+        for input_word in inputs:
+            for limit in (None, 1, 2, 3, 10, len(words)):
+                with self.subTest(input_word=input_word, limit=limit):
+                    self.assertEqual(compare_all(input_word, words, limit), matcher.get_results(input_word, limit))
+                    self.assertEqual(compare_all(input_word, words, limit),
+                                     get_fuzzy_results(input_word, words, limit))
+
+    def test_intended_text(self) -> None:
+        matcher = FuzzyMatcher(self.words)
+        self.assertEqual(("Bow", True, "Perfect Match"), get_intended_text("bow", matcher))
+        self.assertEqual(("Progressive Sword", True, "Perfect Match"), get_intended_text("Progressive Sword", matcher))
+        self.assertEqual(get_intended_text("Heart Contianer", self.words), get_intended_text("Heart Contianer", matcher))
+        self.assertEqual(get_intended_text("Small Key", self.words), get_intended_text("Small Key", matcher))
@@ -0,0 +1,86 @@
+import json
+from uuid import UUID, uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+class TestSpoilerIndex(TestBase):
+    seed_id: UUID
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed, SpoilerIndex
+
+        super().setUp()
+
+        with db_session:
+            seed = Seed(multidata=b"", owner=uuid4())
+            SpoilerIndex(seed=seed, player=0, data=json.dumps({"version": 1, "playthrough": {}, "paths": {}}))
+            SpoilerIndex(seed=seed, player=1, data=json.dumps({
+                "name": "Player1",
+                "game": "Archipelago",
+                "entrances": [],
+                "starting_items": [],
+                "locations": {"Cheat Console": ["Nothing", 2], "Empty": None},
+            }))
+            self.seed_id = seed.id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        with db_session:
+            Seed[self.seed_id].delete()
+
+    def test_player(self) -> None:
+        with self.app.app_context(), self.app.test_request_context():
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=1))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["name"], "Player1")
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=0))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["version"], 1)
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=2))
+            self.assertEqual(response.status_code, 404)
+
+    def test_location(self) -> None:
+        with self.app.app_context(), self.app.test_request_context():
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=1,
+                                               location="Cheat Console"))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json, {"location": "Cheat Console", "item": "Nothing", "item_player": 2})
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=1,
+                                               location="Empty"))
+            self.assertEqual(response.json["item"], None)
+            response = self.client.get(url_for("api.get_spoiler_index", seed_id=self.seed_id, player=1,
+                                               location="Missing"))
+            self.assertEqual(response.status_code, 404)
+
+    def test_load(self) -> None:
+        from flask import get_flashed_messages
+        from WebHostLib.upload import load_spoiler_index
+
+        index = {
+            "version": 1,
+            "seed": "1",
+            "players": {"1": {
+                "name": "Player1",
+                "game": "Archipelago",
+                "entrances": [{"entrance": "Menu", "exit": "Cheat Console", "direction": "both"}],
+                "starting_items": [],
+                "locations": {"Cheat Console": ["Nothing", 1], "Empty": None},
+            }},
+            "playthrough": {"0": [], "1": {"Cheat Console (Player1)": "Nothing (Player1)"}},
+            "unreachables": [],
+            "paths": {"Cheat Console (Player1)": [["Menu", "Cheat Console"], ["Cheat Console", None]]},
+        }
+        with self.app.test_request_context():
+            self.assertEqual(load_spoiler_index(json.dumps(index).encode()), index)
+            self.assertEqual(get_flashed_messages(), [])
+        for malformed in (b"{", b"[]", json.dumps({**index, "players": {"one": {}}}).encode(),
+                          json.dumps({key: value for key, value in index.items() if key != "players"}).encode()):
+            with self.subTest(malformed=malformed), self.app.test_request_context():
+                self.assertIsNone(load_spoiler_index(malformed))
+                self.assertEqual(len(get_flashed_messages()), 1)
@@ -93,3 +93,34 @@ class TestTracker(TestBase):
                 headers={"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00"},  # missing timezone
             )
             self.assertEqual(response.status_code, 400)
+
+    def test_sphere_tracker(self) -> None:
+        """
+        Verify that the sphere tracker lists checked locations with their sphere
+        """
+        import zlib
+        from pony.orm import db_session
+        from MultiServer import Context as MultiServerContext
+        from NetUtils import SlotType
+        from WebHostLib import cache
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import get_multiworld_sphere_tracker
+
+        multidata = MultiServerContext.decompress(self.data)
+        multidata["slot_info"][1] = multidata["slot_info"][1]._replace(type=SlotType.player)
+        multidata["locations"] = {1: {1: (1, 1, 0), 2: (1, 1, 0), 3: (1, 1, 0)}}
+        multidata["spheres"] = [{1: {1}}, {1: {2, 3}}]
+        # sets of locations from older saves and bitmaps over the sorted locations
+        for checks in ({1, 3}, 0b101):
+            with self.subTest(checks=checks):
+                with db_session:
+                    room = Room.get(id=self.room_id)
+                    room.seed.multidata = self.data[:1] + zlib.compress(pickle.dumps(multidata))
+                    room.multisave = pickle.dumps({"location_checks": {(0, 1): checks}})
+                with self.app.app_context(), self.app.test_request_context():
+                    cache.delete_memoized(get_multiworld_sphere_tracker)
+                    response = self.client.get(url_for("get_multiworld_sphere_tracker", tracker=self.tracker_uuid))
+                    self.assertEqual(response.status_code, 200)
+                    page = response.get_data(as_text=True)
+                    self.assertEqual(page.count("<td>1</td>"), 1)
+                    self.assertEqual(page.count("<td>2</td>"), 1)
@@ -5,6 +5,7 @@ import logging
 import pathlib
 import sys
 import time
+import tracemalloc
 from random import Random
 from dataclasses import make_dataclass
 from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, TextIO, Tuple,
@@ -21,8 +22,51 @@ if TYPE_CHECKING:
 perf_logger = logging.getLogger("performance")
 
 
+class LazyWorld:
+    """Placeholder for a world type that is known from the world manifest, but was not imported yet."""
+    __slots__ = ("load",)
+
+    def __init__(self, load: Callable[[], bool]) -> None:
+        self.load = load
+
+
+class WorldTypes(Dict[str, "Type[World]"]):
+    """Game name to world type mapping, importing lazily registered worlds on first access."""
+
+    def add_lazy(self, game: str, load: Callable[[], bool]) -> None:
+        dict.__setitem__(self, game, LazyWorld(load))
+
+    def __getitem__(self, game: str) -> Type[World]:
+        world_type = super().__getitem__(game)
+        if isinstance(world_type, LazyWorld):
+            world_type.load()  # registering the world replaces the placeholder
+            world_type = super().get(game, None)
+            if world_type is None or isinstance(world_type, LazyWorld):
+                # import failed or the source no longer provides this game
+                super().pop(game, None)
+                raise KeyError(game)
+        return world_type
+
+    def get(self, game: str, default: Any = None) -> Any:
+        try:
+            return self[game]
+        except KeyError:
+            return default
+
+    def items(self) -> List[Tuple[str, Type[World]]]:  # type: ignore[override]
+        items = []
+        for game in tuple(self):  # imports may register additional games
+            world_type = self.get(game)
+            if world_type is not None:
+                items.append((game, world_type))
+        return items
+
+    def values(self) -> List[Type[World]]:  # type: ignore[override]
+        return [world_type for _, world_type in self.items()]
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: Dict[str, Type[World]] = WorldTypes()
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -84,7 +128,8 @@ class AutoWorldRegister(type):
         # construct class
         new_class = super().__new__(mcs, name, bases, dct)
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
+            registered = dict.get(AutoWorldRegister.world_types, dct["game"])
+            if registered is not None and not isinstance(registered, LazyWorld):
                 raise RuntimeError(f"""Game {dct["game"]} already registered.""")
             AutoWorldRegister.world_types[dct["game"]] = new_class
         new_class.__file__ = sys.modules[new_class.__module__].__file__
@@ -149,9 +194,17 @@ class WebWorldRegister(type):
 
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
+    traced = player and multiworld and tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0]
     start = time.perf_counter()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if traced:
+        memory_end, memory_peak = tracemalloc.get_traced_memory()
+        multiworld.memory_usage.setdefault(player, {})[method.__name__] = \
+            memory_end - memory_start, memory_peak - memory_start
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -303,6 +356,10 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    logic_used_in_output: ClassVar[Optional[bool]] = None
+    """If False, generate_output and the spoiler methods don't query rules, regions, entrances or states, so generation
+    can drop the logic before writing output. None counts as True for worlds implementing any of these methods."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -1,15 +1,20 @@
 import importlib
 import importlib.util
+import json
 import logging
 import os
+import struct
 import sys
 import warnings
 import zipimport
 import time
 import dataclasses
-from typing import Dict, List, TypedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypedDict, Union, TYPE_CHECKING
 
-from Utils import local_path, user_path
+from Utils import __version__, cache_path, local_path, user_path
+
+if TYPE_CHECKING:
+    import mmap
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -26,7 +31,13 @@ __all__ = {
     "user_folder",
     "GamesPackage",
     "DataPackage",
+    "GameManifest",
     "failed_world_loads",
+    "game_manifests",
+    "lazy_world_loading",
+    "world_cache",
+    "WorldCache",
+    "CachedGamesPackages",
 }
 
 
@@ -45,6 +56,21 @@ class DataPackage(TypedDict):
     games: Dict[str, GamesPackage]
 
 
+class GameManifest(TypedDict):
+    """What is known about a world without importing it, cached in the world manifest."""
+    world_class: str  # module.ClassName
+    settings_key: str
+    has_settings: bool
+    option_names: List[str]
+    hint_blacklist: List[str]
+    checksum: str  # of the data package, which is cached separately
+
+
+class SourceManifest(TypedDict):
+    key: str  # see WorldSource.manifest_key
+    games: Dict[str, GameManifest]
+
+
 @dataclasses.dataclass(order=True)
 class WorldSource:
     path: str  # typically relative path from this module
@@ -61,6 +87,27 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        return os.path.basename(self.path).rsplit(".", 1)[0]
+
+    @property
+    def manifest_key(self) -> str:
+        """Cheap fingerprint of the source, changes whenever a cached manifest entry may be outdated.
+        Folders are only checked one level deep, so an edit inside a subpackage that leaves the world folder untouched
+        is only picked up once the folder or a file directly in it changes."""
+        stat = os.stat(self.resolved_path)
+        if self.is_zip:
+            return f"{stat.st_mtime_ns}:{stat.st_size}"
+        newest = stat.st_mtime_ns
+        count = 0
+        with os.scandir(self.resolved_path) as entries:
+            for entry in entries:
+                if entry.name != "__pycache__":
+                    newest = max(newest, entry.stat().st_mtime_ns)
+                    count += 1
+        return f"{newest}:{count}"
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -93,10 +140,131 @@ class WorldSource:
             traceback.print_exc(file=file_like)
             file_like.seek(0)
             logging.exception(file_like.read())
-            failed_world_loads.append(os.path.basename(self.path).rsplit(".", 1)[0])
+            failed_world_loads.append(self.module_name)
             return False
 
 
+class WorldCache:
+    """
+    World manifest and data packages of all world sources, stored in a single file in the user cache directory.
+    A small json header holds the manifest and where each game's data package is stored. Data packages are json encoded
+    one after another, so a single game's package can be decoded from the memory-mapped file without reading the rest.
+    """
+    magic = b"APWC"
+    header_size = struct.Struct("<4sI")
+
+    def __init__(self, data: Union[bytes, "mmap.mmap"], sources: Dict[str, SourceManifest],
+                 packages: Dict[str, Tuple[int, int]]) -> None:
+        self._data = data
+        self.sources = sources
+        self.packages = packages
+
+    @staticmethod
+    def path() -> str:
+        return cache_path("world_cache.bin")
+
+    @classmethod
+    def load(cls) -> "Optional[WorldCache]":
+        import mmap
+        try:
+            with open(cls.path(), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, length = cls.header_size.unpack_from(data)
+            if magic == cls.magic:
+                header = json.loads(data[cls.header_size.size:cls.header_size.size + length])
+                # core changes may change what worlds register
+                if header["version"] == __version__:
+                    start = cls.header_size.size + length  # offsets in the header are relative to its end
+                    return cls(data, header["sources"], {
+                        game_name: (start + offset, length)
+                        for game_name, (offset, length) in header["packages"].items()})
+        except (ValueError, struct.error, KeyError, TypeError, AttributeError):
+            pass  # written by an incompatible version or damaged, treated like no cache
+        data.close()
+        return None
+
+    @classmethod
+    def store(cls, sources: Dict[str, SourceManifest], packages: Dict[str, Union[bytes, GamesPackage]]) -> "WorldCache":
+        """Writes sources and packages, which can be given already encoded, and returns the written cache."""
+        blobs: List[bytes] = []
+        spans: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+        for game_name, package in packages.items():
+            blob = package if isinstance(package, bytes) else json.dumps(package, separators=(",", ":")).encode()
+            blobs.append(blob)
+            spans[game_name] = (offset, len(blob))
+            offset += len(blob)
+        header = json.dumps({"version": __version__, "sources": sources, "packages": spans},
+                            separators=(",", ":")).encode()
+        start = cls.header_size.size + len(header)
+        spans = {game_name: (start + offset, length) for game_name, (offset, length) in spans.items()}
+        data = b"".join((cls.header_size.pack(cls.magic, len(header)), header, *blobs))
+        path = cls.path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # several processes may import worlds at the same time, so never leave a partial file behind
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write world cache: {e}")
+        return cls(data, sources, spans)
+
+    def close(self) -> None:
+        """Releases the memory-mapped file, packages can't be read afterwards."""
+        if not isinstance(self._data, bytes):
+            self._data.close()
+
+    def get_raw_package(self, game_name: str) -> bytes:
+        start, length = self.packages[game_name]
+        return self._data[start:start + length]
+
+    def get_package(self, game_name: str) -> GamesPackage:
+        return json.loads(self.get_raw_package(game_name))
+
+
+class CachedGamesPackages(Dict[str, GamesPackage]):
+    """Games packages of lazily loaded worlds, decoded from the world cache when first accessed."""
+
+    def __init__(self, cache: WorldCache, games: Iterable[str]) -> None:
+        super().__init__(dict.fromkeys(games))
+        self._cache = cache
+
+    def __getitem__(self, game_name: str) -> GamesPackage:
+        package = super().__getitem__(game_name)
+        if package is None:
+            package = self._cache.get_package(game_name)
+            super().__setitem__(game_name, package)
+        return package
+
+    def get(self, game_name: str, default: Any = None) -> Any:
+        if game_name in self:
+            return self[game_name]
+        return default
+
+    def items(self) -> List[Tuple[str, GamesPackage]]:  # type: ignore[override]
+        return [(game_name, self[game_name]) for game_name in self]
+
+    def values(self) -> List[GamesPackage]:  # type: ignore[override]
+        return [self[game_name] for game_name in self]
+
+
+def _get_game_manifest(world: "AutoWorldRegister", data_package: GamesPackage) -> GameManifest:
+    annotation = world.__annotations__.get("settings", None)
+    return {
+        "world_class": f"{world.__module__}.{world.__name__}",
+        "settings_key": world.settings_key,
+        "has_settings": annotation is not None and annotation != "ClassVar[Optional['Group']]",
+        "option_names": list(world.options_dataclass.type_hints),
+        "hint_blacklist": sorted(world.hint_blacklist),
+        "checksum": data_package["checksum"],
+    }
+
+
 # find potential world containers, currently folders and zip-importable .apworld's
 world_sources: List[WorldSource] = []
 for folder in (folder for folder in (user_folder, local_folder) if folder):
@@ -115,15 +283,61 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
+from .AutoWorld import AutoWorldRegister, LazyWorld
+
+# Opt-in: only import worlds once they are used, serving everything else from the world manifest.
+# Worlds can have import side effects, like registering launcher components or patch types,
+# so this is only suitable for programs that do not rely on those.
+lazy_world_loading = bool(os.environ.get("AP_LAZY_WORLDS"))
+
 # import all submodules to trigger AutoWorldRegister
 world_sources.sort()
+world_cache = WorldCache.load()
+world_manifest: Dict[str, SourceManifest] = {}
+lazy_games: List[str] = []
+world_source: Optional[WorldSource] = None  # loop variable, deleted below even if there are no world sources
 for world_source in world_sources:
-    world_source.load()
+    source_key = world_source.manifest_key
+    cached_source = world_cache.sources.get(world_source.resolved_path) if world_cache else None
+    if lazy_world_loading and cached_source and cached_source["key"] == source_key:
+        world_manifest[world_source.resolved_path] = cached_source
+        for game_name in cached_source["games"]:
+            AutoWorldRegister.world_types.add_lazy(game_name, world_source.load)
+            lazy_games.append(game_name)
+    elif world_source.load():
+        world_manifest[world_source.resolved_path] = {"key": source_key, "games": {}}
 
-# Build the data package for each game.
-from .AutoWorld import AutoWorldRegister
+# Build the data package for each imported game and record it, so it can be served from the cache next time
+sources_by_module = {f"worlds.{world_source.module_name}": world_source for world_source in world_sources}
+loaded_packages: Dict[str, GamesPackage] = {}
+for game_name, world_type in dict.items(AutoWorldRegister.world_types):
+    if isinstance(world_type, LazyWorld):
+        continue
+    loaded_packages[game_name] = world_type.get_data_package_data()
+    world_source = sources_by_module.get(".".join(world_type.__module__.split(".")[:2]))
+    if world_source and world_source.resolved_path in world_manifest:
+        world_manifest[world_source.resolved_path]["games"][game_name] = \
+            _get_game_manifest(world_type, loaded_packages[game_name])
+if not world_cache or world_manifest != world_cache.sources:
+    cached_packages = {game_name: world_cache.get_raw_package(game_name) for game_name in lazy_games}
+    if world_cache:
+        world_cache.close()  # a file that is still mapped can't be replaced on Windows
+    world_cache = WorldCache.store(world_manifest, {
+        **cached_packages,
+        **{game_name: package for game_name, package in loaded_packages.items()
+           if any(game_name in source_manifest["games"] for source_manifest in world_manifest.values())},
+    })
+    del cached_packages
+del sources_by_module, world_source
 
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
+game_manifests: Dict[str, GameManifest] = {
+    game_name: game_manifest
+    for source_manifest in world_manifest.values()
+    for game_name, game_manifest in source_manifest["games"].items()
 }
 
+# packages of games that were not imported are only decoded from the cache once requested
+games_packages: Dict[str, GamesPackage] = CachedGamesPackages(world_cache, lazy_games) if lazy_games else {}
+games_packages.update(loaded_packages)
+network_data_package: DataPackage = {"games": games_packages}
+del lazy_games, loaded_packages, games_packages